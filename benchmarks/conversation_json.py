@@ -0,0 +1,75 @@
+"""
+Benchmarks round-tripping a ConversationHistory through JSON.
+
+Builds a history of the given number of utterances, split into conversations,
+saves it with dump_conversation_history, loads it back with
+load_conversation_history and checks that the utterances survived.
+
+Run from the repository root, e.g.:
+    python benchmarks/conversation_json.py -n 1000000
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    "..", "src"))
+
+from conversation import Utterance, Conversation, ConversationHistory, \
+    DialogueAct as DA, QuestionType, dump_conversation_history, \
+    load_conversation_history
+
+def history(count, per_conversation):
+    """ ConversationHistory of count utterances """
+    dialogue_acts = list(DA)
+    start = datetime(2018, 1, 1)
+    speakers = ("user", "chatbot")
+    topics = ("cats", "dogs", "self_user", "general")
+    texts = ("How are you?", "I like cats.", "Tell me more.")
+    utterances = Utterance.trusted_many((
+        speakers[i % 2],
+        dialogue_acts[i % len(dialogue_acts)],
+        topics[i % len(topics)],
+        i % 10 + 1,
+        (i * 7) % 10 + 1,
+        texts[i % len(texts)],
+        QuestionType.polar if i % 5 == 0 else None,
+        start + timedelta(microseconds=i)
+    ) for i in range(count))
+    return ConversationHistory([Conversation(set(speakers),
+        utterances[i:i + per_conversation])
+        for i in range(0, count, per_conversation)])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--count", default=1000000, type=int,
+        help="The number of utterances in the history.")
+    parser.add_argument("-c", "--per-conversation", default=1000, type=int,
+        help="The number of utterances per conversation.")
+    args = parser.parse_args()
+
+    original = history(args.count, args.per_conversation)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "conversation_history.json")
+
+        begin = time.perf_counter()
+        with open(path, "w", encoding="utf-8") as json_output:
+            dump_conversation_history(original, json_output)
+        dumped = time.perf_counter() - begin
+        size = os.path.getsize(path)
+
+        begin = time.perf_counter()
+        with open(path, encoding="utf-8") as json_input:
+            loaded = load_conversation_history(json_input)
+        loaded_seconds = time.perf_counter() - begin
+
+    assert loaded.find_utterances() == original.find_utterances()
+    print("Utterances: {}, file: {:.1f} MB".format(args.count, size / 1e6))
+    print("dump: {:.2f} s, load: {:.2f} s".format(dumped, loaded_seconds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmarks the memory and construction time of Utterances.
+
+Compares the slots based Utterance, built by its validated constructor and by
+the trusted bulk factory, against an equivalent object keeping its attributes
+in a per-instance __dict__, as Utterance used to.
+
+Run from the repository root, e.g.:
+    python benchmarks/utterance_memory.py -n 1000000
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    "..", "src"))
+
+from conversation import Utterance, DialogueAct as DA
+
+class DictUtterance(object):
+    """ The attributes of an Utterance, kept in a per-instance __dict__ """
+    def __init__(self, speaker, dialogue_act, topic, sentiment, assertiveness,
+            text, question_type, date_time):
+        self.__speaker = speaker
+        self.__dialogue_act = dialogue_act
+        self.__topic = topic
+        self.__sentiment = sentiment
+        self.__assertiveness = assertiveness
+        self.__text = text
+        self.__question_type = question_type
+        self.__date_time = date_time
+
+def records(count):
+    """ Validated utterance records sharing their str and enum values """
+    dialogue_acts = list(DA)
+    start = datetime(2018, 1, 1)
+    speakers = ("user", "chatbot")
+    topics = ("cats", "dogs", "self_user", "general")
+    texts = ("How are you?", "I like cats.", "Tell me more.")
+    return [(
+        speakers[i % 2],
+        dialogue_acts[i % len(dialogue_acts)],
+        topics[i % len(topics)],
+        i % 10 + 1,
+        (i * 7) % 10 + 1,
+        texts[i % len(texts)],
+        None,
+        start + timedelta(microseconds=i)
+    ) for i in range(count)]
+
+def measure(build, count):
+    """ Bytes per utterance and seconds to build the utterances """
+    data = records(count)
+    begin = time.perf_counter()
+    utterances = build(data)
+    seconds = time.perf_counter() - begin
+    del utterances
+
+    # Timed and traced separately, as tracing slows allocation down.
+    tracemalloc.start()
+    utterances = build(data)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(utterances) == count
+    return allocated / count, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--count", default=200000, type=int,
+        help="The number of utterances to build.")
+    count = parser.parse_args().count
+
+    builds = [
+        ("__dict__ object", lambda data: [DictUtterance(*r) for r in data]),
+        ("Utterance(...)", lambda data: [Utterance(*r) for r in data]),
+        ("Utterance.trusted_many", Utterance.trusted_many),
+    ]
+    print("{:<24}{:>16}{:>16}".format("", "bytes/utterance", "ns/utterance"))
+    for name, build in builds:
+        per_utterance, seconds = measure(build, count)
+        print("{:<24}{:>16.1f}{:>16.0f}".format(name, per_utterance,
+            seconds / count * 1e9))
+
+if __name__ == "__main__":
+    main()
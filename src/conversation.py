@@ -5,20 +5,24 @@ All classes and functions related to engaging in a conversation.
 """
 
 # TODO Need better assertions/error throwing for controlling arg types in class
-# TODO after prototype, figure out how to handle utterances @ same datetime,
-#   esp. across Conversations in a ConversationHistory
-# TODO Swap from OrderedDict to SortedSet, at least w/in Conversation
 # TODO make all to_string() simple be to_string version of to_dict()/json_dump
 #   use vars(self) to make dict of attributes. may help w/ json_dump^^^^
 # TODO properly implement to_string and print, etc. __repr__, __str__, etc...
 
+from array import array
 from collections import OrderedDict
-from datetime import datetime
+from collections.abc import Mapping, Sequence, Set
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from functools import total_ordering
 import copy
+import gc
 import json
-#from sortedcontainers import SortedSet
+import sys
+import threading
+import weakref
+import numpy as np
 
 class DialogueAct(Enum):
     """
@@ -120,6 +124,43 @@ def topic_is_user(topic):
     """ Check if the topic is about the user. """
     return topic in {"me", "myself", "self_user"}
 
+class InternTable(object):
+    """
+    Interning table of str values, e.g. topics, to int ids. The ids are
+    assigned in order of first use and never change, so ids from the same
+    table are comparable across utterances, conversations and histories.
+    """
+    def __init__(self):
+        self.__ids = {}
+        self.__values = []
+        self.__lock = threading.Lock()
+
+    def intern(self, value):
+        """ Returns the id of the value, assigning it if the value is new """
+        value_id = self.__ids.get(value)
+        if value_id is None:
+            with self.__lock:
+                value_id = self.__ids.get(value)
+                if value_id is None:
+                    value_id = len(self.__values)
+                    self.__values.append(value)
+                    self.__ids[value] = value_id
+        return value_id
+
+    def get_id(self, value):
+        """ Returns the id of the value, or None if it was never interned """
+        return self.__ids.get(value)
+
+    def value(self, value_id):
+        """ Returns the value of the id """
+        return self.__values[value_id]
+
+    def __len__(self):
+        return len(self.__values)
+
+# The process-wide topic table
+topic_table = InternTable()
+
 # TODO split conversation.py into utterance.py, conversation.py, conversation_history.py, where the general helpr functions above are in the utterance.py. The below functions will be in conversation or conversation history
 
 def find_conversation_histsory(personas, path="../data/conversation_logs/"):
@@ -134,10 +175,156 @@ def find_conversation_histsory(personas, path="../data/conversation_logs/"):
     #TODO implement an actual Data Base that lets you find by persona ids.
     return None
 
+class ReadOnlySequence(Sequence):
+    """
+    Read only view of a list, reflecting its changes without copying it.
+
+    :param items: list viewed
+    """
+    __slots__ = ("__items",)
+
+    def __init__(self, items):
+        self.__items = items
+
+    def __getitem__(self, index):
+        return self.__items[index]
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __iter__(self):
+        return iter(self.__items)
+
+    def __reversed__(self):
+        return reversed(self.__items)
+
+    def __contains__(self, item):
+        return item in self.__items
+
+    def __eq__(self, other):
+        if isinstance(other, ReadOnlySequence):
+            other = other.__items
+        return isinstance(other, (list, tuple)) and self.__items == list(other)
+
+    def __repr__(self):
+        return "ReadOnlySequence(" + repr(self.__items) + ")"
+
+    def snapshot(self):
+        """ Returns a list copy of the items """
+        return self.__items.copy()
+
+class ReadOnlySet(Set):
+    """
+    Read only view of a set, reflecting its changes without copying it.
+
+    :param items: set viewed
+    """
+    __slots__ = ("__items",)
+
+    def __init__(self, items):
+        self.__items = items
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return set(iterable)
+
+    def __contains__(self, item):
+        return item in self.__items
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __iter__(self):
+        return iter(self.__items)
+
+    def __repr__(self):
+        return "ReadOnlySet(" + repr(self.__items) + ")"
+
+    def snapshot(self):
+        """ Returns a set copy of the items """
+        return self.__items.copy()
+
+class ReadOnlyMapping(Mapping):
+    """
+    Read only view of a dict, reflecting its changes without copying it. List
+    values are returned as ReadOnlySequences.
+
+    :param mapping: dict or OrderedDict viewed
+    """
+    __slots__ = ("__mapping",)
+
+    def __init__(self, mapping):
+        self.__mapping = mapping
+
+    def __getitem__(self, key):
+        value = self.__mapping[key]
+        return ReadOnlySequence(value) if isinstance(value, list) else value
+
+    def __len__(self):
+        return len(self.__mapping)
+
+    def __iter__(self):
+        return iter(self.__mapping)
+
+    def __reversed__(self):
+        return reversed(self.__mapping)
+
+    def __contains__(self, key):
+        return key in self.__mapping
+
+    def __repr__(self):
+        return "ReadOnlyMapping(" + repr(self.__mapping) + ")"
+
+    def snapshot(self):
+        """
+        Returns a copy of the mapping, of the same type, with copies of its
+        list values.
+        """
+        mapping = self.__mapping.copy()
+        for key, value in mapping.items():
+            if isinstance(value, list):
+                mapping[key] = value.copy()
+        return mapping
+
+class Listeners(object):
+    """
+    Listeners to the appends of a conversation. Bound methods are held by
+    weak reference, so listening does not keep their objects alive, and are
+    dropped once their objects are collected.
+    """
+    __slots__ = ("__listeners",)
+
+    def __init__(self):
+        self.__listeners = []
+
+    def add(self, listener):
+        """ Adds the function or bound method, unless it was added before """
+        reference = weakref.WeakMethod(listener) \
+            if hasattr(listener, "__self__") else (lambda: listener)
+        if listener not in (r() for r in self.__listeners):
+            self.__listeners.append(reference)
+
+    def notify(self, *args):
+        """ Calls the listeners with the arguments """
+        dead = False
+        for reference in self.__listeners:
+            listener = reference()
+            if listener is None:
+                dead = True
+            else:
+                listener(*args)
+        if dead:
+            self.__listeners = [r for r in self.__listeners
+                if r() is not None]
+
+    def __len__(self):
+        return len(self.__listeners)
+
 @total_ordering
 class Utterance(object):
     """
-    Defines an individual utterance with the specific NLU information
+    Defines an individual utterance with the specific NLU information.
+    Utterances are immutable, see with_text for one with different text.
 
     :param speaker: str of persona_id speaking the Utterance
     :param dialogue_act: DialogueAct of the Utterance
@@ -148,6 +335,9 @@ class Utterance(object):
     :param question_type: QuestionType of Utterance if DialogueAct is question
     :param date_time: datetime of when the Utterance was spoken
     """
+    __slots__ = ("__speaker", "__dialogue_act", "__topic", "__sentiment",
+        "__assertiveness", "__text", "__question_type", "__date_time")
+
     # TODO if given only a persona, rather than a speaker name and personality
     #   traits, then infer those from the persona.
     def __init__(self, speaker, dialogue_act, topic, sentiment, assertiveness,
@@ -167,7 +357,8 @@ class Utterance(object):
             self.__text = text.strip()
         else:
             self.__text = text
-        self.__topic = topic.lower().strip()
+        # Interned, as the same few topics recur in many utterances
+        self.__topic = sys.intern(topic.lower().strip())
         self.__sentiment = sentiment
         self.__assertiveness = assertiveness
         self.__dialogue_act = dialogue_act
@@ -180,6 +371,58 @@ class Utterance(object):
         else:
             self.__question_type = None
 
+    @classmethod
+    def trusted(cls, speaker, dialogue_act, topic, sentiment, assertiveness,
+            text, question_type, date_time):
+        """
+        Creates an Utterance from already validated and normalized values,
+        e.g. of a saved conversation, without the checks of the constructor.
+        """
+        utterance = object.__new__(cls)
+        utterance.__speaker = speaker
+        utterance.__dialogue_act = dialogue_act
+        utterance.__topic = topic
+        utterance.__sentiment = sentiment
+        utterance.__assertiveness = assertiveness
+        utterance.__text = text
+        utterance.__question_type = question_type
+        utterance.__date_time = date_time
+        return utterance
+
+    @classmethod
+    def trusted_many(cls, records):
+        """
+        Creates Utterances from already validated and normalized records. The
+        garbage collector is paused meanwhile, as the many new objects would
+        otherwise trigger collections that find nothing to collect.
+
+        :param records: iterable of tuples of the speaker, dialogue_act,
+            topic, sentiment, assertiveness, text, question_type and date_time
+        :return: list of Utterances
+        """
+        new = object.__new__
+        utterances = []
+        append = utterances.append
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for (speaker, dialogue_act, topic, sentiment, assertiveness, text,
+                    question_type, date_time) in records:
+                utterance = new(cls)
+                utterance.__speaker = speaker
+                utterance.__dialogue_act = dialogue_act
+                utterance.__topic = topic
+                utterance.__sentiment = sentiment
+                utterance.__assertiveness = assertiveness
+                utterance.__text = text
+                utterance.__question_type = question_type
+                utterance.__date_time = date_time
+                append(utterance)
+        finally:
+            if collecting:
+                gc.enable()
+        return utterances
+
     @property
     def speaker(self):
         """The speaker of the utterance"""
@@ -219,8 +462,39 @@ class Utterance(object):
     def date_time(self):
         return self.__date_time
 
-    def set_text(self, text):
-        self.__text = text.strip() if isinstance(text, str) else None
+    @property
+    def topic_id(self):
+        """The id of the topic in the process-wide topic_table"""
+        return topic_table.intern(self.__topic)
+
+    def record(self):
+        """
+        Tuple of the speaker, dialogue_act, topic, sentiment, assertiveness,
+        text, question_type and date_time, as taken by trusted.
+        """
+        return (
+            self.__speaker,
+            self.__dialogue_act,
+            self.__topic,
+            self.__sentiment,
+            self.__assertiveness,
+            self.__text,
+            self.__question_type,
+            self.__date_time
+        )
+
+    def with_text(self, text):
+        """ Returns a copy of the Utterance with the given text """
+        return Utterance.trusted(
+            self.__speaker,
+            self.__dialogue_act,
+            self.__topic,
+            self.__sentiment,
+            self.__assertiveness,
+            text.strip() if isinstance(text, str) else None,
+            self.__question_type,
+            self.__date_time
+        )
 
     def __str__(self):
         return (
@@ -238,15 +512,15 @@ class Utterance(object):
         return self.__str__()
 
     def __copy__(self):
-        return Utterance(
-            self.speaker,
-            self.dialogue_act,
-            self.topic,
-            self.sentiment,
-            self.assertiveness,
-            self.text,
-            self.question_type,
-            self.date_time
+        return Utterance.trusted(
+            self.__speaker,
+            self.__dialogue_act,
+            self.__topic,
+            self.__sentiment,
+            self.__assertiveness,
+            self.__text,
+            self.__question_type,
+            self.__date_time
         )
 
     def copy(self):
@@ -278,25 +552,25 @@ class Utterance(object):
         )
 
     def __lt__(self, other):
-        return ((
+        return self.__sort_key() < other.__sort_key()
+
+    def __sort_key(self):
+        """
+        Helper function of the attributes in order of comparison, where the
+        enums, which are not orderable, are compared by value and None
+        sorts first.
+        """
+        return (
             self.__date_time,
             self.__speaker,
-            self.__dialogue_act,
+            self.__dialogue_act.value,
             self.__topic,
             self.__sentiment,
             self.__assertiveness,
-            self.__text,
-            self.__question_type
-        ) < (
-            other.__date_time,
-            other.__speaker,
-            other.__dialogue_act,
-            other.__topic,
-            other.__sentiment,
-            other.__assertiveness,
-            other.__text,
-            other.__question_type
-        ))
+            self.__text is not None,
+            self.__text or "",
+            -1 if self.__question_type is None else self.__question_type.value
+        )
 
     # TODO is this improper usage? missing __objclass__?
     def __dict__(self):
@@ -311,83 +585,307 @@ class Utterance(object):
             "date_time": self.__date_time
         }
 
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def naive_utc(date_time):
+    """
+    The datetime as a naive datetime. Timezone aware datetimes are converted
+    to UTC, naive ones are returned as they are.
+    """
+    if date_time.tzinfo is None:
+        return date_time
+    return date_time.astimezone(timezone.utc).replace(tzinfo=None)
+
+def microseconds(date_times):
+    """
+    The int microseconds since the epoch of the datetime, or int64 numpy
+    array of them of a sequence of datetimes. Timezone aware datetimes are
+    converted to UTC, see naive_utc.
+    """
+    if isinstance(date_times, datetime):
+        return (naive_utc(date_times) - _EPOCH) // _MICROSECOND
+    # Several times faster than numpy's conversion of datetime objects
+    return np.array([(naive_utc(d) - _EPOCH) // _MICROSECOND
+        for d in date_times], dtype=np.int64)
+
+class Timeline(object):
+    """
+    Int postings, e.g. sequence ids of utterances, sorted by their times.
+
+    Postings added in order of time are appended to int64 arrays, others are
+    sorted in at the next query, so queries of a time range are binary
+    searches.
+    """
+    def __init__(self):
+        self.__times = array("q")
+        self.__postings = array("q")
+        self.__sorted = True
+
+    def __len__(self):
+        return len(self.__times)
+
+    def append(self, time, posting):
+        """
+        Adds one posting, in O(1) amortized time.
+
+        :param time: int microseconds of the posting, see microseconds
+        :param posting: int posting
+        """
+        times = self.__times
+        if self.__sorted and times and time < times[-1]:
+            self.__sorted = False
+        times.append(time)
+        self.__postings.append(posting)
+
+    def add(self, times, postings):
+        """
+        Adds postings.
+
+        :param times: int microseconds of the posting, or numpy array of
+            them, see microseconds
+        :param postings: int posting, or numpy array of them
+        """
+        times = np.atleast_1d(times).astype(np.int64)
+        postings = np.atleast_1d(postings).astype(np.int64)
+        if len(times) and self.__sorted:
+            self.__sorted = (not self.__times
+                or times[0] >= self.__times[-1]) \
+                and bool(np.all(times[1:] >= times[:-1]))
+        self.__times.frombytes(times.tobytes())
+        self.__postings.frombytes(postings.tobytes())
+
+    def __sort(self):
+        """ Helper function sorting the postings added out of order """
+        times = np.frombuffer(self.__times, dtype=np.int64)
+        postings = np.frombuffer(self.__postings, dtype=np.int64)
+        # Stable, so equal times stay in order of addition
+        order = np.argsort(times, kind="stable")
+        self.__times = array("q", times[order].tobytes())
+        self.__postings = array("q", postings[order].tobytes())
+        self.__sorted = True
+
+    def range(self, start=None, end=None):
+        """
+        The postings from the start up to, excluding, the end.
+
+        :param start: datetime, None for the first posting
+        :param end: datetime, None for after the last posting
+        :return: tuple of the int64 numpy arrays of the times and postings
+        """
+        if not self.__times:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if not self.__sorted:
+            self.__sort()
+        times = np.frombuffer(self.__times, dtype=np.int64)
+        i = 0 if start is None \
+            else int(np.searchsorted(times, microseconds(start), "left"))
+        j = len(times) if end is None \
+            else int(np.searchsorted(times, microseconds(end), "left"))
+        # Copies, as the arrays can not grow while viewed
+        return times[i:j].copy(), \
+            np.frombuffer(self.__postings, dtype=np.int64)[i:j].copy()
+
+    def count(self, start=None, end=None):
+        """ The number of postings from the start up to, excluding, the end """
+        if not self.__times:
+            return 0
+        if not self.__sorted:
+            self.__sort()
+        times = np.frombuffer(self.__times, dtype=np.int64)
+        i = 0 if start is None \
+            else int(np.searchsorted(times, microseconds(start), "left"))
+        j = len(times) if end is None \
+            else int(np.searchsorted(times, microseconds(end), "left"))
+        return j - i
+
+    def contains(self, times, postings):
+        """
+        Whether each posting is in the timeline at its time, found by binary
+        search of the times, without copying the timeline.
+
+        :param times: int64 numpy array of the microseconds of the postings
+        :param postings: int64 numpy array of the postings
+        :return: bool numpy array
+        """
+        found = np.zeros(len(times), dtype=bool)
+        if not self.__times or not len(times):
+            return found
+        if not self.__sorted:
+            self.__sort()
+        own_times = np.frombuffer(self.__times, dtype=np.int64)
+        own_postings = np.frombuffer(self.__postings, dtype=np.int64)
+        lo = np.searchsorted(own_times, times, "left")
+        hi = np.searchsorted(own_times, times, "right")
+        single = np.flatnonzero(hi - lo == 1)
+        found[single] = own_postings[lo[single]] == postings[single]
+        # Postings at the same time as others are compared with all of them
+        for k in np.flatnonzero(hi - lo > 1).tolist():
+            found[k] = postings[k] in own_postings[lo[k]:hi[k]]
+        return found
+
+    def __copy__(self):
+        timeline = Timeline()
+        timeline.__times = self.__times[:]
+        timeline.__postings = self.__postings[:]
+        timeline.__sorted = self.__sorted
+        return timeline
+
+    def copy(self):
+        return self.__copy__()
+
 class Conversation(object):
-    """ A representation of a single conversation """
+    """
+    A representation of a single conversation.
+
+    Every utterance gets the next int sequence id of the conversation, its
+    position in it, so utterances added at the same time are all kept. The
+    times they were added at are indexed separately, see utterances_between.
+    """
     new_convo = True
 
-    def __init__(self, participants=set(), utterances=OrderedDict(),
+    def __init__(self, participants=None, utterances=None,
             topic_to_utterances=None):
         """
-        :param utterances: OrderedDict of datetime to Utterance objects
-            detailing the utterance history of the conversation.
+        :param utterances: Mapping of int sequence id to Utterance objects, or
+            sequence of Utterance objects, detailing the utterance history of
+            the conversation. The utterances are numbered in order from 0.
         :param participants: set of persona_ids participating in conversation
-        :param topic_to_utterances: Dict of str "topic" to list(datetime) of
-            utterances under this topic in conversation history.
+        :param topic_to_utterances: Dict of str "topic" to list(int) of
+            sequence ids of utterances under this topic in conversation
+            history.
         """
         #TODO make participants dict of participant id's/hashes
+        if participants is None:
+            participants = set()
+        if utterances is None:
+            utterances = []
+        elif isinstance(utterances, Mapping):
+            utterances = list(utterances.values())
         assert isinstance(participants, set)
-        assert isinstance(utterances, OrderedDict) \
-            and (len(utterances.values()) == 0
-            or isinstance(utterances.values()[0], Utterance))
+        assert all(isinstance(u, Utterance) for u in utterances)
 
-        self.__utterances = utterances
+        # Append only, so in order of the sequence ids
+        self.__utterances = dict(enumerate(utterances))
         self.__participants = participants
+        self.__times = Timeline()
+        self.__times.add(microseconds([u.date_time for u in utterances]),
+            np.arange(len(utterances), dtype=np.int64))
 
         if topic_to_utterances is None:
             self.__topic_to_utterances = {}
-            for k,u in utterances.items():
-                self.__add_utterance_to_topic(u, k)
+            for sequence_id, u in enumerate(utterances):
+                self.__topic_to_utterances.setdefault(u.topic, []).append(
+                    sequence_id)
         else:
             assert(isinstance(topic_to_utterances, dict))
             self.__topic_to_utterances = topic_to_utterances
 
+        self.__phrase_bags = {}
+        self.__listeners = Listeners()
+
     @property
     def utterances(self):
-        return self.__utterances.copy()
+        """
+        ReadOnlyMapping of int sequence id to Utterance, see snapshot for a
+        copy
+        """
+        return ReadOnlyMapping(self.__utterances)
 
     @property
     def participants(self):
-        return self.__participants.copy()
+        """ReadOnlySet of the persona_ids, see snapshot for a copy"""
+        return ReadOnlySet(self.__participants)
 
     @property
     def topic_to_utterances(self):
-        return self.__topic_to_utterances.copy()
+        """
+        ReadOnlyMapping of str topic to the sequence ids of its utterances,
+        see snapshot for a copy
+        """
+        return ReadOnlyMapping(self.__topic_to_utterances)
+
+    @property
+    def phrase_bags(self):
+        """
+        Dict of the NLG's no-repeat phrase samplers of this conversation,
+        mutated in place, see nlg.shuffle_bag
+        """
+        return self.__phrase_bags
 
     @property
     def last_utterance(self):
         """ Peeks at last entered utterance """
-        #return self.__utterances[len(self.__utterances) - 1].copy()
-        # for OrderedDict
         if len(self.__utterances) == 0:
             return None
-        return self.__utterances[next(reversed(self.__utterances))].copy()
+        # Utterances are immutable, so no copy is needed
+        return self.__utterances[len(self.__utterances) - 1]
+
+    def utterance(self, index):
+        """ The Utterance of the sequence id, negative from the end """
+        if index < 0:
+            index += len(self.__utterances)
+        try:
+            return self.__utterances[index]
+        except KeyError:
+            raise IndexError("Utterance index out of range")
+
+    def __len__(self):
+        return len(self.__utterances)
+
+    def utterances_between(self, start=None, end=None):
+        """
+        The utterances added from the start up to, excluding, the end, in
+        order of the times they were added at.
+
+        :param start: datetime, None for the first utterance
+        :param end: datetime, None for after the last utterance
+        :return: list of Utterances
+        """
+        _, sequence_ids = self.__times.range(start, end)
+        return [self.__utterances[i] for i in sequence_ids.tolist()]
 
-    # TODO datatime.now() in default only called once. Error...
     def add_utterance(self, utterance, date_time=None):
+        """
+        Adds the utterance as the last of the conversation.
+
+        :param date_time: datetime the utterance was added at, defaults to
+            the date_time of the utterance
+        :return: int sequence id of the utterance
+        """
         assert isinstance(utterance, Utterance)
         if date_time is None:
-            date_time = datetime.now()
+            date_time = utterance.date_time
         assert isinstance(date_time, datetime)
-        self.__utterances[date_time] = utterance
-        #self.__utterances.add(utterance)
-        self.__add_utterance_to_topic(utterance)
-        #self.__add_utterance_to_topic(utterance, date_time)
+        sequence_id = len(self.__utterances)
+        self.__utterances[sequence_id] = utterance
+        self.__times.append(microseconds(date_time), sequence_id)
+        self.__add_utterance_to_topic(utterance, sequence_id)
+        if self.__listeners:
+            self.__listeners.notify(self, sequence_id, utterance)
+        return sequence_id
+
+    def subscribe(self, listener):
+        """
+        Calls the listener with the conversation, sequence id and Utterance of
+        every utterance added from now on. Bound methods are held weakly, see
+        Listeners.
+        """
+        self.__listeners.add(listener)
 
-    #def __add_utterance_to_topic(self, utterance, date_time):
-    def __add_utterance_to_topic(self, utterance):
+    def __add_utterance_to_topic(self, utterance, sequence_id):
         """Helper function to update topic_to_utterances dict"""
         if utterance.topic in self.__topic_to_utterances.keys():
-            self.__topic_to_utterances[utterance.topic].append(
-                utterance.date_time)
+            self.__topic_to_utterances[utterance.topic].append(sequence_id)
         else:
-            self.__topic_to_utterances[utterance.topic] = [utterance.date_time]
+            self.__topic_to_utterances[utterance.topic] = [sequence_id]
 
     def add_participant(self, participant):
         self.__participants.add(participant)
 
     def __str__(self):
         s = "Utterances:\n"
-        for u in self.__utterances:
+        for u in self.__utterances.values():
             s += str(u)
 
         s += "\nParticipants:\n"
@@ -404,16 +902,22 @@ class Conversation(object):
         return
 
     def __copy__(self):
-        return Conversation(
-            self.participants,
-            self.utterances,
-            self.topic_to_utterances
+        conversation = Conversation(
+            self.participants.snapshot(),
+            self.utterances.snapshot(),
+            self.topic_to_utterances.snapshot()
         )
+        conversation.__times = self.__times.copy()
+        conversation.__phrase_bags = {key: bag.copy()
+            for key, bag in self.__phrase_bags.items()}
+        return conversation
 
     def copy(self):
         return self.__copy__()
 
     def __eq__(self, other):
+        if isinstance(other, ColumnarConversation):
+            return other == self
         return (
             isinstance(other, Conversation)
             and self.__participants == other.__participants
@@ -430,73 +934,829 @@ class Conversation(object):
             "topic_to_utterances": self.__topic_to_utterances
         }
 
+class ColumnarUtterances(Mapping):
+    """
+    Read only view of int sequence id to the Utterances of a
+    ColumnarConversation, reflecting its changes. Utterances are materialized
+    from the columns only when accessed, so taking the view is O(1).
+
+    :param conversation: ColumnarConversation viewed
+    """
+    __slots__ = ("__conversation",)
+
+    def __init__(self, conversation):
+        self.__conversation = conversation
+
+    def __getitem__(self, sequence_id):
+        if not isinstance(sequence_id, int) \
+                or not 0 <= sequence_id < len(self.__conversation):
+            raise KeyError(sequence_id)
+        return self.__conversation.utterance(sequence_id)
+
+    def __len__(self):
+        return len(self.__conversation)
+
+    def __iter__(self):
+        return iter(range(len(self.__conversation)))
+
+    def __reversed__(self):
+        return reversed(range(len(self.__conversation)))
+
+    def __contains__(self, sequence_id):
+        return isinstance(sequence_id, int) \
+            and 0 <= sequence_id < len(self.__conversation)
+
+    def __repr__(self):
+        return "ColumnarUtterances(" + repr(self.snapshot()) + ")"
+
+    def snapshot(self):
+        """ Returns a dict of the materialized utterances """
+        return dict(enumerate(self.__conversation.materialize()))
+
+class ColumnarConversation(object):
+    """
+    A Conversation stored as columns rather than Utterance objects.
+
+    The dialogue acts, question types, sentiment, assertiveness, speakers,
+    topics and times of the utterances are kept in numpy arrays that grow by
+    doubling, with speakers and topics as ids into their tables, and the texts
+    in a list. Utterances are only materialized when accessed, so analytics
+    over long conversations can work on slices of the columns instead.
+
+    Implements the interface of Conversation, where the sequence id of an
+    utterance is its row. Times are naive datetimes, kept to the microsecond,
+    and timezone aware ones are converted to naive UTC.
+
+    :param participants: set of persona_ids participating in conversation
+    :param utterances: Mapping of int sequence id to Utterance objects, or
+        sequence of Utterance objects, detailing the utterance history of the
+        conversation. The utterances are numbered in order from 0.
+    :param capacity: int number of utterances to allocate the columns for
+    """
+    new_convo = True
+
+    def __init__(self, participants=None, utterances=None, capacity=16):
+        assert participants is None or isinstance(participants, set)
+        assert capacity > 0
+
+        self.__participants = set() if participants is None else participants
+        self.__length = 0
+        self.__in_order = True
+        self.__allocate(capacity)
+        self.__texts = []
+        self.__speakers = []
+        self.__speaker_ids = {}
+        self.__topics = []
+        self.__topic_ids = {}
+        self.__topic_to_utterances = {}
+        self.__phrase_bags = {}
+        self.__listeners = Listeners()
+
+        if isinstance(utterances, Mapping):
+            utterances = utterances.values()
+        for utterance in utterances or []:
+            self.add_utterance(utterance)
+
+    @classmethod
+    def from_conversation(cls, conversation):
+        """
+        Creates the ColumnarConversation of a Conversation, which continues
+        it, so whether it is a new conversation is kept
+        """
+        utterances = conversation.utterances
+        columnar = cls(conversation.participants.snapshot(), utterances,
+            max(len(utterances), 16))
+        columnar.new_convo = conversation.new_convo
+        return columnar
+
+    def __allocate(self, capacity):
+        """ Helper function replacing the columns with ones of the capacity """
+        columns = (
+            np.empty(capacity, dtype="datetime64[us]"),
+            np.empty(capacity, dtype="datetime64[us]"),
+            np.empty(capacity, dtype=np.int16),
+            np.empty(capacity, dtype=np.int16),
+            np.empty(capacity, dtype=np.int8),
+            np.empty(capacity, dtype=np.int8),
+            np.empty(capacity, dtype=np.int32),
+            np.empty(capacity, dtype=np.int32),
+        )
+        if self.__length:
+            for new, old in zip(columns, self.__columns()):
+                new[:self.__length] = old
+        (self.__added_at, self.__date_times, self.__dialogue_acts,
+            self.__question_types, self.__sentiments, self.__assertiveness,
+            self.__speaker_column, self.__topic_column) = columns
+
+    def __columns(self):
+        return (self.__added_at, self.__date_times, self.__dialogue_acts,
+            self.__question_types, self.__sentiments, self.__assertiveness,
+            self.__speaker_column, self.__topic_column)
+
+    def __view(self, column):
+        """ Helper function of the read only view of the filled column """
+        view = column[:self.__length]
+        view.flags.writeable = False
+        return view
+
+    def __len__(self):
+        return self.__length
+
+    @property
+    def capacity(self):
+        return len(self.__added_at)
+
+    @property
+    def added_at(self):
+        """numpy datetime64 array of the times the utterances were added at"""
+        return self.__view(self.__added_at)
+
+    @property
+    def date_times(self):
+        """numpy datetime64 array of the times of the utterances"""
+        return self.__view(self.__date_times)
+
+    @property
+    def dialogue_acts(self):
+        """numpy int array of the DialogueAct values of the utterances"""
+        return self.__view(self.__dialogue_acts)
+
+    @property
+    def question_types(self):
+        """numpy int array of the QuestionType values, -1 for None"""
+        return self.__view(self.__question_types)
+
+    @property
+    def sentiments(self):
+        return self.__view(self.__sentiments)
+
+    @property
+    def assertiveness(self):
+        return self.__view(self.__assertiveness)
+
+    @property
+    def speaker_ids(self):
+        """numpy int array of the indices of the speakers into speakers"""
+        return self.__view(self.__speaker_column)
+
+    @property
+    def topic_ids(self):
+        """numpy int array of the indices of the topics into topics"""
+        return self.__view(self.__topic_column)
+
+    @property
+    def speakers(self):
+        """Tuple of the str speakers, in order of first utterance"""
+        return tuple(self.__speakers)
+
+    @property
+    def topics(self):
+        """Tuple of the str topics, in order of first utterance"""
+        return tuple(self.__topics)
+
+    @property
+    def texts(self):
+        """ReadOnlySequence of the str texts, see snapshot for a copy"""
+        return ReadOnlySequence(self.__texts)
+
+    def utterance(self, index):
+        """ Materializes the Utterance at the index """
+        if index < 0:
+            index += self.__length
+        if not 0 <= index < self.__length:
+            raise IndexError("Utterance index out of range")
+        question_type = int(self.__question_types[index])
+        return Utterance.trusted(
+            self.__speakers[self.__speaker_column[index]],
+            DialogueAct(int(self.__dialogue_acts[index])),
+            self.__topics[self.__topic_column[index]],
+            int(self.__sentiments[index]),
+            int(self.__assertiveness[index]),
+            self.__texts[index],
+            None if question_type < 0 else QuestionType(question_type),
+            self.__date_times[index].item()
+        )
+
+    @property
+    def utterances(self):
+        """
+        ColumnarUtterances view of int sequence id to Utterance, which only
+        materializes the utterances accessed, see snapshot for a copy
+        """
+        return ColumnarUtterances(self)
+
+    def materialize(self, start=0, end=None):
+        """
+        Materializes the utterances from the start up to, excluding, the end
+        at once, from slices of the columns.
+
+        :param start: int sequence id of the first utterance
+        :param end: int sequence id after the last utterance, None for all
+        :return: list of Utterances
+        """
+        end = self.__length if end is None else min(end, self.__length)
+        start = min(start, end)
+        dialogue_acts = {da.value: da for da in DialogueAct}
+        question_types = {qt.value: qt for qt in QuestionType}
+        question_types[-1] = None
+        return Utterance.trusted_many(zip(
+            [self.__speakers[i]
+                for i in self.__speaker_column[start:end].tolist()],
+            [dialogue_acts[v]
+                for v in self.__dialogue_acts[start:end].tolist()],
+            [self.__topics[i]
+                for i in self.__topic_column[start:end].tolist()],
+            self.__sentiments[start:end].tolist(),
+            self.__assertiveness[start:end].tolist(),
+            self.__texts[start:end],
+            [question_types[v]
+                for v in self.__question_types[start:end].tolist()],
+            self.__date_times[start:end].tolist()
+        ))
+
+    @property
+    def participants(self):
+        """ReadOnlySet of the persona_ids, see snapshot for a copy"""
+        return ReadOnlySet(self.__participants)
+
+    @property
+    def topic_to_utterances(self):
+        """
+        ReadOnlyMapping of str topic to the sequence ids of its utterances,
+        in order of first utterance, see snapshot for a copy
+        """
+        return ReadOnlyMapping(self.__topic_to_utterances)
+
+    @property
+    def phrase_bags(self):
+        """
+        Dict of the NLG's no-repeat phrase samplers of this conversation,
+        mutated in place, see nlg.shuffle_bag
+        """
+        return self.__phrase_bags
+
+    @property
+    def last_utterance(self):
+        """ Peeks at last entered utterance """
+        if self.__length == 0:
+            return None
+        return self.utterance(self.__length - 1)
+
+    def utterances_between(self, start=None, end=None):
+        """
+        The utterances added from the start up to, excluding, the end, in
+        order of the times they were added at, found by binary search of the
+        added_at column.
+
+        :param start: datetime, None for the first utterance
+        :param end: datetime, None for after the last utterance
+        :return: list of Utterances
+        """
+        times = self.__added_at[:self.__length].astype(np.int64)
+        order = None
+        if not self.__in_order:
+            order = np.argsort(times, kind="stable")
+            times = times[order]
+        i = 0 if start is None \
+            else int(np.searchsorted(times, microseconds(start), "left"))
+        j = len(times) if end is None \
+            else int(np.searchsorted(times, microseconds(end), "left"))
+        rows = range(i, j) if order is None else order[i:j].tolist()
+        return [self.utterance(row) for row in rows]
+
+    def add_utterance(self, utterance, date_time=None):
+        """
+        Adds the utterance as the last of the conversation.
+
+        :param date_time: datetime the utterance was added at, defaults to
+            the date_time of the utterance
+        :return: int sequence id of the utterance
+        """
+        assert isinstance(utterance, Utterance)
+        if date_time is None:
+            date_time = utterance.date_time
+        assert isinstance(date_time, datetime)
+
+        if self.__length == len(self.__added_at):
+            self.__allocate(2 * len(self.__added_at))
+        i = self.__length
+
+        self.__added_at[i] = naive_utc(date_time)
+        if i and self.__in_order:
+            self.__in_order = self.__added_at[i] >= self.__added_at[i - 1]
+        self.__date_times[i] = naive_utc(utterance.date_time)
+        self.__dialogue_acts[i] = utterance.dialogue_act.value
+        self.__question_types[i] = -1 if utterance.question_type is None \
+            else utterance.question_type.value
+        self.__sentiments[i] = utterance.sentiment
+        self.__assertiveness[i] = utterance.assertiveness
+        self.__speaker_column[i] = self.__intern(utterance.speaker,
+            self.__speakers, self.__speaker_ids)
+        self.__topic_column[i] = self.__intern(utterance.topic,
+            self.__topics, self.__topic_ids)
+        self.__topic_to_utterances.setdefault(utterance.topic, []).append(i)
+        self.__texts.append(utterance.text)
+        self.__length += 1
+        if self.__listeners:
+            self.__listeners.notify(self, i, utterance)
+        return i
+
+    def subscribe(self, listener):
+        """
+        Calls the listener with the conversation, sequence id and Utterance of
+        every utterance added from now on. Bound methods are held weakly, see
+        Listeners.
+        """
+        self.__listeners.add(listener)
+
+    @staticmethod
+    def __intern(value, table, ids):
+        """ Helper function of the id of the value in its table """
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = len(table)
+            ids[value] = value_id
+            table.append(value)
+        return value_id
+
+    def add_participant(self, participant):
+        self.__participants.add(participant)
+
+    def __str__(self):
+        s = "Utterances:\n"
+        for u in self.materialize():
+            s += str(u)
+
+        s += "\nParticipants:\n"
+        for p in self.__participants:
+            s += str(p) + " "
+
+        return s.strip()
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __copy__(self):
+        conversation = ColumnarConversation(self.participants.snapshot(),
+            capacity=len(self.__added_at))
+        conversation.__length = self.__length
+        conversation.__in_order = self.__in_order
+        for new, old in zip(conversation.__columns(), self.__columns()):
+            new[:self.__length] = old[:self.__length]
+        conversation.__texts = self.__texts.copy()
+        conversation.__speakers = self.__speakers.copy()
+        conversation.__speaker_ids = self.__speaker_ids.copy()
+        conversation.__topics = self.__topics.copy()
+        conversation.__topic_ids = self.__topic_ids.copy()
+        conversation.__topic_to_utterances = {topic: sequence_ids.copy()
+            for topic, sequence_ids in self.__topic_to_utterances.items()}
+        conversation.__phrase_bags = {key: bag.copy()
+            for key, bag in self.__phrase_bags.items()}
+        return conversation
+
+    def copy(self):
+        return self.__copy__()
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, (Conversation, ColumnarConversation))
+            and self.participants == other.participants
+            and len(self) == len(other)
+            and self.utterances.snapshot() == other.utterances.snapshot()
+            and self.topic_to_utterances == other.topic_to_utterances
+        )
+
+    # ColumnarConversation is mutable, therefore not hashable by Python
+    # standards
+
+    def __dict__(self):
+        return {
+            "participants": self.__participants,
+            "utterances": self.utterances.snapshot(),
+            "topic_to_utterances": self.topic_to_utterances.snapshot()
+        }
+
+class InvertedIndex(object):
+    """
+    Inverted index of the values of an Utterance attribute to the Timeline of
+    their utterances across conversations.
+
+    :param attribute: str name of the Utterance attribute, "topic" or
+        "speaker"
+    :param table: InternTable of the value ids, defaults to a new one
+    """
+    def __init__(self, attribute, table=None):
+        self.__attribute = attribute
+        self.__table = InternTable() if table is None else table
+        # value id to Timeline
+        self.__timelines = {}
+
+    @property
+    def attribute(self):
+        return self.__attribute
+
+    @property
+    def table(self):
+        return self.__table
+
+    def add_utterance(self, conversation_id, position, utterance, time=None):
+        """
+        Indexes the Utterance at the position of the conversation.
+
+        :param time: int microseconds of the utterance, if already known
+        """
+        value_id = self.__table.intern(getattr(utterance, self.__attribute))
+        timeline = self.__timelines.get(value_id)
+        if timeline is None:
+            timeline = self.__timelines[value_id] = Timeline()
+        timeline.append(microseconds(utterance.date_time) if time is None
+            else time, conversation_id << 32 | position)
+
+    def add_conversation(self, conversation_id, conversation, times):
+        """
+        Indexes all utterances of the Conversation.
+
+        :param times: int64 numpy array of the microseconds of the utterances
+        """
+        if isinstance(conversation, ColumnarConversation):
+            # Maps the local ids of the columns to those of the table
+            value_ids = np.array([self.__table.intern(value) for value
+                in getattr(conversation, self.__attribute + "s")] or [0],
+                dtype=np.int64)[getattr(conversation,
+                self.__attribute + "_ids")]
+        else:
+            values = [getattr(conversation.utterance(i), self.__attribute)
+                for i in range(len(conversation))]
+            ids = {value: self.__table.intern(value) for value in set(values)}
+            value_ids = np.array([ids[value] for value in values],
+                dtype=np.int64)
+
+        postings = np.arange(len(value_ids), dtype=np.int64) \
+            | (conversation_id << 32)
+        order = np.argsort(value_ids, kind="stable")
+        value_ids = value_ids[order]
+        starts = np.flatnonzero(np.diff(value_ids, prepend=-1)).tolist()
+        for start, end in zip(starts, starts[1:] + [len(value_ids)]):
+            value_id = int(value_ids[start])
+            timeline = self.__timelines.get(value_id)
+            if timeline is None:
+                timeline = self.__timelines[value_id] = Timeline()
+            timeline.add(times[order[start:end]], postings[order[start:end]])
+
+    def find(self, values, start=None, end=None):
+        """
+        The postings of the utterances of any of the values from the start up
+        to, excluding, the end, merged in order of time.
+
+        :param values: iterable of the values, e.g. str topics
+        :return: tuple of the int64 numpy arrays of the times and postings
+        """
+        ranges = []
+        for value in values:
+            timeline = self.__timelines.get(self.__table.get_id(value))
+            if timeline is not None:
+                ranges.append(timeline.range(start, end))
+        if not ranges:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if len(ranges) == 1:
+            return ranges[0]
+        times = np.concatenate([r[0] for r in ranges])
+        postings = np.concatenate([r[1] for r in ranges])
+        # Timsort merges the sorted runs of the concatenated ranges
+        order = np.argsort(times, kind="stable")
+        return times[order], postings[order]
+
+    def count(self, values, start=None, end=None):
+        """
+        The number of utterances of any of the values from the start up to,
+        excluding, the end, in logarithmic time.
+        """
+        count = 0
+        for value in values:
+            timeline = self.__timelines.get(self.__table.get_id(value))
+            if timeline is not None:
+                count += timeline.count(start, end)
+        return count
+
+    def contains(self, values, times, postings):
+        """
+        Whether each posting is of an utterance of any of the values, in
+        logarithmic time per posting and value.
+
+        :param times: int64 numpy array of the microseconds of the postings
+        :param postings: int64 numpy array of the postings, see find
+        :return: bool numpy array
+        """
+        found = np.zeros(len(postings), dtype=bool)
+        for value in values:
+            timeline = self.__timelines.get(self.__table.get_id(value))
+            if timeline is not None:
+                found |= timeline.contains(times, postings)
+        return found
+
+    def values(self):
+        """ List of the values with indexed utterances """
+        return [self.__table.value(value_id) for value_id
+            in self.__timelines]
+
+    def postings(self, *values):
+        """ The postings of the utterances of any of the values """
+        return self.find(values)[1]
+
+    @staticmethod
+    def unpack(postings):
+        """
+        Splits packed postings into their conversation ids and positions.
+
+        :return: tuple of the int64 numpy arrays of the conversation ids and
+            the utterance positions
+        """
+        return postings >> 32, postings & 0xFFFFFFFF
+
+class TopicIndex(InvertedIndex):
+    """
+    Inverted index of the topics of utterances across conversations.
+
+    :param table: InternTable of the topic ids, defaults to topic_table
+    """
+    def __init__(self, table=None):
+        super().__init__("topic", topic_table if table is None else table)
+
 class ConversationHistory(object):
-    """ A history of conversations between participants and associated data """
-    def __init__(self, conversations=OrderedDict(),
-            topic_to_conversations=None):
+    """
+    A history of conversations between participants and associated data.
+
+    Every conversation gets the next int sequence id of the history, its
+    position in it. The times they were added at are indexed separately, see
+    conversations_between.
+
+    The history subscribes to its conversations, so utterances added to them
+    later are indexed as they are added, see check_indices.
+    """
+    def __init__(self, conversations=None, topic_to_conversations=None):
         """
-        :param conversations: OrderedDict of datetime to Conversation objects
-        :param topic_to_conversations: Dict of str "topic" to list(datetime) of
-            conversations under this topic in conversation history.
+        :param conversations: Mapping of int sequence id to Conversation
+            objects, or sequence of Conversation objects. The conversations
+            are numbered in order from 0.
+        :param topic_to_conversations: Dict of str "topic" to list(int) of
+            sequence ids of conversations under this topic in conversation
+            history.
         """
-        self.__conversations = conversations
+        self.__conversations = self.__numbered(conversations)
+        self.__create_times()
 
         if topic_to_conversations is None:
             self.create_topic_to_conversations()
         else:
             assert(isinstance(topic_to_conversations, dict))
             self.__topic_to_conversations = topic_to_conversations
+            self.__create_topic_index()
+
+    @staticmethod
+    def __numbered(conversations):
+        """ Helper function numbering the conversations in order from 0 """
+        if conversations is None:
+            return {}
+        if isinstance(conversations, Mapping):
+            conversations = conversations.values()
+        return dict(enumerate(conversations))
+
+    @staticmethod
+    def __start(conversation):
+        """ Helper function of the date_time of the first utterance, or now """
+        if len(conversation) == 0:
+            return datetime.now()
+        return conversation.utterance(0).date_time
+
+    def __create_times(self):
+        """ Helper function indexing the conversations by their start """
+        self.__times = Timeline()
+        for conversation_id, conversation in self.__conversations.items():
+            self.__times.append(microseconds(self.__start(conversation)),
+                conversation_id)
 
     @property
     def conversations(self):
-        return self.__conversations.copy()
+        """
+        ReadOnlyMapping of int sequence id to Conversation, see snapshot for a
+        copy
+        """
+        return ReadOnlyMapping(self.__conversations)
 
     @property
-    def topic_to_conversations():
-        return self.__topic_to_conversations.copy()
+    def topic_to_conversations(self):
+        """
+        ReadOnlyMapping of str topic to the sequence ids of its
+        conversations, see snapshot for a copy
+        """
+        return ReadOnlyMapping(self.__topic_to_conversations)
 
     @property
     def last_conversation(self):
         """ Peeks at last entered utterance """
-        return self.__conversations[next(reversed(self.__conversations))].copy()
+        return self.__conversations[len(self.__conversations) - 1].copy()
+
+    def conversations_between(self, start=None, end=None):
+        """
+        The conversations added from the start up to, excluding, the end, in
+        order of the times they were added at.
 
-    def get_utterances_from_topic(self, topic):
+        :param start: datetime, None for the first conversation
+        :param end: datetime, None for after the last conversation
+        :return: list of Conversations
+        """
+        _, conversation_ids = self.__times.range(start, end)
+        return [self.__conversations[i] for i in conversation_ids.tolist()]
+
+    @property
+    def topic_index(self):
+        """TopicIndex of the utterances of the conversations"""
+        return self.__topic_index
+
+    @property
+    def speaker_index(self):
+        """InvertedIndex of the speakers of the utterances"""
+        return self.__speaker_index
+
+    def get_utterances_from_topic(self, topic, start=None, end=None):
         """ return all topic related utterances from all conversations
-        :return OrderedDict<datetime, Utterance>: OrderedDict of datetime to
-            Utterance.
-        """
-        # TODO handle duplicate time_stamps across and w/in Conversations
-        utterances = OrderedDict()
-        for conv in self.__topic_to_conversations[topic]:
-            for u_date_time in conversations[conv].topic_to_utterances[topic]:
-                utterances.update(
-                    {u_date_time:conversations[conv].utterances[u_date_time]}
-                )
-        return utterances
+        :param start: datetime of the first utterances, None for all
+        :param end: datetime up to, excluding, which to return utterances,
+            None for all
+        :return OrderedDict<(int, int), Utterance>: OrderedDict of the
+            sequence ids of the conversation and of the utterance in it to
+            Utterance, in order of the date_times of the utterances.
+        """
+        conversation_ids, sequence_ids = InvertedIndex.unpack(
+            self.__find_postings([topic], None, start, end))
+        conversations = self.__conversations
+        return OrderedDict(((c, i), conversations[c].utterance(i)) for c, i
+            in zip(conversation_ids.tolist(), sequence_ids.tolist()))
+
+    def utterances_about(self, *topics):
+        """ All utterances of any of the str topics, see find_utterances """
+        return self.find_utterances(topics)
+
+    def find_utterances(self, topics=None, speakers=None, start=None,
+            end=None):
+        """
+        Utterances of all conversations by topic, speaker and time. The
+        indices are sorted by the times of the utterances, so a query takes
+        logarithmic time in the size of the history plus the size of its
+        result. Queries of both topics and speakers find the smaller of the
+        two results and binary search each of its utterances in the other
+        index, so they take logarithmic time per utterance of the smaller.
+
+        :param topics: iterable of str topics of the utterances, None for any
+        :param speakers: iterable of str speakers of the utterances, None for
+            any
+        :param start: datetime of the first utterances, None for all
+        :param end: datetime up to, excluding, which to find utterances, None
+            for all
+        :return: list of Utterances in order of their date_time
+        """
+        conversation_ids, sequence_ids = InvertedIndex.unpack(
+            self.__find_postings(topics, speakers, start, end))
+        conversations = self.__conversations
+        return [conversations[c].utterance(i) for c, i
+            in zip(conversation_ids.tolist(), sequence_ids.tolist())]
+
+    def __find_postings(self, topics, speakers, start, end):
+        """ Helper function of the postings of find_utterances """
+        if topics is None and speakers is None:
+            _, postings = self.__timeline.range(start, end)
+        elif speakers is None:
+            _, postings = self.__topic_index.find(topics, start, end)
+        elif topics is None:
+            _, postings = self.__speaker_index.find(speakers, start, end)
+        else:
+            # The smaller of the two results is probed in the other index.
+            topics, speakers = list(topics), list(speakers)
+            (index, values), (other, other_values) = sorted([
+                (self.__topic_index, topics),
+                (self.__speaker_index, speakers)
+            ], key=lambda pair: pair[0].count(pair[1], start, end))
+            times, postings = index.find(values, start, end)
+            postings = postings[other.contains(other_values, times, postings)]
+        return postings
 
     def add_conversation(self, conversation, date_time=None):
-        assert isinstance(conversation, Conversation)
+        """
+        Adds the conversation as the last of the history.
+
+        :param date_time: datetime the conversation was added at, defaults to
+            the date_time of its first utterance, or now if it has none
+        :return: int sequence id of the conversation
+        """
+        assert isinstance(conversation, (Conversation, ColumnarConversation))
         if date_time is None:
-            date_time = datetime.now()
+            date_time = self.__start(conversation)
         assert isinstance(date_time, datetime)
-        self.__conversations[date_time] = conversation
-        self.__add_conversation_to_topic(conversation, date_time)
-
-    def __add_conversation_to_topic(self, conversation, date_time):
+        conversation_id = len(self.__conversations)
+        self.__conversations[conversation_id] = conversation
+        self.__times.append(microseconds(date_time), conversation_id)
+        self.__add_conversation_to_topic(conversation, conversation_id)
+        self.__add_conversation_to_index(conversation, conversation_id)
+        self.__watch(conversation, conversation_id)
+        return conversation_id
+
+    def __add_conversation_to_topic(self, conversation, conversation_id):
         """Helper function to update topic_to_conversations dict"""
-        for utterance in conversation.utterances.values():
-            if utterance.topic in self.__topic_to_conversations.keys():
-                self.__topic_to_conversations[utterance.topic].append(date_time)
-            else:
-                self.__topic_to_conversations[utterance.topic] = [date_time]
+        for topic in conversation.topic_to_utterances:
+            self.__add_topic_conversation(topic, conversation_id)
+
+    def __add_topic_conversation(self, topic, conversation_id):
+        """Helper function adding a conversation to a topic, once"""
+        if (topic, conversation_id) in self.__topic_pairs:
+            return
+        self.__topic_pairs.add((topic, conversation_id))
+        if topic in self.__topic_to_conversations.keys():
+            self.__topic_to_conversations[topic].append(conversation_id)
+        else:
+            self.__topic_to_conversations[topic] = [conversation_id]
 
-    # TODO update_conversation_to_topic(self): update if conversations include new topics
+    def __add_utterance(self, conversation, sequence_id, utterance):
+        """
+        Listener to the conversations, indexing an added utterance in O(1)
+        """
+        time = microseconds(utterance.date_time)
+        for conversation_id in self.__ids.get(id(conversation), ()):
+            self.__add_topic_conversation(utterance.topic, conversation_id)
+            self.__timeline.append(time, conversation_id << 32 | sequence_id)
+            self.__topic_index.add_utterance(conversation_id, sequence_id,
+                utterance, time)
+            self.__speaker_index.add_utterance(conversation_id, sequence_id,
+                utterance, time)
+
+    def __watch(self, conversation, conversation_id):
+        """Helper function subscribing to the conversation's utterances"""
+        # A conversation may be in the history more than once
+        self.__ids.setdefault(id(conversation), []).append(conversation_id)
+        conversation.subscribe(self.__add_utterance)
+
+    def __add_conversation_to_index(self, conversation, conversation_id):
+        """Helper function to add the conversation to the indices"""
+        if isinstance(conversation, ColumnarConversation):
+            times = conversation.date_times.astype(np.int64)
+        else:
+            times = microseconds([conversation.utterance(i).date_time
+                for i in range(len(conversation))])
+        self.__timeline.add(times, np.arange(len(times), dtype=np.int64)
+            | (conversation_id << 32))
+        self.__topic_index.add_conversation(conversation_id, conversation,
+            times)
+        self.__speaker_index.add_conversation(conversation_id, conversation,
+            times)
+
+    def __create_topic_index(self):
+        """Helper function to create the indices of the conversations"""
+        self.__topic_pairs = {(topic, conversation_id) for topic,
+            conversation_ids in self.__topic_to_conversations.items()
+            for conversation_id in conversation_ids}
+        self.__timeline = Timeline()
+        self.__topic_index = TopicIndex()
+        self.__speaker_index = InvertedIndex("speaker")
+        # id of a Conversation object to its ids in the history
+        self.__ids = {}
+        for conversation_id, conversation in self.__conversations.items():
+            self.__add_conversation_to_index(conversation, conversation_id)
+            self.__watch(conversation, conversation_id)
 
     def create_topic_to_conversations(self):
         """ Helper function to create the topic_to_conversations dictionary """
         self.__topic_to_conversations = {}
+        self.__topic_pairs = set()
         for k,u in self.__conversations.items():
             self.__add_conversation_to_topic(u, k)
+        self.__create_topic_index()
+
+    def check_indices(self):
+        """
+        Checks the incrementally maintained topic_to_conversations and
+        indices against ones rebuilt from all conversations. Slow, meant for
+        tests and debugging.
+
+        :return: Bool whether they match
+        """
+        rebuilt = ConversationHistory(list(self.__conversations.values()))
+
+        def topics(history):
+            return {topic: set(conversation_ids) for topic, conversation_ids
+                in history.__topic_to_conversations.items()}
+
+        def postings(history):
+            timeline = np.sort(history.__timeline.range()[1])
+            return [timeline] + [{value: np.sort(index.find([value])[1])
+                for value in index.values()} for index
+                in (history.__topic_index, history.__speaker_index)]
+
+        if topics(self) != topics(rebuilt):
+            return False
+        mine, theirs = postings(self), postings(rebuilt)
+        return np.array_equal(mine[0], theirs[0]) and all(
+            a.keys() == b.keys()
+            and all(np.array_equal(a[k], b[k]) for k in a)
+            for a, b in zip(mine[1:], theirs[1:]))
 
     # TODO
     def topic_to_conversations_to_string(self):
@@ -504,7 +1764,7 @@ class ConversationHistory(object):
 
     def __str__(self):
         s = "Conversations:\n"
-        for convo in self.conversations:
+        for convo in self.__conversations.values():
             s += str(convo)
         return s
 
@@ -512,10 +1772,12 @@ class ConversationHistory(object):
         return self.__str__()
 
     def __copy__(self):
-        return ConversationHistory(
-            self.conversations,
-            self.topic_to_conversations
+        conversation_history = ConversationHistory(
+            self.conversations.snapshot(),
+            self.topic_to_conversations.snapshot()
         )
+        conversation_history.__times = self.__times.copy()
+        return conversation_history
 
     def copy(self):
         return self.__copy__()
@@ -535,30 +1797,201 @@ class ConversationHistory(object):
         overwriting existing data.
         """
         # TODO make extract dict overwrite the ConversationHistory's data
-        self.__conversations = ch_dict["conversations"]
+        self.__conversations = self.__numbered(ch_dict["conversations"])
+        self.__create_times()
         if "topic_to_conversations" in ch_dict.keys():
-            topic_to_conversations = ch_dict["topic_to_conversations"]
+            self.__topic_to_conversations = ch_dict["topic_to_conversations"]
+            self.__create_topic_index()
         else:
             self.create_topic_to_conversations()
 
 
     def save_json(self, json_output_path):
-        """ Save Conversation History as JSON at provided path """
+        """
+        Save Conversation History as JSON at provided path, see
+        dump_conversation_history
+        """
         # TODO add unique name to each ConversationHistory when saved including:
         # str(date_time) + "_" + str(personas)
         #conversation_history_id = str(participants)
         with open(json_output_path, 'w', encoding='utf-8') as json_output:
-            json.dump(
-                {"conversation_history":vars(self)},
-                json_output,
-                ensure_ascii=False,
-                indent=4,
-                sort_keys=True
-            )
+            dump_conversation_history(self, json_output)
 
     # TODO implement constructor with only str json path
     def load_json(self, json_path):
         """ Loads the ConversationHistory.json, overwrites existing data """
         with open(json_path, encoding='utf-8') as json_conversation_history:
-            dict_conversation_history = json.load(json_conversation_history)
-            self.extract_dict(dict_conversation_history)
+            conversation_history = load_conversation_history(
+                json_conversation_history)
+        self.extract_dict(
+            {"conversations": conversation_history.conversations})
+
+# JSON serialization
+#
+# A conversation history is saved as
+#   {"conversation_history": {"version": 1, "utterance_fields": [...],
+#       "conversations": [conversation, ...]}}
+# and a single conversation as {"conversation": conversation}, where a
+# conversation is
+#   {"participants": [str, ...], "columnar": Bool, "utterances": [record, ...]}
+# and every utterance a record of UTTERANCE_FIELDS, with the enums as their
+# int values, a null question_type if it has none, and the date_time as int
+# microseconds since the epoch. Utterances are encoded in chunks straight to
+# the file, and decoded with Utterance.trusted_many.
+#
+# The times utterances and conversations were added at are not saved, they
+# default to the date_time of the utterance and first utterance when loaded.
+
+JSON_VERSION = 1
+UTTERANCE_FIELDS = ("speaker", "dialogue_act", "topic", "sentiment",
+    "assertiveness", "text", "question_type", "date_time")
+
+_encoder = json.JSONEncoder(ensure_ascii=False, check_circular=False,
+    separators=(",", ":"))
+
+@contextmanager
+def _gc_paused():
+    """
+    Helper context pausing the garbage collector, which the many new objects
+    of decoding would otherwise trigger to find nothing to collect.
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+def _utterance_records(conversation, start, end):
+    """ Helper function of the records of the utterances from start to end """
+    if isinstance(conversation, ColumnarConversation):
+        speakers = conversation.speakers
+        topics = conversation.topics
+        speaker_ids = conversation.speaker_ids[start:end].tolist()
+        topic_ids = conversation.topic_ids[start:end].tolist()
+        return list(zip(
+            [speakers[i] for i in speaker_ids],
+            conversation.dialogue_acts[start:end].tolist(),
+            [topics[i] for i in topic_ids],
+            conversation.sentiments[start:end].tolist(),
+            conversation.assertiveness[start:end].tolist(),
+            conversation.texts[start:end],
+            [None if q < 0 else q
+                for q in conversation.question_types[start:end].tolist()],
+            conversation.date_times[start:end].astype(np.int64).tolist()
+        ))
+    # _value_ rather than the much slower value property of the enums
+    return [(
+        speaker,
+        dialogue_act._value_,
+        topic,
+        sentiment,
+        assertiveness,
+        text,
+        None if question_type is None else question_type._value_,
+        (naive_utc(date_time) - _EPOCH) // _MICROSECOND
+    ) for (speaker, dialogue_act, topic, sentiment, assertiveness, text,
+        question_type, date_time)
+        in (conversation.utterance(i).record() for i in range(start, end))]
+
+def _write_conversation(conversation, json_output, chunk_size):
+    """ Helper function encoding the conversation to the file """
+    json_output.write('{"participants":')
+    json_output.write(_encoder.encode(sorted(conversation.participants)))
+    json_output.write(',"columnar":')
+    json_output.write(_encoder.encode(
+        isinstance(conversation, ColumnarConversation)))
+    json_output.write(',"utterances":[')
+    for start in range(0, len(conversation), chunk_size):
+        if start:
+            json_output.write(",")
+        # Without the brackets of the chunk's list
+        json_output.write(_encoder.encode(_utterance_records(conversation,
+            start, min(start + chunk_size, len(conversation))))[1:-1])
+    json_output.write("]}")
+
+def dump_conversation(conversation, json_output, chunk_size=4096):
+    """
+    Writes the Conversation as JSON to the file.
+
+    :param json_output: text file opened for writing
+    :param chunk_size: int number of utterances encoded at a time
+    """
+    json_output.write('{"conversation":')
+    _write_conversation(conversation, json_output, chunk_size)
+    json_output.write("}")
+
+def dump_conversation_history(conversation_history, json_output,
+        chunk_size=4096):
+    """
+    Writes the ConversationHistory as JSON to the file, one conversation and
+    chunk of utterances at a time.
+
+    :param json_output: text file opened for writing
+    :param chunk_size: int number of utterances encoded at a time
+    """
+    json_output.write('{"conversation_history":{"version":')
+    json_output.write(_encoder.encode(JSON_VERSION))
+    json_output.write(',"utterance_fields":')
+    json_output.write(_encoder.encode(UTTERANCE_FIELDS))
+    json_output.write(',"conversations":[')
+    for i, conversation in enumerate(
+            conversation_history.conversations.values()):
+        if i:
+            json_output.write(",")
+        _write_conversation(conversation, json_output, chunk_size)
+    json_output.write("]}}")
+
+def _read_conversation(conversation_dict):
+    """ Helper function decoding a conversation """
+    records = conversation_dict["utterances"]
+    dialogue_acts = {da.value: da for da in DialogueAct}
+    question_types = {qt.value: qt for qt in QuestionType}
+    question_types[None] = None
+    if records:
+        (speakers, dialogue_act_values, topics, sentiments, assertiveness,
+            texts, question_type_values, date_times) = zip(*records)
+    else:
+        speakers = dialogue_act_values = topics = sentiments = \
+            assertiveness = texts = question_type_values = date_times = ()
+    try:
+        utterances = Utterance.trusted_many(zip(
+            speakers,
+            [dialogue_acts[v] for v in dialogue_act_values],
+            [sys.intern(t) for t in topics],
+            sentiments,
+            assertiveness,
+            texts,
+            [question_types[v] for v in question_type_values],
+            np.array(date_times, dtype=np.int64).astype(
+                "datetime64[us]").tolist()
+        ))
+    except KeyError as error:
+        raise ValueError("Unknown enum value " + str(error))
+
+    participants = set(conversation_dict["participants"])
+    if conversation_dict.get("columnar"):
+        return ColumnarConversation(participants, utterances,
+            max(len(utterances), 16))
+    return Conversation(participants, utterances)
+
+def load_conversation(json_input):
+    """ Reads a Conversation written by dump_conversation from the file """
+    with _gc_paused():
+        return _read_conversation(json.load(json_input)["conversation"])
+
+def load_conversation_history(json_input):
+    """
+    Reads a ConversationHistory written by dump_conversation_history from
+    the file.
+    """
+    with _gc_paused():
+        history_dict = json.load(json_input)["conversation_history"]
+        if history_dict.get("version") != JSON_VERSION \
+                or tuple(history_dict["utterance_fields"]) \
+                != UTTERANCE_FIELDS:
+            raise ValueError("Unsupported conversation history version "
+                + str(history_dict.get("version")))
+        return ConversationHistory([_read_conversation(conversation_dict)
+            for conversation_dict in history_dict["conversations"]])
@@ -0,0 +1,78 @@
+"""
+Walker's alias method for sampling a discrete distribution in constant time.
+
+The table is built once in O(K) time with Vose's algorithm. Each sample then
+costs one uniform draw, one index and one comparison, regardless of the number
+of outcomes, and allocates nothing.
+"""
+
+import numpy as np
+
+class AliasTable(object):
+    """
+    Alias table of a discrete distribution over the given outcomes. Outcomes
+    with zero probability are left out of the table and can never be drawn.
+
+    :param probabilities: iterable of the non-negative weights of outcomes
+    :param outcomes: sequence of the outcomes returned by sample()
+    """
+    __slots__ = ("__outcomes", "__alias", "__threshold", "__size")
+
+    def __init__(self, probabilities, outcomes):
+        probabilities = [float(p) for p in probabilities]
+        if len(probabilities) != len(outcomes):
+            raise ValueError("AliasTable needs one probability per outcome")
+        if any(p < 0 for p in probabilities):
+            raise ValueError("AliasTable probabilities must be non-negative")
+
+        kept = [i for i, p in enumerate(probabilities) if p > 0]
+        if not kept:
+            raise ValueError("AliasTable needs an outcome of non-zero "
+                + "probability")
+        total = sum(probabilities[i] for i in kept)
+        size = len(kept)
+
+        scaled = [probabilities[i] * size / total for i in kept]
+        threshold = [1.0] * size
+        alias = list(range(size))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            threshold[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever remains is 1 up to rounding error, so keeps threshold 1.
+
+        self.__outcomes = tuple(outcomes[i] for i in kept)
+        self.__alias = alias
+        self.__threshold = threshold
+        self.__size = size
+
+    @property
+    def outcomes(self):
+        """Tuple of the outcomes of non-zero probability"""
+        return self.__outcomes
+
+    def __len__(self):
+        return self.__size
+
+    def sample(self, u=None):
+        """
+        Samples one outcome.
+
+        :param u: float uniform [0, 1) random value, drawn if not given
+        """
+        if u is None:
+            u = np.random.random_sample()
+        u *= self.__size
+        i = int(u)
+        if u - i >= self.__threshold[i]:
+            i = self.__alias[i]
+        return self.__outcomes[i]
@@ -0,0 +1,287 @@
+"""
+Process-wide provider of the dialogue act response matrix used by the static
+intelligent agents.
+
+The matrix file is a csv whose header and first column are DialogueAct names.
+Each column is the incoming dialogue act and each row is the weight of
+responding with that row's dialogue act. The matrix is loaded, validated and
+column normalized once per process, and is only reloaded when the file's
+modification time changes.
+
+A persona may use its own matrix through the "response_matrix" behavior of its
+personality profile, either the path of a matrix file or a blend of several:
+
+    "response_matrix": {"blend": [
+        {"matrix": "<path>", "weight": 1},
+        {"matrix": "<path>", "weight": {"bias": 0, "mood": 0.1,
+            "assertiveness": 0.05}}
+    ]}
+
+where a weight is either a number or linear in the persona's personality
+traits, clipped to be non-negative.
+"""
+
+from collections import OrderedDict
+import csv
+import os
+import threading
+import numpy as np
+from conversation import DialogueAct as DA
+from intelligent_agent.alias_table import AliasTable
+
+DA_MATRIX_PATH = "../data/da_matrix.csv"
+
+class DAMatrix(object):
+    """
+    A column stochastic matrix of response dialogue acts given the incoming
+    dialogue act, with the per column cumulative distributions precomputed.
+
+    :param weights: 2d array where weights[i, j] is the weight of responding
+        with dialogue_acts[i] to the incoming dialogue_acts[j]
+    :param dialogue_acts: list of DialogueActs of both the rows and columns
+    :param path: str path of the file the matrix was loaded from, if any
+    :param mtime: int modification time in ns of the file at path, if any
+    """
+    def __init__(self, weights, dialogue_acts, path=None, mtime=None):
+        weights = np.array(weights, dtype=np.float64)
+        dialogue_acts = tuple(dialogue_acts)
+
+        if weights.ndim != 2 or weights.shape[0] != weights.shape[1]:
+            raise ValueError("DA matrix must be square, not of shape "
+                + str(weights.shape))
+        if weights.shape[0] != len(dialogue_acts):
+            raise ValueError("DA matrix has " + str(weights.shape[0])
+                + " rows, but " + str(len(dialogue_acts)) + " dialogue acts")
+        if not all(isinstance(da, DA) for da in dialogue_acts):
+            raise ValueError("DA matrix labels must all be DialogueActs")
+        if len(set(dialogue_acts)) != len(dialogue_acts):
+            raise ValueError("DA matrix labels contain duplicates")
+        if not np.all(np.isfinite(weights)) or np.any(weights < 0):
+            raise ValueError(
+                "DA matrix weights must be finite and non-negative")
+
+        totals = weights.sum(axis=0)
+        if np.any(totals <= 0):
+            raise ValueError("DA matrix has no response for the incoming "
+                + "dialogue acts: " + str([dialogue_acts[i].name
+                    for i in np.flatnonzero(totals <= 0)]))
+
+        probabilities = weights / totals
+        probabilities.setflags(write=False)
+
+        # Transposed so each incoming dialogue act's cdf is contiguous. The
+        # cdf is pinned to 1 from each last possible response onwards so that
+        # rounding never selects a response of zero probability.
+        cdf = np.cumsum(probabilities.T, axis=1)
+        size = len(dialogue_acts)
+        last_response = size - 1 - np.argmax(probabilities.T[:, ::-1] > 0,
+            axis=1)
+        cdf[np.arange(size)[None, :] >= last_response[:, None]] = 1.0
+        cdf.setflags(write=False)
+
+        # Every cdf offset by its row index, flattened into one increasing
+        # array to sample many incoming dialogue acts with one searchsorted.
+        flat_cdf = (cdf + np.arange(size)[:, None]).ravel()
+
+        self.__probabilities = probabilities
+        self.__cdf = cdf
+        self.__flat_cdf = flat_cdf
+        self.__last_response = last_response
+        self.__alias_tables = {}
+        self.__dialogue_acts = dialogue_acts
+        self.__index = {da: i for i, da in enumerate(dialogue_acts)}
+        self.__path = path
+        self.__mtime = mtime
+
+    @property
+    def probabilities(self):
+        """Read-only column normalized matrix"""
+        return self.__probabilities
+
+    @property
+    def cdf(self):
+        """Read-only cumulative distributions, one row per incoming DA"""
+        return self.__cdf
+
+    @property
+    def dialogue_acts(self):
+        """Tuple of DialogueActs labeling the rows and columns"""
+        return self.__dialogue_acts
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def mtime(self):
+        return self.__mtime
+
+    def index(self, dialogue_act):
+        """ The row and column index of the dialogue act """
+        return self.__index[dialogue_act]
+
+    def column(self, dialogue_act):
+        """ Response probabilities given the incoming dialogue act """
+        return self.__probabilities[:, self.__index[dialogue_act]]
+
+    def sample(self, dialogue_act, u=None):
+        """
+        Samples the response dialogue act to the incoming dialogue act.
+
+        :param dialogue_act: incoming DialogueAct being responded to
+        :param u: float uniform [0, 1) random value, drawn if not given
+        :return: DialogueAct of the response
+        """
+        if u is None:
+            u = np.random.random_sample()
+        cdf = self.__cdf[self.__index[dialogue_act]]
+        i = int(np.searchsorted(cdf, u, side="right"))
+        return self.__dialogue_acts[min(i, len(self.__dialogue_acts) - 1)]
+
+    def alias_table(self, dialogue_act):
+        """
+        The AliasTable of responses to the incoming dialogue act, built on
+        first use and kept for the lifetime of this matrix. Since a reloaded
+        or persona specific matrix is a new DAMatrix, its tables are too.
+        """
+        table = self.__alias_tables.get(dialogue_act)
+        if table is None:
+            table = AliasTable(self.column(dialogue_act), self.__dialogue_acts)
+            self.__alias_tables[dialogue_act] = table
+        return table
+
+    def sample_many(self, dialogue_acts, u=None):
+        """
+        Samples the response dialogue act to each of the incoming dialogue
+        acts in one vectorized draw.
+
+        :param dialogue_acts: iterable of incoming DialogueActs
+        :param u: array of uniform [0, 1) random values, drawn if not given
+        :return: list of DialogueActs of the responses
+        """
+        rows = np.fromiter((self.__index[da] for da in dialogue_acts),
+            dtype=np.intp)
+        if u is None:
+            u = np.random.random_sample(len(rows))
+
+        size = len(self.__dialogue_acts)
+        responses = np.searchsorted(self.__flat_cdf, rows + u, side="right") \
+            - rows * size
+        # rows + u may round up to the next row's offset when u is near 1
+        overflow = responses >= size
+        responses[overflow] = self.__last_response[rows[overflow]]
+
+        return [self.__dialogue_acts[i] for i in responses]
+
+def load_da_matrix(path=DA_MATRIX_PATH):
+    """
+    Loads and validates the DA matrix csv at the given path.
+
+    :param path: str path to the csv file of the DA matrix
+    :return: DAMatrix of the file's contents
+    """
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, newline="") as f_matrix:
+        rows = list(csv.reader(f_matrix))
+
+    if len(rows) < 2:
+        raise ValueError("DA matrix file is empty: " + path)
+
+    header = [name.strip() for name in rows[0][1:]]
+    row_names = [row[0].strip() for row in rows[1:]]
+    if header != row_names:
+        raise ValueError("DA matrix row and column labels differ: " + path)
+
+    try:
+        dialogue_acts = [DA[name] for name in header]
+    except KeyError as unknown:
+        raise ValueError("DA matrix contains unknown dialogue act "
+            + str(unknown) + ": " + path)
+
+    try:
+        weights = [[float(x) for x in row[1:]] for row in rows[1:]]
+    except ValueError as err:
+        raise ValueError("DA matrix contains a non-numeric weight: " + path
+            + ": " + str(err))
+
+    return DAMatrix(weights, dialogue_acts, path, mtime)
+
+_da_matrices = {}
+
+def get_da_matrix(path=DA_MATRIX_PATH):
+    """
+    Returns the process-wide DAMatrix for the given path, only reloading it
+    when the file has been modified since it was last loaded.
+    """
+    da_matrix = _da_matrices.get(path)
+    if da_matrix is None or da_matrix.mtime != os.stat(path).st_mtime_ns:
+        da_matrix = load_da_matrix(path)
+        _da_matrices[path] = da_matrix
+    return da_matrix
+
+BLENDED_CACHE_SIZE = 256
+
+_blended_matrices = OrderedDict()
+_blended_lock = threading.Lock()
+
+def blend_weight(weight, personality):
+    """
+    The weight of a base matrix in a blend for the given Personality.
+
+    :param weight: number, or dict of "bias" and the coefficients of the
+        personality traits "mood" and "assertiveness"
+    :param personality: Personality of the persona the blend is for
+    """
+    if isinstance(weight, dict):
+        weight = weight.get("bias", 0) \
+            + weight.get("mood", 0) * personality.mood \
+            + weight.get("assertiveness", 0) * personality.assertiveness
+    return max(float(weight), 0.0)
+
+def blend_da_matrices(da_matrices, weights):
+    """
+    Blends the DAMatrices into one, weighting each matrix's response
+    probabilities by the given weights.
+    """
+    dialogue_acts = da_matrices[0].dialogue_acts
+    if any(m.dialogue_acts != dialogue_acts for m in da_matrices[1:]):
+        raise ValueError("Blended DA matrices must share their dialogue acts")
+    if sum(weights) <= 0:
+        raise ValueError("Blended DA matrices need a positive weight")
+
+    blend = sum(w * m.probabilities for m, w in zip(da_matrices, weights))
+    return DAMatrix(blend, dialogue_acts)
+
+def persona_da_matrix(persona):
+    """
+    Returns the DAMatrix of the persona. Blended matrices are kept in a
+    bounded LRU cache keyed by the versions and weights of their base
+    matrices, so switching among personas only blends a matrix when one of
+    its base files or the persona's personality has changed.
+
+    :param persona: Persona responding with the matrix
+    """
+    spec = persona.behavior.get("response_matrix")
+    if spec is None:
+        return get_da_matrix()
+    if isinstance(spec, str):
+        return get_da_matrix(spec)
+
+    da_matrices = [get_da_matrix(base["matrix"]) for base in spec["blend"]]
+    weights = [blend_weight(base.get("weight", 1), persona.personality)
+        for base in spec["blend"]]
+    key = tuple((m.path, m.mtime, w) for m, w in zip(da_matrices, weights))
+
+    with _blended_lock:
+        blended = _blended_matrices.get(key)
+        if blended is not None:
+            _blended_matrices.move_to_end(key)
+            return blended
+
+    blended = blend_da_matrices(da_matrices, weights)
+
+    with _blended_lock:
+        _blended_matrices[key] = blended
+        while len(_blended_matrices) > BLENDED_CACHE_SIZE:
+            _blended_matrices.popitem(last=False)
+    return blended
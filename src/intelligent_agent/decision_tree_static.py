@@ -7,17 +7,19 @@ based on hierarch:
         change topic / stay on topic
             passive / assertive tactic
 
+The tree itself is a declarative rule set, see rule_table, compiled into a
+dispatch table from the case of the last utterance to the actions below. Each
+persona may use its own rule set through the "decision_rules" behavior of its
+personality profile.
+
 :author: Derek S. Prijatelj
 """
 
-import csv
 import numpy as np
-import pandas
-#from scipy.stats import skewnorm
-from intelligent_agent import tactic
-from conversation import DialogueAct as DA, QuestionType, \
-    Utterance, is_question, is_statement, \
-    topic_is_self, topic_is_user, question_to_statement, statement_to_question
+from intelligent_agent import tactic, da_matrix, rule_table
+from intelligent_agent.bounded_trait import sample_trait
+from conversation import DialogueAct as DA, Utterance, \
+    question_to_statement, statement_to_question
 from nlg import nlg, generic_response
 
 def decision_tree_static(conversation, chatbot, user, personas=None):
@@ -32,28 +34,30 @@ def decision_tree_static(conversation, chatbot, user, personas=None):
     """
     last_utterance = conversation.last_utterance
 
-    # Assess mood and magnitude of change to mood necessary
-    mood_magnitude = chatbot.personality.mood - user.personality.mood
-
-    # Assess topic sentiment in relation to desired mood
-    topic_magnitude = user.topic_magnitude(
-        last_utterance.topic,
-        chatbot.personality.mood
-    )
-
-    # static reactions:
-    if last_utterance.dialogue_act == DA.farewell:
-        return farewell(chatbot)
-
     # TODO add ability to reference previous conversations for returning users
     # This is now doable through ConversationHistory objects
 
-    if len(conversation.topic_to_utterances.keys()) <= 1:
-        return new_conversation(conversation, chatbot, user, personas,
-            last_utterance)
-    else: # Ongoing Conversation
-        return ongoing_conversation(conversation, chatbot, user, personas,
-            last_utterance)
+    rules = rule_table.get_rule_table(
+        chatbot.behavior.get("decision_rules", rule_table.DEFAULT_RULES_PATH),
+        ACTIONS
+    )
+    phase = "new" if len(conversation.topic_to_utterances) <= 1 \
+        else "ongoing"
+    assertiveness = response_assertiveness(chatbot)
+
+    action = rules.lookup(
+        last_utterance.dialogue_act,
+        rule_table.topic_class(last_utterance.topic),
+        phase,
+        rule_table.assertiveness_band(assertiveness)
+    )
+    utterance = action(conversation, chatbot, user, personas, last_utterance,
+        assertiveness)
+
+    if utterance.text is None:
+        text = nlg.generate_response_text(utterance, chatbot, conversation)
+        utterance = utterance.with_text(text)
+    return utterance
 
 def change_topic(assertiveness, mood_magnitude, topic_magnitude,
         chatbot):
@@ -67,235 +71,184 @@ def change_topic(assertiveness, mood_magnitude, topic_magnitude,
     else:
         return abs(topic_magnitude) >= 3 and abs(mood_magnitude) >= 3
 
-def respond_passively(assertiveness, chatbot, user, mood_magnitude):
-    # TODO can calculate how much desire to be assertive based on chatbot & user
-    # ie. can play off user's own assertiveness to complement it.
-    # TODO mood may be affected by chatbot's assertiveness, esp. if deemed rude.
-    return assertiveness < 5
-
 def response_assertiveness(chatbot):
     """ determines how assertive the chatbot will respond """
-    assertiveness = np.random.normal(chatbot.personality.assertiveness, 2)
-    while assertiveness < 1 or assertiveness > 10:
-        assertiveness = np.random.normal(chatbot.personality.assertiveness, 2)
-
-    return assertiveness
+    return sample_trait(chatbot.personality.assertiveness)
 
 def response_sentiment(chatbot):
-    """ determines how assertive the chatbot will respond """
-    sentiment = np.random.normal(chatbot.personality.mood, 2)
-    while sentiment < 1 or sentiment > 10:
-        sentiment = np.random.normal(chatbot.personality.mood, 2)
-
-    return sentiment
-
-def new_conversation(conversation, chatbot, user, personas=None,
-        last_utterance=None):
-    # New conversation started
-    # prev = greeting, then greeting, query, etc.
-    if last_utterance.dialogue_act == DA.greeting:
-        #TODO overcome limitation of not making text here. (use meta text)
-        # Ideal, would be able to be assertive and make
-        # greeting + question_ or statement_
-        # call nlg module here, from IA.
-
-        assertiveness = response_assertiveness(chatbot)
-
-        if respond_passively(assertiveness):
-            # if passive response, then only greeting.
-            utterance = Utterance(
-                chatbot.name,
-                DA.greeting,
-                "self_user",
-                chatbot.personality.mood,
-                chatbot.personality.assertiveness
-            )
-
-            text = nlg.generate_response_text(utterance, chatbot, conversation)
-            utterance.set_text(text)
-            return utterance
-        else: # respond with greeting AND something else.
-            # else: query user general
-            greeting_text = generic_response.greeting(chatbot, conversation,
-                chatbot.personality.mood)
-            greeting_text = greeting_text[0].upper() + greeting_text[1:]
-            greeting_text = (greeting_text + "."
-                if chatbot.personality.mood < 8
-                and chatbot.personality.assertiveness < 8
-                else greeting_text + "!"
-            )
-
-            utterance = tactic.query_user_general(
-                conversation, chatbot, user, personas)
-
-            text = greeting_text + " " + utterance.text
-            utterance.set_text(text)
-            return utterance
-    elif (not topic_is_self(last_utterance.topic)
-        and not topic_is_user(last_utterance.topic)
-        and is_question(last_utterance.dialogue_act)
-        ):
-        return Utterance(
-            chatbot.name,
-            question_to_statement(last_utterance.dialogue_act),
-            last_utterance.topic,
-            chatbot.personality.mood,
-            chatbot.personality.assertiveness
-        )
-    elif ( not topic_is_self(last_utterance.topic)
-        and not topic_is_user(last_utterance.topic)
-        and is_statement(last_utterance.dialogue_act)
-        ):
-        return Utterance(
-            chatbot.name,
-            statement_to_question(last_utterance.dialogue_act),
-            last_utterance.topic,
-            chatbot.personality.mood,
-            chatbot.personality.assertiveness
-        )
-    else:
-        return tactic.psychiatrist(last_utterance, chatbot.name)
-    #else:
-    #    return tactic.query()
-    # statement then ... idk response? who are you?
-
-def ongoing_conversation(conversation, chatbot, user, personas=None,
-        last_utterance=None):
-    # topics have been discussed, and conversation ongoing
-    # go through topics of desired sentiment till exhausted.
-    # query new topics if topics of desired sentiment are exhausted.
-    #TODO Need a way to know what topics have been exhausted! ia only. is it ia only?
-
-    # static response:
-    # if greeting in middle of conversation either ignore or question it.
-    #   perhaps respond confused.
-
-    general_conversation(conversation, chatbot, user, personas, last_utterance)
-
-def general_conversation(conversation, chatbot, user, personas=None,
-        last_utterance=None):
-    """
-    How to typically respond in a conversation.
-    """
-    if topic_is_self(last_utterance.topic) \
-            or topic_is_user(last_utterance.topic):
-        return tactic.psychiatrist(last_utterance, chatbot.name)
-    else:
-        return response_matrix(last_utterance, chatbot)
+    """ determines the sentiment the chatbot will respond with """
+    return sample_trait(chatbot.personality.mood)
 
-    """
-    if change_topic(mood_magnitude, topic_magnitude,
-            chatbot.personality.mood):
-        if respond_passively(chatbot, user, mood_magnitude):
-            return change_topic_passive(conversation, chatbot, user,
-                mood_magnitude, topic_magnitude, personas)
-        else: # respond assertively
-            return change_topic_assertive(conversation, chatbot, user,
-                mood_magnitude, topic_magnitude, personas)
-
-    else: # Stay on topic
-        if topic_is_self(last_utterance.topic) \
-                or topic_is_user(last_utterance.topic):
-            return tactic.psychiatrist(last_utterance, chatbot.name)
-
-        if respond_passively(chatbot, user, mood_magnitude):
-            return stay_on_topic_passive(conversation, chatbot, user,
-                mood_magnitude, topic_magnitude, personas)
-        else: # respond assertively
-            return stay_on_topic_assertive(conversation, chatbot, user,
-                mood_magnitude, topic_magnitude, personas)
-    """
+"""
+Actions of the rule sets. All take the same arguments and return the response
+Utterance, whose text is generated afterwards if left None.
+"""
 
-# TODO have random select, have it be a skewed normal, and mean wherever
-# personality.mood is.
-def change_topic_passive(conversation, chatbot, user, mood_magnitude,
-        topic_magnitude, personas):
-    choice = np.random.choice(3,1)
-    if choice == 0:
-    # silence or no response or minimal response
-        return Utterance(
-            chatbot.name,
-            DA.silence,
-            last_utterance.topic,
-            chatbot.personality.mood,
-            chatbot.persoality.assertiveness
-        )
-    elif chocie == 1:
-    # ask to change topic, no expression of sent, not alternatives
-        return Utterance(
-            chatbot.name,
-            DA.question_information,
-            last_utterance.topic,
-            chatbot.personality.mood,
-            chatbot.persoality.assertiveness
-        )
-    # express sent, no alternatives
+def farewell(conversation, chatbot, user, personas, last_utterance,
+        assertiveness):
     return Utterance(
         chatbot.name,
-        DA.statement_opinion,
-        last_utterance.topic,
+        DA.farewell,
+        "self_user",
         chatbot.personality.mood,
-        chatbot.persoality.assertiveness
+        chatbot.personality.assertiveness
     )
 
-def change_topic_assertive(conversation, chatbot, user, mood_magnitude,
-        topic_magnitude, personas):
-
-    # provide alts. only
+def greeting(conversation, chatbot, user, personas, last_utterance,
+        assertiveness):
+    """ Passive response to a greeting, only greet back. """
+    return Utterance(
+        chatbot.name,
+        DA.greeting,
+        "self_user",
+        chatbot.personality.mood,
+        chatbot.personality.assertiveness
+    )
 
-    # express sent, provide alts.
+def greeting_and_query(conversation, chatbot, user, personas, last_utterance,
+        assertiveness):
+    """ Assertive response to a greeting, greet and then query the user. """
+    #TODO overcome limitation of not making text here. (use meta text)
+    greeting_text = generic_response.greeting(chatbot, conversation,
+        chatbot.personality.mood)
+    greeting_text = greeting_text[0].upper() + greeting_text[1:]
+    greeting_text = (greeting_text + "."
+        if chatbot.personality.mood < 8
+        and chatbot.personality.assertiveness < 8
+        else greeting_text + "!"
+    )
 
-    # provide alts & begin talking
+    utterance = tactic.query_user_general(
+        conversation, chatbot, user, personas)
 
-    # begin talking (abruptly change topic)
+    return utterance.with_text(greeting_text + " " + utterance.text)
 
+def answer_question(conversation, chatbot, user, personas, last_utterance,
+        assertiveness):
+    """ Respond to a question with its respective statement. """
+    return Utterance(
+        chatbot.name,
+        question_to_statement(last_utterance.dialogue_act),
+        last_utterance.topic,
+        chatbot.personality.mood,
+        chatbot.personality.assertiveness
+    )
 
+def question_statement(conversation, chatbot, user, personas, last_utterance,
+        assertiveness):
+    """ Respond to a statement with its respective question. """
+    return Utterance(
+        chatbot.name,
+        statement_to_question(last_utterance.dialogue_act),
+        last_utterance.topic,
+        chatbot.personality.mood,
+        chatbot.personality.assertiveness
+    )
 
-    # TODO look at last Dialogue Act, if Question, request, something requiring
-    # a response, take that into consideration! change topic, but address this.
+def psychiatrist(conversation, chatbot, user, personas, last_utterance,
+        assertiveness):
+    return tactic.psychiatrist(last_utterance, chatbot.name, id(conversation))
 
-    return
+def response_matrix(conversation, chatbot, user, personas, last_utterance,
+        assertiveness):
+    matrix = da_matrix.persona_da_matrix(chatbot)
+    return Utterance(
+        chatbot.name,
+        matrix.alias_table(last_utterance.dialogue_act).sample(),
+        last_utterance.topic,
+        int(response_sentiment(chatbot)),
+        int(assertiveness)
+    )
 
-def stay_on_topic_passive(conversation, chatbot, user, mood_magnitude,
-        topic_magnitude, personas):
-    choice = np.random.choice(3,1)
-    # Listening oriented
+# TODO have random select, have it be a skewed normal, and mean wherever
+# personality.mood is.
+def change_topic_passive(conversation, chatbot, user, personas,
+        last_utterance, assertiveness):
+    choice = np.random.randint(3)
+    if choice == 0:
+        # silence or no response or minimal response
+        da = DA.silence
+    elif choice == 1:
+        # ask to change topic, no expression of sent, not alternatives
+        da = DA.question_information
+    else:
+        # express sent, no alternatives
+        da = DA.statement_opinion
 
-    # Reinforce passively, "me too", "interesting."
+    return Utterance(
+        chatbot.name,
+        da,
+        last_utterance.topic,
+        chatbot.personality.mood,
+        int(assertiveness)
+    )
 
+def change_topic_assertive(conversation, chatbot, user, personas,
+        last_utterance, assertiveness):
+    # provide alts. only
 
-    return
+    # express sent, provide alts.
 
-def stay_on_topic_assertive(conversation, chatbot, user, mood_magnitude,
-        topic_magnitude, personas):
+    # provide alts & begin talking
 
-    # Leading Conversation, Informing/Expressing views
+    # TODO look at last Dialogue Act, if Question, request, something requiring
+    # a response, take that into consideration! change topic, but address this.
 
-    # Reinforce actively "yes and this too..."
+    # begin talking (abruptly change topic) on the topic closest to the mood
+    if not chatbot.topic_sentiment:
+        return tactic.query_user_general(conversation, chatbot, user, personas)
 
-    return
+    topic = min(
+        chatbot.topic_sentiment,
+        key=lambda t: abs(chatbot.topic_magnitude(t, chatbot.personality.mood))
+    )
+    return Utterance(
+        chatbot.name,
+        DA.statement_opinion,
+        topic,
+        chatbot.personality.mood,
+        int(assertiveness)
+    )
 
-def response_matrix(last_utterance, chatbot):
-    mat = np.loadtxt(open("../data/da_matrix.csv"), delimiter=",", skiprows=1,
-        usecols=range(1,27))
-    mat = mat / np.sum(mat, axis=0)
+def stay_on_topic_passive(conversation, chatbot, user, personas,
+        last_utterance, assertiveness):
+    # Listening oriented
+    # Reinforce passively, "me too", "interesting."
+    da = DA.backchannel if np.random.randint(2) == 0 else DA.agreement
 
-    da_names = [da.name for da in DA if da.name not in
-        ["statement", "question", "response_action"]]
-    response_col = da_names.index(last_utterance.dialogue_act.name)
     return Utterance(
         chatbot.name,
-        DA[np.random.choice(da_names, p=mat[:, response_col])],
+        da,
         last_utterance.topic,
-        min(max(np.random.normal(chatbot.personality.mood, 2), 10), 1),
-        min(max(np.random.normal(chatbot.personality.assertiveness, 2), 10), 1)
+        chatbot.personality.mood,
+        int(assertiveness)
     )
 
-def farewell(chatbot):
+def stay_on_topic_assertive(conversation, chatbot, user, personas,
+        last_utterance, assertiveness):
+    # Leading Conversation, Informing/Expressing views
+    # TODO Reinforce actively "yes and this too..."
+    da = DA.statement_opinion if np.random.randint(2) == 0 \
+        else DA.statement_information
+
     return Utterance(
         chatbot.name,
-        DA.farewell,
-        "self_user",
+        da,
+        last_utterance.topic,
         chatbot.personality.mood,
-        chatbot.personality.assertiveness
+        int(assertiveness)
     )
+
+ACTIONS = {
+    "farewell": farewell,
+    "greeting": greeting,
+    "greeting_and_query": greeting_and_query,
+    "answer_question": answer_question,
+    "question_statement": question_statement,
+    "psychiatrist": psychiatrist,
+    "response_matrix": response_matrix,
+    "change_topic_passive": change_topic_passive,
+    "change_topic_assertive": change_topic_assertive,
+    "stay_on_topic_passive": stay_on_topic_passive,
+    "stay_on_topic_assertive": stay_on_topic_assertive,
+}
@@ -9,12 +9,28 @@ methods, and optimization methods.
 :author: Derek S. Prijatelj
 """
 
+import importlib
 from conversation import DialogueAct as DA, Utterance, \
     is_statement, is_question, is_response_action, is_backchannel, \
     topic_is_self, topic_is_user
-from nlg.nlg import generate_response_text #TODO remove , run in src dir.
-from intelligent_agent.decision_tree_static import decision_tree_static
-from intelligent_agent.static_matrix import static_matrix
+
+DEFAULT_AGENT = "static_matrix"
+
+# Agent name to (module, function, batch function or None). Modules are only
+# imported the first time their agent is used.
+_agents = {
+    "static_matrix": (
+        "intelligent_agent.static_matrix",
+        "static_matrix",
+        "static_matrix_batch"
+    ),
+    "decision_tree_static": (
+        "intelligent_agent.decision_tree_static",
+        "decision_tree_static",
+        None
+    ),
+}
+_loaded_agents = {}
 
 _standard_topic = {
     "self_user",
@@ -26,18 +42,71 @@ _standard_topic = {
     "joke"
 }
 
+def register_agent(name, module, function, batch_function=None):
+    """
+    Registers an intelligent agent under the given name without importing it.
+
+    :param name: str name the agent is selected by
+    :param module: str module path of the agent, imported on first use
+    :param function: str name of the agent's function in the module, which
+        takes (conversation, chatbot, user, personas) and returns an Utterance
+    :param batch_function: str name of the agent's batch function in the
+        module, which takes lists of the same arguments, if any
+    """
+    _agents[name] = (module, function, batch_function)
+    _loaded_agents.pop(name, None)
+
+def agent_names():
+    """ The names of all registered intelligent agents """
+    return list(_agents)
+
+def _load_agent(name):
+    """ Helper function importing the agent's module on first use """
+    loaded = _loaded_agents.get(name)
+    if loaded is None:
+        if name not in _agents:
+            raise ValueError("Unknown intelligent agent: " + str(name)
+                + ", expected one of " + str(agent_names()))
+        module, function, batch_function = _agents[name]
+        module = importlib.import_module(module)
+        loaded = (
+            getattr(module, function),
+            getattr(module, batch_function) if batch_function else None
+        )
+        _loaded_agents[name] = loaded
+    return loaded
+
+def get_agent(name):
+    """ The intelligent agent's function, importing it on first use """
+    return _load_agent(name)[0]
+
+def agent_name(chatbot, agent=None):
+    """
+    The name of the agent to use, the given agent if any, else the agent of
+    the chatbot's personality profile, else the default agent.
+    """
+    if agent is not None:
+        return agent
+    return chatbot.behavior.get("agent", DEFAULT_AGENT)
+
+def other_participant(conversation, chatbot_id):
+    """ The id of a participant of the conversation other than the chatbot """
+    return next(p for p in conversation.participants if p != chatbot_id)
+
 #def decide_response(simulation, user, conversation_history):
-def decide_response(conversation_history, chatbot_id, persona_dict):
+def decide_response(conversation_history, chatbot_id, persona_dict,
+        agent=None):
     """
     Main interface for intelligent agent to decide how to response. With the NLU
     information and the persona making this decision, generates the metadata of
     the persona's response utterance. This metadata matches the type and format
     of the NLU information.
+
+    :param agent: str name of the intelligent agent to decide with, defaults
+        to the chatbot's "agent" behavior, or DEFAULT_AGENT
     """
     chatbot = persona_dict[chatbot_id]
-    participants = conversation_history.participants
-    participants.remove(chatbot_id)
-    user = persona_dict[next(iter(participants))]
+    user = persona_dict[other_participant(conversation_history, chatbot_id)]
     last_utterance = conversation_history.last_utterance
 
     # Assess mood and magnitude of change to mood necessary
@@ -51,9 +120,8 @@ def decide_response(conversation_history, chatbot_id, persona_dict):
     # TODO give first utterance, should never occur in prototype
 
 
-    return static_matrix(conversation_history, chatbot, user, persona_dict)
-
-    #return decision_tree_static(conversation_history, chatbot, user, persona_dict)
+    return get_agent(agent_name(chatbot, agent))(
+        conversation_history, chatbot, user, persona_dict)
 
     # static reactions:
     if last_utterance.dialogue_act == DA.farewell:
@@ -75,3 +143,43 @@ def decide_response(conversation_history, chatbot_id, persona_dict):
 
     # TODO remove this, this is just to stop code from crashing until IA finished
     return Utterance(chatbot_id, DA.other, "None", 5, 5)
+
+def decide_responses(conversation_chatbot_pairs, persona_dict, agent=None):
+    """
+    Batch interface of decide_response for many concurrent conversations. The
+    random draws of all the responses are vectorized for agents that support
+    batches, while each response is distributed the same as if decided by
+    decide_response.
+
+    :param conversation_chatbot_pairs: list of (Conversation, str chatbot_id)
+    :param persona_dict: Dictionary of str "persona_id" to Persona
+    :param agent: str name of the intelligent agent to decide with, defaults
+        to each chatbot's "agent" behavior, or DEFAULT_AGENT
+    :return: list of response Utterances in the order of the pairs
+    """
+    # agent name to (indices, conversations, chatbots, users)
+    batches = {}
+    for i, (conversation, chatbot_id) in enumerate(conversation_chatbot_pairs):
+        chatbot = persona_dict[chatbot_id]
+
+        batch = batches.setdefault(agent_name(chatbot, agent),
+            ([], [], [], []))
+        batch[0].append(i)
+        batch[1].append(conversation)
+        batch[2].append(chatbot)
+        batch[3].append(
+            persona_dict[other_participant(conversation, chatbot_id)])
+
+    responses = [None] * len(conversation_chatbot_pairs)
+    for name, (indices, conversations, chatbots, users) in batches.items():
+        function, batch_function = _load_agent(name)
+        if batch_function is not None:
+            batch_responses = batch_function(conversations, chatbots, users,
+                persona_dict)
+        else:
+            batch_responses = [function(*args, persona_dict) for args in
+                zip(conversations, chatbots, users)]
+
+        for i, response in zip(indices, batch_responses):
+            responses[i] = response
+    return responses
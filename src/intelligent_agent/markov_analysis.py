@@ -0,0 +1,188 @@
+"""
+Closed form analysis of the dialogue act dynamics of a response matrix.
+
+When every turn is answered by sampling the response matrix, as in the static
+matrix agent, the sequence of dialogue acts of a conversation is a Markov
+chain whose transition probabilities are the matrix's columns. Its long run
+distribution, the expected number of turns until a dialogue act such as
+farewell is first reached and how quickly the chain forgets where it started
+follow from linear algebra on the matrix, rather than from simulating many
+conversations.
+
+Every function accepts either a DAMatrix or a Persona, in which case the
+persona's own response matrix is analysed.
+"""
+
+from collections import OrderedDict
+import math
+import numpy as np
+from conversation import DialogueAct as DA
+from intelligent_agent.da_matrix import persona_da_matrix
+
+_TOLERANCE = 1e-9
+
+def _as_da_matrix(matrix):
+    """ Helper function resolving a Persona into its DAMatrix """
+    if hasattr(matrix, "probabilities"):
+        return matrix
+    return persona_da_matrix(matrix)
+
+def transition_matrix(matrix):
+    """
+    The row stochastic transition matrix of the chain, where entry [i, j] is
+    the probability of dialogue act j directly following dialogue act i.
+    """
+    return _as_da_matrix(matrix).probabilities.T
+
+def _reachability(transitions):
+    """ Helper function of which states can reach which, in any turns """
+    size = len(transitions)
+    reach = (transitions > 0) | np.eye(size, dtype=bool)
+    for _ in range(max(int(math.ceil(math.log2(max(size, 2)))), 1)):
+        reach = (reach.astype(np.int64) @ reach.astype(np.int64)) > 0
+    return reach
+
+def _closed_classes(reach):
+    """
+    Helper function of the closed communicating classes of the chain, which
+    once entered are never left.
+
+    :return: list of sorted lists of state indices
+    """
+    classes = []
+    seen = set()
+    for i in range(len(reach)):
+        if i in seen:
+            continue
+        members = np.flatnonzero(reach[i] & reach[:, i])
+        seen.update(members.tolist())
+        if not np.any(reach[i] & ~np.isin(np.arange(len(reach)), members)):
+            classes.append(members.tolist())
+    return classes
+
+def _class_stationary(transitions, members):
+    """ Helper function of the stationary distribution of a closed class """
+    sub = transitions[np.ix_(members, members)]
+    size = len(members)
+    # pi (P - I) = 0 with sum(pi) = 1, solved in the least squares sense
+    system = np.vstack([(sub - np.eye(size)).T, np.ones(size)])
+    target = np.zeros(size + 1)
+    target[-1] = 1
+    pi = np.linalg.lstsq(system, target, rcond=None)[0]
+    pi = np.clip(pi, 0, None)
+    return pi / pi.sum()
+
+def stationary_distribution(matrix, start=None):
+    """
+    The long run distribution of dialogue acts, i.e. the limit of the average
+    distribution over the turns. If the chain has several closed classes, such
+    as farewell, this depends on where the conversation starts.
+
+    :param matrix: DAMatrix or Persona
+    :param start: DialogueAct or Dictionary of DialogueAct to probability of
+        the first dialogue act, uniform if None
+    :return: OrderedDict of DialogueAct to long run probability
+    """
+    da_matrix = _as_da_matrix(matrix)
+    transitions = transition_matrix(da_matrix)
+    dialogue_acts = da_matrix.dialogue_acts
+    size = len(dialogue_acts)
+
+    if start is None:
+        initial = np.full(size, 1.0 / size)
+    elif isinstance(start, DA):
+        initial = np.zeros(size)
+        initial[da_matrix.index(start)] = 1
+    else:
+        initial = np.zeros(size)
+        for da, p in start.items():
+            initial[da_matrix.index(da)] = p
+        initial /= initial.sum()
+
+    reach = _reachability(transitions)
+    classes = _closed_classes(reach)
+    recurrent = sorted(i for members in classes for i in members)
+    transient = [i for i in range(size) if i not in set(recurrent)]
+
+    # Probability of being absorbed into each closed class from each state
+    absorption = np.zeros((size, len(classes)))
+    for c, members in enumerate(classes):
+        absorption[members, c] = 1
+    if transient:
+        q = transitions[np.ix_(transient, transient)]
+        r = np.stack([transitions[np.ix_(transient, members)].sum(axis=1)
+            for members in classes], axis=1)
+        absorption[transient] = np.linalg.solve(np.eye(len(transient)) - q, r)
+
+    weights = initial @ absorption
+    distribution = np.zeros(size)
+    for c, members in enumerate(classes):
+        distribution[members] += weights[c] \
+            * _class_stationary(transitions, members)
+
+    return OrderedDict(zip(dialogue_acts, distribution.tolist()))
+
+def expected_turns_to(matrix, target=DA.farewell):
+    """
+    The expected number of turns until the target dialogue act is first
+    reached, from each dialogue act. It is infinite from the dialogue acts
+    that may never reach the target.
+
+    :param matrix: DAMatrix or Persona
+    :param target: DialogueAct to reach
+    :return: OrderedDict of DialogueAct to float expected turns
+    """
+    da_matrix = _as_da_matrix(matrix)
+    transitions = transition_matrix(da_matrix).copy()
+    dialogue_acts = da_matrix.dialogue_acts
+    size = len(dialogue_acts)
+    goal = da_matrix.index(target)
+
+    # Make the target absorbing, then the hitting time is finite exactly from
+    # the states that cannot reach another closed class.
+    transitions[goal] = 0
+    transitions[goal, goal] = 1
+    reach = _reachability(transitions)
+    traps = [i for members in _closed_classes(reach) if goal not in members
+        for i in members]
+    finite = [i for i in range(size) if i != goal
+        and not (traps and np.any(reach[i, traps]))]
+
+    turns = np.full(size, np.inf)
+    turns[goal] = 0
+    if finite:
+        q = transitions[np.ix_(finite, finite)]
+        turns[finite] = np.linalg.solve(np.eye(len(finite)) - q,
+            np.ones(len(finite)))
+
+    return OrderedDict(zip(dialogue_acts, turns.tolist()))
+
+def mixing_rate(matrix):
+    """
+    The second largest eigenvalue modulus of the chain. The distance to the
+    long run distribution shrinks by about this factor every turn, so the
+    smaller it is, the faster a conversation forgets how it started.
+
+    :param matrix: DAMatrix or Persona
+    :return: float in [0, 1]
+    """
+    eigenvalues = np.linalg.eigvals(transition_matrix(matrix))
+    # Every closed class contributes an eigenvalue of exactly 1.
+    rest = eigenvalues[np.abs(eigenvalues - 1) > _TOLERANCE]
+    return float(np.max(np.abs(rest))) if len(rest) else 0.0
+
+def mixing_time(matrix, epsilon=0.01):
+    """
+    The approximate number of turns until the distance to the long run
+    distribution falls below epsilon, derived from the mixing rate.
+
+    :param matrix: DAMatrix or Persona
+    :param epsilon: float distance to the long run distribution
+    :return: int turns, or inf if the chain never mixes
+    """
+    rate = mixing_rate(matrix)
+    if rate >= 1 - _TOLERANCE:
+        return math.inf
+    if rate <= 0:
+        return 1
+    return int(math.ceil(math.log(epsilon) / math.log(rate)))
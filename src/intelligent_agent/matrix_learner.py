@@ -0,0 +1,163 @@
+"""
+Incremental learning of the dialogue act response matrix from conversations.
+
+A DATransitionCounter accumulates how often each dialogue act was responded to
+with each other dialogue act in a fixed size integer array. Conversations are
+consumed incrementally: only the utterances added since a conversation was
+last seen are counted, so nothing is ever counted or kept twice and memory
+does not grow with the number of utterances. The smoothed, normalized matrix
+is published as a csv in the format of data/da_matrix.csv, which the
+da_matrix provider picks up once the file's modification time changes.
+"""
+
+import os
+import tempfile
+import weakref
+import numpy as np
+from conversation import DialogueAct as DA
+from intelligent_agent.da_matrix import DAMatrix
+
+FUNCTIONAL_DIALOGUE_ACTS = tuple(da for da in DA if da not in
+    {DA.statement, DA.question, DA.response_action})
+
+class DATransitionCounter(object):
+    """
+    Streaming counts of (incoming dialogue act, response dialogue act) pairs.
+
+    :param dialogue_acts: sequence of DialogueActs counted, defaults to the
+        functional dialogue acts of data/da_matrix.csv. Others are ignored.
+    :param smoothing: float additive smoothing of every count when the
+        matrix is computed
+    :param publish_path: str path of the csv the matrix is published to
+    :param publish_every: int number of new responses after which the
+        matrix is published automatically, never if None
+    """
+    def __init__(self, dialogue_acts=FUNCTIONAL_DIALOGUE_ACTS, smoothing=1.0,
+            publish_path=None, publish_every=None):
+        assert smoothing >= 0
+        assert publish_every is None or publish_path is not None
+
+        self.__dialogue_acts = tuple(dialogue_acts)
+        self.__index = {da: i for i, da in enumerate(self.__dialogue_acts)}
+        self.__counts = np.zeros(
+            (len(self.__dialogue_acts), len(self.__dialogue_acts)),
+            dtype=np.int64
+        )
+        self.__smoothing = smoothing
+        self.__publish_path = publish_path
+        self.__publish_every = publish_every
+        self.__unpublished = 0
+
+        # id(conversation) to [weakref, utterances consumed, last utterance]
+        self.__cursors = {}
+
+    @property
+    def dialogue_acts(self):
+        return self.__dialogue_acts
+
+    @property
+    def counts(self):
+        """Read-only counts, counts[i, j] is responses i to incoming j"""
+        counts = self.__counts.view()
+        counts.setflags(write=False)
+        return counts
+
+    @property
+    def total(self):
+        """The total number of responses counted"""
+        return int(self.__counts.sum())
+
+    def observe(self, incoming_da, response_da):
+        """ Counts one response to the incoming dialogue act """
+        incoming = self.__index.get(incoming_da)
+        response = self.__index.get(response_da)
+        if incoming is not None and response is not None:
+            self.__counts[response, incoming] += 1
+            self.__counted(1)
+
+    def observe_many(self, incoming_das, response_das):
+        """ Counts the pairwise responses of the two sequences at once """
+        pairs = [(self.__index.get(i), self.__index.get(r))
+            for i, r in zip(incoming_das, response_das)]
+        pairs = np.array([p for p in pairs if None not in p], dtype=np.intp)
+        if len(pairs):
+            np.add.at(self.__counts, (pairs[:, 1], pairs[:, 0]), 1)
+            self.__counted(len(pairs))
+
+    def update(self, conversation):
+        """
+        Counts the responses of the utterances added to the Conversation since
+        it was last updated. An utterance is a response to the previous
+        utterance when their speakers differ.
+        """
+        key = id(conversation)
+        cursor = self.__cursors.get(key)
+        if cursor is None or cursor[0]() is not conversation:
+            cursor = [
+                weakref.ref(conversation, self.__forget(key)),
+                0,
+                None
+            ]
+            self.__cursors[key] = cursor
+
+        utterances = [conversation.utterance(i)
+            for i in range(cursor[1], len(conversation))]
+        previous = cursor[2]
+        incoming = []
+        responses = []
+        for utterance in utterances:
+            if previous is not None and previous.speaker != utterance.speaker:
+                incoming.append(previous.dialogue_act)
+                responses.append(utterance.dialogue_act)
+            previous = utterance
+
+        cursor[1] += len(utterances)
+        cursor[2] = previous
+        self.observe_many(incoming, responses)
+
+    def update_history(self, conversation_history):
+        """ Updates with every Conversation in the ConversationHistory """
+        for conversation in conversation_history.conversations.values():
+            self.update(conversation)
+
+    def __forget(self, key):
+        """ Helper function to drop a cursor once its Conversation is gone """
+        cursors = self.__cursors
+        return lambda ref: cursors.pop(key, None)
+
+    def __counted(self, count):
+        """ Helper function to publish every publish_every responses """
+        self.__unpublished += count
+        if self.__publish_every is not None \
+                and self.__unpublished >= self.__publish_every:
+            self.publish()
+
+    def da_matrix(self):
+        """ The smoothed, normalized DAMatrix of the current counts """
+        return DAMatrix(self.__counts + self.__smoothing, self.__dialogue_acts)
+
+    def publish(self, path=None):
+        """
+        Atomically writes the current matrix as a csv, such that readers only
+        ever see either the previous or the new matrix.
+
+        :param path: str path of the csv, defaults to publish_path
+        """
+        path = self.__publish_path if path is None else path
+        probabilities = self.da_matrix().probabilities
+        names = [da.name for da in self.__dialogue_acts]
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".csv")
+        try:
+            with os.fdopen(fd, "w") as f_matrix:
+                f_matrix.write("," + ",".join(names) + "\n")
+                for name, row in zip(names, probabilities):
+                    f_matrix.write(name + "," + ",".join(map(repr,
+                        row.tolist())) + "\n")
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        self.__unpublished = 0
@@ -0,0 +1,160 @@
+"""
+Declarative rule sets for the rule based intelligent agent, compiled into a
+flat dispatch table.
+
+A rule set is a JSON file of rules, each of which names the action to take for
+a combination of the incoming dialogue act, the class of its topic, the phase
+of the conversation and the band of the responder's assertiveness. Any of
+these may be "*" or a list of values, and a dialogue act may also be the name
+of a group of dialogue acts (statement, question, response_action,
+backchannel). Like the branches of an if/elif chain, when rules overlap the
+first rule in the file wins.
+
+Compilation expands every rule into the concrete keys it covers, so the cost
+of a turn is a single dict lookup no matter how many rules the set has.
+"""
+
+import json
+import os
+from conversation import DialogueAct as DA, is_statement, is_question, \
+    is_response_action, is_backchannel, topic_is_self, topic_is_user
+
+DEFAULT_RULES_PATH = "../data/decision_rules/default.json"
+WILDCARD = "*"
+
+TOPIC_CLASSES = ("self", "user", "general")
+PHASES = ("new", "ongoing")
+ASSERTIVENESS_BANDS = ("passive", "assertive")
+
+_DA_GROUPS = {
+    "statement": [da for da in DA if is_statement(da)],
+    "question": [da for da in DA if is_question(da)],
+    "response_action": [da for da in DA if is_response_action(da)],
+    "backchannel": [da for da in DA if is_backchannel(da)],
+}
+
+def topic_class(topic):
+    """ The class of the topic used as a key of the rule table """
+    if topic_is_self(topic):
+        return "self"
+    if topic_is_user(topic):
+        return "user"
+    return "general"
+
+def assertiveness_band(assertiveness):
+    """ The band of the assertiveness used as a key of the rule table """
+    return "passive" if assertiveness < 5 else "assertive"
+
+def _expand(rule, field, values, expand_value=None):
+    """ Helper function expanding a rule's field into its concrete values """
+    value = rule.get(field, WILDCARD)
+    if value == WILDCARD:
+        return list(values)
+    if isinstance(value, str):
+        value = [value]
+
+    expanded = []
+    for v in value:
+        if expand_value is not None:
+            expanded += expand_value(v)
+        elif v in values:
+            expanded.append(v)
+        else:
+            raise ValueError("Unknown " + field + " in rule: " + str(v))
+    return expanded
+
+def _expand_dialogue_act(name):
+    """ Helper function expanding a dialogue act or group name into DAs """
+    if name in _DA_GROUPS:
+        return _DA_GROUPS[name]
+    try:
+        return [DA[name]]
+    except KeyError:
+        raise ValueError("Unknown dialogue_act in rule: " + str(name))
+
+class RuleTable(object):
+    """
+    A compiled rule set mapping (DialogueAct, topic class, phase,
+    assertiveness band) to the action to take.
+
+    :param rules: list of dict rules with the keys "dialogue_act", "topic",
+        "phase", "assertiveness" and "action"
+    :param actions: Dictionary of str action name to the action's function
+    :param name: str name of the rule set
+    :param path: str path of the file the rules were loaded from, if any
+    :param mtime: int modification time in ns of the file at path, if any
+    """
+    def __init__(self, rules, actions, name=None, path=None, mtime=None):
+        table = {}
+        for order, rule in enumerate(rules):
+            if "action" not in rule:
+                raise ValueError("Rule " + str(order) + " has no action")
+            if rule["action"] not in actions:
+                raise ValueError("Unknown action in rule: " + rule["action"])
+            action = actions[rule["action"]]
+
+            das = _expand(rule, "dialogue_act", DA, _expand_dialogue_act)
+            topics = _expand(rule, "topic", TOPIC_CLASSES)
+            phases = _expand(rule, "phase", PHASES)
+            bands = _expand(rule, "assertiveness", ASSERTIVENESS_BANDS)
+
+            for da in das:
+                for topic in topics:
+                    for phase in phases:
+                        for band in bands:
+                            table.setdefault((da, topic, phase, band), action)
+
+        missing = len(DA) * len(TOPIC_CLASSES) * len(PHASES) \
+            * len(ASSERTIVENESS_BANDS) - len(table)
+        if missing:
+            raise ValueError("Rule set " + str(name) + " leaves " + str(missing)
+                + " cases without an action, add a wildcard rule")
+
+        self.__table = table
+        self.__name = name
+        self.__path = path
+        self.__mtime = mtime
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def mtime(self):
+        return self.__mtime
+
+    def lookup(self, dialogue_act, topic_class, phase, assertiveness_band):
+        """ The action of the rule set for the given case """
+        return self.__table[(dialogue_act, topic_class, phase,
+            assertiveness_band)]
+
+def load_rule_table(path, actions):
+    """
+    Loads and compiles the JSON rule set at the given path.
+
+    :param path: str path to the JSON rule set
+    :param actions: Dictionary of str action name to the action's function
+    :return: RuleTable of the rule set
+    """
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, encoding="utf-8") as json_rules:
+        rules_dict = json.load(json_rules)["decision rules"]
+    return RuleTable(rules_dict["rules"], actions, rules_dict.get("name"),
+        path, mtime)
+
+_rule_tables = {}
+
+def get_rule_table(path, actions):
+    """
+    Returns the process-wide RuleTable for the given path, only recompiling it
+    when the file has been modified since it was last loaded.
+    """
+    rule_table = _rule_tables.get(path)
+    if rule_table is None or rule_table.mtime != os.stat(path).st_mtime_ns:
+        rule_table = load_rule_table(path, actions)
+        _rule_tables[path] = rule_table
+    return rule_table
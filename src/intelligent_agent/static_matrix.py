@@ -10,11 +10,10 @@ based on hierarch:
 :author: Derek S. Prijatelj
 """
 
-import csv
-import numpy as np
-import pandas
 #from scipy.stats import skewnorm
-from intelligent_agent import tactic
+from collections import OrderedDict
+from intelligent_agent import tactic, da_matrix
+from intelligent_agent.bounded_trait import sample_trait, sample_traits
 from conversation import DialogueAct as DA, QuestionType, \
     Utterance, is_question, is_statement, \
     topic_is_self, topic_is_user, question_to_statement, statement_to_question
@@ -52,8 +51,7 @@ def static_matrix(conversation, chatbot, user, personas=None):
         )
 
         text = nlg.generate_response_text(utterance, chatbot, conversation)
-        utterance.set_text(text)
-        return utterance
+        return utterance.with_text(text)
 
     #if len(conversation.topic_to_utterances.keys()) <= 0:
     if conversation.new_convo:
@@ -68,8 +66,7 @@ def static_matrix(conversation, chatbot, user, personas=None):
                 chatbot.personality.assertiveness
             )
             text = nlg.generate_response_text(utterance, chatbot, conversation)
-            utterance.set_text(text)
-            return utterance
+            return utterance.with_text(text)
         elif ( not topic_is_self(last_utterance.topic)
             and not topic_is_user(last_utterance.topic)
             and is_question(last_utterance.dialogue_act)
@@ -82,8 +79,7 @@ def static_matrix(conversation, chatbot, user, personas=None):
                 chatbot.personality.assertiveness
             )
             text = nlg.generate_response_text(utterance, chatbot, conversation)
-            utterance.set_text(text)
-            return utterance
+            return utterance.with_text(text)
         elif ( not topic_is_self(last_utterance.topic)
             and not topic_is_user(last_utterance.topic)
             and is_statement(last_utterance.dialogue_act)
@@ -96,44 +92,107 @@ def static_matrix(conversation, chatbot, user, personas=None):
                 chatbot.personality.assertiveness
             )
             text = nlg.generate_response_text(utterance, chatbot, conversation)
-            utterance.set_text(text)
-            return utterance
+            return utterance.with_text(text)
         else:
-            return tactic.psychiatrist(last_utterance, chatbot.name)
+            return tactic.psychiatrist(last_utterance, chatbot.name,
+                id(conversation))
     else: # Ongoing Conversation
         # topics have been discussed, and conversation ongoing
         if topic_is_self(last_utterance.topic) \
                 or topic_is_user(last_utterance.topic):
-            return tactic.psychiatrist(last_utterance, chatbot.name)
+            return tactic.psychiatrist(last_utterance, chatbot.name,
+                id(conversation))
         else:
             return response_matrix(last_utterance, chatbot, conversation)
 
 def response_matrix(last_utterance, chatbot, conversation):
-    with open("../data/da_matrix.csv") as f_matrix:
-        mat = np.loadtxt(f_matrix, delimiter=",", skiprows=1,
-            usecols=range(1,27))
-        mat = mat / np.sum(mat, axis=0)
+    matrix = da_matrix.persona_da_matrix(chatbot)
 
-        da_names = [da.name for da in DA if da.name not in
-            ["statement", "question", "response_action"]]
-        response_col = da_names.index(last_utterance.dialogue_act.name)
+    sentiment = sample_trait(chatbot.personality.mood)
+    assertiveness = sample_trait(chatbot.personality.assertiveness)
 
-        sentiment = np.random.normal(chatbot.personality.mood, 2)
-        while sentiment < 1 or sentiment > 10:
-            sentiment = np.random.normal(chatbot.personality.mood, 2)
+    utterance = Utterance(
+        chatbot.name,
+        matrix.alias_table(last_utterance.dialogue_act).sample(),
+        last_utterance.topic,
+        int(sentiment),
+        int(assertiveness)
+    )
 
-        assertiveness = np.random.normal(chatbot.personality.mood, 2)
-        while assertiveness < 1 or assertiveness > 10:
-            assertiveness = np.random.normal(chatbot.personality.mood, 2)
+    text = nlg.generate_response_text(utterance, chatbot, conversation)
+    return utterance.with_text(text)
 
-        utterance = Utterance(
-            chatbot.name,
-            DA[np.random.choice(da_names, p=mat[:, response_col])],
-            last_utterance.topic,
-            int(sentiment),
-            int(assertiveness)
+def static_matrix_batch(conversations, chatbots, users, personas=None):
+    """
+    Batch version of static_matrix for many concurrent conversations. All
+    responses decided by the DA matrix are drawn together with
+    response_matrix_batch, the static reactions are decided per conversation.
+
+    :param conversations: list of current Conversations
+    :param chatbots: list of Persona of the chatbot in each conversation
+    :param users: list of Persona of the user in each conversation
+    :param personas: Dictionary of str "persona_id" to Persona
+    :return: list of response Utterances in the order of conversations
+    """
+    responses = [None] * len(conversations)
+    matrix_indices = []
+    for i, conversation in enumerate(conversations):
+        last_utterance = conversation.last_utterance
+        if last_utterance.dialogue_act != DA.farewell \
+                and not conversation.new_convo \
+                and not topic_is_self(last_utterance.topic) \
+                and not topic_is_user(last_utterance.topic):
+            matrix_indices.append(i)
+        else:
+            responses[i] = static_matrix(conversation, chatbots[i], users[i],
+                personas)
+
+    if matrix_indices:
+        batch = response_matrix_batch(
+            [conversations[i].last_utterance for i in matrix_indices],
+            [chatbots[i] for i in matrix_indices],
+            [conversations[i] for i in matrix_indices]
         )
+        for i, utterance in zip(matrix_indices, batch):
+            responses[i] = utterance
 
-        text = nlg.generate_response_text(utterance, chatbot, conversation)
-        utterance.set_text(text)
-        return utterance
+    return responses
+
+def response_matrix_batch(last_utterances, chatbots, conversations):
+    """
+    Vectorized response_matrix: the response dialogue acts, sentiments, and
+    assertiveness of all the responses are each drawn in one numpy operation,
+    and their texts are generated in bulk.
+    """
+    sentiments = sample_traits(
+        [chatbot.personality.mood for chatbot in chatbots])
+    assertiveness = sample_traits(
+        [chatbot.personality.assertiveness for chatbot in chatbots])
+
+    # One draw per distinct matrix, as personas may have their own matrices.
+    matrix_indices = OrderedDict()
+    for i, chatbot in enumerate(chatbots):
+        matrix = da_matrix.persona_da_matrix(chatbot)
+        matrix_indices.setdefault(id(matrix), (matrix, []))[1].append(i)
+
+    dialogue_acts = [None] * len(chatbots)
+    for matrix, indices in matrix_indices.values():
+        sampled = matrix.sample_many(
+            [last_utterances[i].dialogue_act for i in indices])
+        for i, dialogue_act in zip(indices, sampled):
+            dialogue_acts[i] = dialogue_act
+
+    responses = [
+        Utterance(
+            chatbot.name,
+            dialogue_acts[i],
+            last_utterances[i].topic,
+            int(sentiments[i]),
+            int(assertiveness[i])
+        )
+        for i, chatbot in enumerate(chatbots)
+    ]
+    texts = nlg.generate_response_texts(responses, list(chatbots),
+        list(conversations))
+    return [utterance.with_text(text)
+        for utterance, text in zip(responses, texts)]
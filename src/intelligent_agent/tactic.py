@@ -3,7 +3,7 @@ The tactics used in maintaining the conversation.
 """
 
 import random
-from nltk.chat.eliza import eliza_chatbot
+from nlg.eliza import responder_pool
 from conversation import Utterance, DialogueAct as DA, QuestionType as QT
 from nlg import generic_response
 
@@ -47,16 +47,19 @@ def query_user_general(conversation, chatbot, user, personas=None,
 
     da = random.choice([DA.question_experience, DA.question_information])
 
-    text = generic_response.query_user_information(
-            persona,
+    text = generic_response.query_user_general_information(
+            chatbot,
             conversation,
-            sentiment
+            sentiment,
+            formal
         ) if da is DA.question_information else \
-        generic_response.query_user_experience(
-            persona,
+        generic_response.query_user_general_experience(
+            chatbot,
             conversation,
-            sentiment
+            sentiment,
+            formal
         )
+    text = text[0].upper() + text[1:] + "?"
 
     utterance = Utterance(
         chatbot.name,
@@ -92,13 +95,18 @@ def joke():
     """ Generate joke, optionally related to previous utterance. """
     return
 
-def psychiatrist(utterance, responder_id):
-    """ Use ELIZA to generate response utterances when the topic is on user. """
+def psychiatrist(utterance, responder_id, session=None):
+    """
+    Use ELIZA to generate response utterances when the topic is on user.
+
+    :param session: hashable key of the conversation, whose responses are then
+        generated by the same ELIZA instance of the pool when possible
+    """
     return Utterance(
         responder_id,
         DA.other,
         "self_user",
         5,
         5,
-        eliza_chatbot.respond(utterance.text)
+        responder_pool.respond(utterance.text, session)
     )
@@ -20,6 +20,10 @@ def main():
     user_persona = Persona(username, mood, 5)
     chatbot = args.personality_profile
 
+    # Only the selected agent is imported, fail early if it does not exist.
+    agent = intelligent_agent.agent_name(chatbot, args.agent)
+    intelligent_agent.get_agent(agent)
+
     # personality dict:
     persona_dict = {
         user_persona.name:user_persona,
@@ -57,7 +61,8 @@ def main():
             response_utterance = intelligent_agent.decide_response(
                 conversation_history,
                 chatbot.name,
-                persona_dict
+                persona_dict,
+                agent
             )
         except:
             response_utterance = tactic.psychiatrist(utterance, chatbot.name)
@@ -0,0 +1,200 @@
+"""
+A compiled ELIZA responder, a drop-in replacement of nltk's eliza_chatbot.
+
+nltk's Chat tries each pattern of its pairs in order and rescans every response
+for its wildcards on each call. Here all patterns are merged into one
+alternation that is matched in a single pass: each pattern is wrapped in its
+own group, so the index of the last closed group identifies the pattern that
+matched and its own groups follow at a fixed offset. The responses are split
+into their literal text and wildcards once, and the reflections are applied by
+one precompiled substitution. Responses are chosen with random.choice from the
+same lists as nltk, so the output is identical for the same random state.
+
+Concurrent sessions are served from a ResponderPool of responders with their
+own random streams, rather than sharing the one module level responder.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import copy
+import multiprocessing
+import random
+import re
+import threading
+from nltk.chat.eliza import pairs as ELIZA_PAIRS
+from nltk.chat.util import reflections as ELIZA_REFLECTIONS
+
+_WILDCARD = re.compile(r"%(\d)")
+
+class CompiledChat(object):
+    """
+    Pattern and response chatbot in the format of nltk.chat.util.Chat.
+
+    :param pairs: sequence of (str regular expression, sequence of str
+        responses), where %n in a response is replaced by the reflection of
+        the n-th group of the pattern. Patterns must not use named groups or
+        backreferences.
+    :param reflections: Dictionary of lowercase str words or phrases to their
+        reflection, e.g. "i am" to "you are"
+    :param rng: random.Random that chooses the responses, defaults to the
+        random module's shared state
+    """
+    def __init__(self, pairs=ELIZA_PAIRS, reflections=ELIZA_REFLECTIONS,
+            rng=None):
+        self.__random = random if rng is None else rng
+        # last group index of a match to (responses, group offset)
+        self.__cases = {}
+        alternatives = []
+        group = 1
+        for pattern, responses in pairs:
+            alternatives.append("(" + pattern + ")")
+            self.__cases[group] = (
+                [self.__split(response) for response in responses],
+                group
+            )
+            group += re.compile(pattern).groups + 1
+        self.__pattern = re.compile("|".join(alternatives), re.IGNORECASE)
+
+        self.__reflections = dict(reflections)
+        self.__reflection_pattern = re.compile(
+            r"\b({})\b".format("|".join(map(re.escape,
+                sorted(reflections, key=len, reverse=True)))),
+            re.IGNORECASE
+        )
+
+    @property
+    def random(self):
+        return self.__random
+
+    def with_random(self, rng):
+        """ Copy sharing the compiled patterns, choosing responses with rng """
+        chat = copy.copy(self)
+        chat.__random = rng
+        return chat
+
+    @staticmethod
+    def __split(response):
+        """
+        Helper function splitting a response into its literal text, at even
+        indices, and the int groups of its wildcards, at odd indices.
+        """
+        parts = _WILDCARD.split(response)
+        parts[1::2] = map(int, parts[1::2])
+        return tuple(parts)
+
+    def reflect(self, text):
+        """ Lowercases the text and swaps first and second person words """
+        reflections = self.__reflections
+        return self.__reflection_pattern.sub(
+            lambda match: reflections[match.group()], text.lower())
+
+    def respond(self, text):
+        """
+        Generates the response to the text.
+
+        :param text: str input text
+        :return: str response, None if no pattern matches
+        """
+        match = self.__pattern.match(text)
+        if match is None:
+            return None
+
+        responses, offset = self.__cases[match.lastindex]
+        parts = self.__random.choice(responses)
+        response = "".join(part if i % 2 == 0
+            else self.reflect(match.group(offset + part))
+            for i, part in enumerate(parts))
+
+        # fix munged punctuation at the end
+        if response[-2:] == "?.":
+            response = response[:-2] + "."
+        if response[-2:] == "??":
+            response = response[:-2] + "?"
+        return response
+
+class ResponderPool(object):
+    """
+    Pool of copies of a CompiledChat, each with its own random stream, that
+    are checked out for one response at a time. A session is served by the
+    same responder whenever that one is free. Sized to the number of workers,
+    concurrent sessions never wait for nor share a responder.
+
+    :param size: int number of responders, defaults to the cpu count
+    :param chat: CompiledChat copied, defaults to ELIZA
+    :param seed: int seed of the responders' random streams
+    :param max_sessions: int number of most recent sessions whose responder is
+        remembered
+    """
+    def __init__(self, size=None, chat=None, seed=None, max_sessions=1024):
+        size = multiprocessing.cpu_count() if size is None else size
+        assert size > 0
+
+        chat = eliza_chatbot if chat is None else chat
+        self.__responders = [chat.with_random(random.Random())
+            for _ in range(size)]
+        self.__indices = {id(r): i for i, r in enumerate(self.__responders)}
+        self.__free = list(range(size))
+        self.__condition = threading.Condition()
+
+        # session to the index of its last responder, least recent first
+        self.__sessions = OrderedDict()
+        self.__max_sessions = max_sessions
+
+        self.seed(seed)
+
+    @property
+    def size(self):
+        return len(self.__responders)
+
+    def seed(self, seed=None):
+        """ Reseeds the random streams of all responders from the seed """
+        master = random.Random(seed)
+        for responder in self.__responders:
+            responder.random.seed(master.getrandbits(64))
+
+    def checkout(self, session=None):
+        """
+        Takes a responder out of the pool, waiting if none is free.
+
+        :param session: hashable key of the session, e.g. the id of its
+            Conversation, None if the session does not matter
+        :return: CompiledChat to be returned by checkin
+        """
+        with self.__condition:
+            while not self.__free:
+                self.__condition.wait()
+
+            index = self.__sessions.get(session)
+            if index is None or index not in self.__free:
+                index = self.__free[-1]
+            self.__free.remove(index)
+
+            if session is not None:
+                self.__sessions[session] = index
+                self.__sessions.move_to_end(session)
+                if len(self.__sessions) > self.__max_sessions:
+                    self.__sessions.popitem(last=False)
+            return self.__responders[index]
+
+    def checkin(self, responder):
+        """ Returns a checked out responder to the pool """
+        with self.__condition:
+            self.__free.append(self.__indices[id(responder)])
+            self.__condition.notify()
+
+    @contextmanager
+    def responder(self, session=None):
+        """ Context manager of a checked out responder of the session """
+        responder = self.checkout(session)
+        try:
+            yield responder
+        finally:
+            self.checkin(responder)
+
+    def respond(self, text, session=None):
+        """ Generates the response to the text with the session's responder """
+        with self.responder(session) as responder:
+            return responder.respond(text)
+
+eliza_chatbot = CompiledChat()
+responder_pool = ResponderPool()
@@ -5,310 +5,140 @@ persona speaking the utterance and detail variables in how to say the utterance,
 such as the chosen sentiment for the utterance, which may be different from the
 persona's personality.
 
+The canned text itself lives in template files compiled into phrase banks, see
+phrase_bank.
+
 :author: Derek S. Prijatelj
 """
-from datetime import datetime
 from random import choice, getrandbits
+import numpy as np
 from conversation import QuestionType as QT
-from nlg import insult
+from nlg import insult, shuffle_bag
+from nlg.phrase_bank import get_phrase_bank, persona_phrase_bank
 
 def greeting(persona, conversation, sentiment=None, formal=None):
     """ Given persona, selects appropriate response. """
-    neutral_formal = ["hello", "greetings"]
-    neutral_informal = ["hi", "hey", "hey there"]
-    pos = []
-
-    now = datetime.now()
-
-    if now.hour < 12:
-        pos += ["good morning", "good day"]
-        neutral_informal += ["morning"]
-    elif now.hour >= 12 and now.hour <= 19:
-        pos += ["good afternoon", "good day"]
-        neutral_informal += ["afternoon"]
-    else:
-        pos += ["good evening"]
-        neutral_informal += ["evening"]
-
-    neutral = formality_select(neutral_formal, neutral_informal, formal)
-
-    return sentiment_select(persona, sentiment, neutral, pos)
+    return phrase(persona, conversation, "greeting", sentiment, formal)
 
 def farewell(persona, conversation, sentiment=None, formal=None):
-    neutral_formal = ["goodbye", "farewell"]
-    neutral_informal = ["bye", "later", "see you later", "talk to you later",
-        "so long", "until next time"]
-    pos_formal = []
-    pos_informal = ["have a good one", "take it easy", "take care"]
-    neg = ["I am done with you", "good riddance", "we're done"]
-    #insult = ["sod off"]
-
     # farewell initial
     # I've got to get going or I must be going
     # farewell responses
     # "I look forward to our next meeting"
-
-    now = datetime.now()
-
-    if now.hour <= 19:
-        pos_formal += ["ave a good day", "have a nice day"]
-    else:
-        pos_formal += ["have a good evening"]
-        pos_informal += ["good night"]
-
-    neutral = formality_select(neutral_formal, neutral_informal, formal)
-    pos = formality_select(pos_formal, pos_informal, formal)
-
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "farewell", sentiment, formal)
 
 def agreement(persona, conversation, sentiment=None, formal=None):
-    neutral = ["I agree", "I agree with you"]
-    pos = ["definitely", "absolutely"]
-    neg = ["I suppose I agree", "I suppose I agree with you",
-        "unfortunately, I agree", "unforunteately, I agree with you"]
-
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "agreement", sentiment, formal)
 
 def disagreement(persona, conversation, sentiment=None, formal=None):
-    neutral = ["I disagree", "I disagree with you"]
-    pos = ["I definitely disagree", "I absolutely disagree"]
-    neg = ["I suppose I disagree", "I suppose I disagree with you",
-        "unfortunately, I disagree", "unforunteately, I disagree with you"]
-
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "disagreement", sentiment, formal)
 
 def confirm(persona, conversation, sentiment=None, formal=None):
-    neutral_formal = ["yes"]
-    neutral_informal = ["yeah", "okay"] # uh-huh mm-hmm??
-    pos = ["absolutely, yes", "definitely, yes", "definitely, yes"]
-    neg = ["unfortunately, yes"]
-
-    neutral = formality_select(neutral_formal, neutral_informal, formal)
-
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "confirm", sentiment, formal)
 
 def disconfirm(persona, conversation, sentiment=None, formal=None):
-    neutral_formal = ["no"]
-    neutral_informal = ["nah"]
-    pos = ["unfortunately, no"]
-    neg = ["absolutely not", "definitely not", "definitely no"]
-
-    neutral = formality_select(neutral_formal, neutral_informal, formal)
-
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "disconfirm", sentiment, formal)
 
 def thanks(persona, conversation, sentiment=None, formal=None):
-    neutral_formal = ["thank you"]
-    neutral_informal = ["thanks"]
-    pos = ["thank you very much"]
-    neg = ["thanks for nothing"]
-
-    neutral = formality_select(neutral_formal, neutral_informal, formal)
-
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "thanks", sentiment, formal)
 
 def apology(persona, conversation, sentiment=None, formal=None):
-    neutral_formal = ["I apologize", "I did not mean to offend",
-        "I did not intend any offense", "I did not mean any offense"]
-    neutral_informal = ["I am sorry"]
-    pos = ["please forgive me"]
-    neg = ["I beg your pardon", "Forgive me"]
-
-    neutral = formality_select(neutral_formal, neutral_informal, formal)
-
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "apology", sentiment, formal)
 
 def backchannel(persona, conversation, sentiment=None, formal=None):
-    neutral = ["uh-huh", "hmm", "mm-hmm", "okay", "I see"]
-    pos = ["wow"]
-
-    return sentiment_select(persona, sentiment, neutral, pos)
+    return phrase(persona, conversation, "backchannel", sentiment, formal)
 
 def request_confirmation(persona, conversation, sentiment=None, formal=None):
-    neutral = ["really", "Is that so"]
-    return sentiment_select(persona, sentiment, neutral)
+    return phrase(persona, conversation, "request_confirmation",
+        sentiment, formal)
 
 def request_clarification(persona, conversation, sentiment=None, formal=None):
-    neutral = ["could you repeat that", "could you clarify that",
-        "what do you mean", "In what way", "could you elaborate on that",
-        "could you rephrase that"]
-    pos = ["could you please repeat that", "could you please clarify that",
-        "could you please rephrase that", "could you please elaborate"]
-    neg = ["you need to do a better job explaining what you mean"]
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "request_clarification",
+        sentiment, formal)
 
 # TODO requires past phrase, include topic
 def query(persona, conversation, sentiment=None, formal=None, topic="that"):
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "query", sentiment, formal, topic)
 
 """
     Probably will need more articulation for Statement and Question.
     Such as ensuring a statement was not already said or asked...
 """
-def question_information(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    neutral = ["tell me more", "inform me on " + topic]
-    pos = ["please", "could you"]
-    pos = [s1 + " " + s2 for s1 in pos for s2 in neutral]
-    neg = [
-        "what else is there on " + topic,
-        "tell me more " + negative_adj(formal) + " garbage on " + topic
-    ]
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
-
-def question_experience(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    neutral = [
-        "do you have an experience with " + topic,
-        "do you have an interesting experience with " + topic,
-        "do you have a notable experience with " + topic,
-    ]
-    pos_formal = [
-        "could you please share your experience with " + topic,
-        "could you please share a notable experience with " + topic,
-        "could you please share an interesting experience with " + topic
-    ]
-    pos_informal = [
-        "what kind of " + positive_adj(formal)
-            + " experience have you had with " + topic
-    ]
-    neg = [
-        "what kind of " + negative_adj(formal)
-            + " experience have you had with " + topic
-    ]
-
-    pos = formality_select(pos_formal, pos_informal, formal)
-
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
-
-def question_preference(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    if question_type == QT.polar:
-        neutral = ["do you have a preference on " + topic]
-    else: # elif question_type == QT.wh:
-        neutral = ["what is your preference on " + topic]
-        neg = ["what is your " + negative_adj(formal) + " preference on "
-            + topic]
-    return sentiment_select(persona, sentiment, neutral, neg=neg)
-
-def question_opinion(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    if question_type == QT.polar:
-        neutral = ["do you have a opinion on " + topic]
-    else: # elif question_type == QT.wh:
-        neutral = ["what is your opinion on " + topic]
-        neg = ["what is your " + negative_adj(formal) + " opinion on " + topic]
-
-    return sentiment_select(persona, sentiment, neutral, neg=neg)
-
-def question_desire(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
+def question_information(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    return phrase(persona, conversation, "question_information",
+        sentiment, formal, topic)
+
+def question_experience(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    return phrase(persona, conversation, "question_experience",
+        sentiment, formal, topic)
+
+def question_preference(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    key = "question_preference:polar" if question_type == QT.polar \
+        else "question_preference"
+    return phrase(persona, conversation, key, sentiment, formal, topic)
+
+def question_opinion(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    key = "question_opinion:polar" if question_type == QT.polar \
+        else "question_opinion"
+    return phrase(persona, conversation, key, sentiment, formal, topic)
+
+def question_desire(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
     if topic == "general" or topic == "self_user":
-        neutral = [
-            "what are your wants",
-            "what are your desires"
-        ]
-        if question_type == QT.polar:
-            neg = ["is there something you want"]
-        else:
-            neg = ["what do you want"]
+        key = "question_desire:general:polar" if question_type == QT.polar \
+            else "question_desire:general"
     else:
-        neutral = ["do you want to do something with regards to " + topic]
-        neg = ["I suppose you want to do something with regards to " + topic]
-    return sentiment_select(persona, sentiment, neutral, neg=neg)
+        key = "question_desire"
+    return phrase(persona, conversation, key, sentiment, formal, topic)
 
-def question_plan(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
+def question_plan(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
     #if topic == "general" or topic == "self_user":
-    neutral = ["what are your plans"]
-    neg = ["what are your " + negative_adj(formal) + " plans"]
-    return sentiment_select(persona, sentiment, neutral, neg=neg)
-
-def statement_information(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    neutral = [
-        "I do not have much to say on " + topic,
-        topic + " is a topic of conversation"
-    ]
-
-    neg = [insult_gen()]
-    neg = [s1 + ", " + s2 for s1 in neg for s2 in neutral]
-
-    return sentiment_select(persona, sentiment, neutral,neg=neg)
-
-def statement_experience(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    neutral = [
-        "I have no experience with " + topic,
-        "I have limited experience with " + topic,
-        "I have minimal experience with " + topic,
-        "I have no noteworthy experience with " + topic
-    ]
-
-    neg = [insult_gen()]
-    neg = [s1 + ", " + s2 for s1 in neg for s2 in neutral]
-
-    return sentiment_select(persona, sentiment, neutral,neg=neg)
-
-def statement_preference(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    return statement_opinion(persona, conversation, sentiment, formal, topic, question_type)
-    #return sentiment_select(persona, conversation, sentiment, neutral, pos, neg)
-
-def statement_opinion(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    neutral = ["I am impartial to " + topic]
-    neg = [
-        "I don't care for this " + negative_adj(formal) + " subject",
-        "I do not like " + topic
-    ]
-    pos = [
-        "I like " + topic
-    ]
-
-    return sentiment_select(persona, sentiment, neutral, pos, neg)
-
-def statement_desire(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    neutral = [
-        "I have no desire with regards to " + topic,
-        "I have limited desire with regards to " + topic,
-        "I have minimal desire with regards to " + topic,
-        "I have no noteworthy desire with regards to " + topic,
-        "I have no want with regards to " + topic,
-        "I have limited want with regards to " + topic,
-        "I have minimal want with regards to " + topic,
-        "I have no noteworthy want with regards to " + topic
-    ]
-
-    neg = [insult_gen()]
-    neg = [s1 + ", " + s2 for s1 in neg for s2 in neutral]
-
-    return sentiment_select(persona, sentiment, neutral,neg=neg)
-
-def statement_plan(persona, conversation, sentiment=None, formal=None, topic="that",
-        question_type=None):
-    neutral = [
-        "I have no plans with regards to " + topic,
-        "I have limited plans with regards to " + topic,
-        "I have minimal plans with regards to " + topic,
-        "I have no noteworthy plans with regards to " + topic,
-        "I have no plans related to " + topic,
-        "I have limited plans related to " + topic,
-        "I have minimal plans related to " + topic,
-        "I have no noteworthy plans related to " + topic
-    ]
-
-    neg = [insult_gen()]
-    neg = [s1 + ", " + s2 for s1 in neg for s2 in neutral]
-
-    return sentiment_select(persona, sentiment, neutral,neg=neg)
-
-    #return sentiment_select(persona, sentiment, neutral, pos, neg)
+    return phrase(persona, conversation, "question_plan",
+        sentiment, formal, topic)
+
+def statement_information(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    return phrase(persona, conversation, "statement_information",
+        sentiment, formal, topic)
+
+def statement_experience(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    return phrase(persona, conversation, "statement_experience",
+        sentiment, formal, topic)
+
+def statement_preference(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    return statement_opinion(persona, conversation, sentiment, formal, topic,
+        question_type)
+
+def statement_opinion(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    return phrase(persona, conversation, "statement_opinion",
+        sentiment, formal, topic)
+
+def statement_desire(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    return phrase(persona, conversation, "statement_desire",
+        sentiment, formal, topic)
+
+def statement_plan(persona, conversation, sentiment=None, formal=None,
+        topic="that", question_type=None):
+    return phrase(persona, conversation, "statement_plan",
+        sentiment, formal, topic)
 
 def insult_gen():
     return insult.shakespeare(bool(getrandbits(1)), bool(getrandbits(1)))
 
+def insult_gen_many(count):
+    """ Returns count insults as from insult_gen, generated at once """
+    adverb, adjective = np.random.randint(2, size=(2, count)).astype(bool)
+    return insult.shakespeare_many(count, adverb, adjective)
+
 def compliment():
     return
 
@@ -322,66 +152,73 @@ def paraphrase(persona, conversation, sentiment=None, formal=None):
 # non-dialogue act specific:
 def query_user_general_experience(persona, conversation, sentiment=None,
         formal=None):
-    netural_formal = [
-        "anything new with you",
-        "what is new with you",
-        "what are you up to"
-    ]
-    neutral_informal = [
-        "sup",
-        "what's up with you",
-        "what's new",
-        "what's up",
-        "anything new",
-        "what's going on"
-    ]
-    neutral = formality_select(neutral_formal, neutral_informal, formal)
-
-    return choice(neutral)
+    return phrase(persona, conversation, "query_user_general_experience",
+        sentiment, formal)
 
 def query_user_general_information(persona, conversation, sentiment=None,
         formal=None):
-    netural_formal = [
-        "how are you",
-        "how are you doing",
-        "how have you been",
-    ]
-    neutral_informal = [
-        "how's everything",
-        "how is everything"
-    ]
-    neutral = formality_select(neutral_formal, neutral_informal, formal)
-
-    return choice(neutral)
+    return phrase(persona, conversation, "query_user_general_information",
+        sentiment, formal)
 
 # Helper Methods:
-def sentiment_select(persona, sentiment, neutral, pos=None, neg=None):
+def phrase(persona, conversation, key, sentiment=None, formal=None,
+        topic="that"):
+    """
+    Selects a phrase of the response from the persona's phrase bank. Phrases
+    are not repeated within a conversation until all others were used.
+
+    :param conversation: Conversation of the phrase, or None
+    :param key: str response key of the phrase bank
+    :param sentiment: int sentiment, defaults to the persona's mood
+    :param formal: Bool that determines if formal or not, None for either
+    :param topic: str topic of the phrase
+    :return: Returns a randomly selected phrase based on sentiment
+    """
+    if sentiment is None:
+        sentiment = persona.personality.mood
+    return persona_phrase_bank(persona).phrase(key, sentiment, formal, topic,
+        bags=None if conversation is None else conversation.phrase_bags)
+
+def sentiment_select(persona, sentiment, neutral, pos=None, neg=None,
+        conversation=None, key=None):
     """
     Selects element from the provided lists of different sentiment types.
+    :param conversation: Conversation within which elements are not repeated
+        until all others were selected, None for independent selections
+    :param key: hashable identifier of the lists, such as the name of the
+        response, which keys their ShuffleBags in the conversation. Required
+        with a conversation.
     :return: Returns a randomly selected element based on sentiment
     """
     # TODO perhaps have persona/sentiment accept either a person obj, or int val
     # use conditional statement to determine type and how to handle.
     sentiment = sentiment if sentiment is not None else persona.personality.mood
     if neg is not None and sentiment < 4:
-        return choice(neg)
+        selection, band = neg, "neg"
     elif pos is not None and sentiment > 6:
-        return choice(pos)
+        selection, band = pos, "pos"
     else:
-        return choice(neutral)
+        selection, band = neutral, "neutral"
+
+    if conversation is None:
+        return choice(selection)
+    if key is None:
+        raise ValueError("Selecting within a conversation requires a key")
+    return selection[shuffle_bag.draw(conversation.phrase_bags,
+        ("sentiment_select", key, band), len(selection))]
 
 def formality_select(formal_list, informal, formal=None):
     """
     Returns a list with the appropriate type of formality in its elements.
-    :param formal: Bool that determines if formal or not.
+    :param formal: Bool that determines if formal or not, None for either.
     :return: Returns a list based on formality
     """
-    if formal_list is None:
+    if formal is None:
         return formal_list + informal
-    elif formal_list:
-        return formal_list
-    elif not formal_list:
-        return informal
+    elif formal:
+        return formal_list if formal_list else informal
+    else:
+        return informal if informal else formal_list
 
 def question_type_select(question_type, **kargs):
     return
@@ -389,11 +226,7 @@ def question_type_select(question_type, **kargs):
 # TODO perhaps find and use a preexisting word list for these and others?
 # OR, actually use an ontology and infer what is a negative adj, etc...
 def positive_adj(formal=None):
-    formal_adj = ["excellent", "wonderful", "good", "great", "delightful"]
-    informal_adj = ["superb"]
-    return choice(formality_select(formal_adj, informal_adj, formal))
+    return get_phrase_bank().adjective("pos", formal)
 
 def negative_adj(formal=None):
-    formal_adj = ["pathetic", "unintelligent", "foolish", "terrible"]
-    informal_adj = ["lame", "stupid", "idiotic"]
-    return choice(formality_select(formal_adj, informal_adj, formal))
+    return get_phrase_bank().adjective("neg", formal)
@@ -9,26 +9,107 @@ http://www.pangloss.com/seidel/shake_rule.html
 
 This serves mostly for humor and a place holder for insult generation.
 
+The word lists are loaded once per process and only reloaded when the file is
+modified. An insult is drawn as one index into each list.
+
 :author: Derek S. Prijatelj
 """
-from yaml import load
-from random import choice
+import os
+from random import randrange
+import numpy as np
+from yaml import safe_load
 
-def shakespeare(adverb=True, adjective=True, noun=True, complete=True):
-    with open("../data/insults/shakespeare_insults.yaml") as insult_parts:
-        insult_parts = load(insult_parts)
-        insult = ""
-        if adverb:
-            insult += choice(insult_parts["adverb"])
-        if adjective:
-            insult += choice(insult_parts["adjective"]) if insult == "" else \
-                " " + choice(insult_parts["adjective"])
-        if noun:
-            insult += choice(insult_parts["noun"]) if insult == "" else \
-                " " + choice(insult_parts["noun"])
+INSULTS_PATH = "../data/insults/shakespeare_insults.yaml"
+PARTS = ("adverb", "adjective", "noun")
+
+class InsultVocabulary(object):
+    """
+    The word lists of the insults.
+
+    :param words: Dictionary of "adverb", "adjective" and "noun" to the list
+        of str words of that part
+    :param path: str path of the file the words were loaded from
+    :param mtime: int modification time of the file in nanoseconds
+    """
+    def __init__(self, words, path=None, mtime=None):
+        for part in PARTS:
+            if not words.get(part):
+                raise ValueError("Insult vocabulary has no " + part + "s")
+        self.__words = tuple(tuple(words[part]) for part in PARTS)
+        self.__path = path
+        self.__mtime = mtime
+
+    @property
+    def words(self):
+        """Tuple of the tuples of adverbs, adjectives and nouns"""
+        return self.__words
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def mtime(self):
+        return self.__mtime
+
+    def insult(self, adverb=True, adjective=True, noun=True, complete=True):
+        """ Random insult made of the selected parts """
+        words = [part[randrange(len(part))] for part, selected
+            in zip(self.__words, (adverb, adjective, noun)) if selected]
         if complete:
-            insult = "you " + insult
-    return insult
+            words.insert(0, "you")
+        return " ".join(words)
+
+    def insults(self, count, adverb=True, adjective=True, noun=True,
+            complete=True):
+        """
+        Random insults, drawing the indices of all of them at once.
+
+        :param count: int number of insults
+        :param adverb: Bool or sequence of count Bools of whether each insult
+            has an adverb, likewise for adjective and noun
+        :return: list of str insults
+        """
+        columns = []
+        for part, selected in zip(self.__words, (adverb, adjective, noun)):
+            selected = np.broadcast_to(np.asarray(selected, dtype=bool),
+                (count,))
+            indices = np.random.randint(len(part), size=count)
+            columns.append([part[i] if s else None
+                for i, s in zip(indices.tolist(), selected.tolist())])
+
+        prefix = ["you"] if complete else []
+        return [" ".join(prefix + [w for w in words if w is not None])
+            for words in zip(*columns)]
+
+def load_insult_vocabulary(path=INSULTS_PATH):
+    """ Loads the InsultVocabulary of the yaml file at the given path """
+    mtime = os.stat(path).st_mtime_ns
+    with open(path) as insult_parts:
+        words = safe_load(insult_parts)
+    return InsultVocabulary(words, path, mtime)
+
+_vocabularies = {}
+
+def get_insult_vocabulary(path=INSULTS_PATH):
+    """
+    Returns the process-wide InsultVocabulary for the given path, only
+    reloading it when the file has been modified since it was last loaded.
+    """
+    vocabulary = _vocabularies.get(path)
+    if vocabulary is None or vocabulary.mtime != os.stat(path).st_mtime_ns:
+        vocabulary = load_insult_vocabulary(path)
+        _vocabularies[path] = vocabulary
+    return vocabulary
+
+def shakespeare(adverb=True, adjective=True, noun=True, complete=True):
+    return get_insult_vocabulary().insult(adverb, adjective, noun, complete)
+
+def shakespeare_many(count, adverb=True, adjective=True, noun=True,
+        complete=True):
+    """ Returns count insults at once, see InsultVocabulary.insults """
+    return get_insult_vocabulary().insults(count, adverb, adjective, noun,
+        complete)
 
 def main():
     insult = shakespeare()
@@ -5,10 +5,11 @@ persona's response utterance.
 :author: Derek S. Prijatelj
 """
 
-from nltk.chat.eliza import eliza_chatbot
 from conversation import DialogueAct as DA, is_statement, is_question, \
     is_response_action, is_backchannel
 from nlg import generic_response
+from nlg.eliza import responder_pool
+from nlg.phrase_bank import persona_phrase_bank
 
 def generate_response_text(utterance_metadata, persona, conversation):
     """
@@ -17,111 +18,82 @@ def generate_response_text(utterance_metadata, persona, conversation):
 
     :return: str Text that matches the corresponding Utterance metadata.
     """
-    if is_statement(utterance_metadata.dialogue_act):
-        text = statement(utterance_metadata, persona, conversation)
-    elif is_question(utterance_metadata.dialogue_act):
-        text = question(utterance_metadata, persona, conversation)
-    elif is_response_action(utterance_metadata.dialogue_act):
-        text = response_action(
-            utterance_metadata, persona, conversation)
-    elif is_backchannel(utterance_metadata.dialogue_act):
-        text = backchannel(utterance_metadata, persona, conversation)
-    else:
-        text = other(utterance_metadata, persona, conversation)
+    text = GENERATORS[utterance_metadata.dialogue_act](
+        utterance_metadata, persona, conversation)
 
     if text != '' and utterance_metadata.sentiment <= 1:
-        insult = generic_response.insult_gen()
-        text = text + ' ' + insult[0].upper() + insult[1:]
+        text = insult_text(text, generic_response.insult_gen(),
+            utterance_metadata.assertiveness)
 
-        text = text+'!' if utterance_metadata.assertiveness >= 9 else text+'.'
-
-    # TODO returning the utterance object may be unnecessary, given set_text()
+    # TODO returning the utterance object may be unnecessary, given with_text()
     return text
 
-def statement(utterance_metadata, persona, conversation):
-    #if utterance_metadata.dialogue_act == DA.statement:
-    #    text = generic_response.statement(persona, conversation)
-    if utterance_metadata.dialogue_act == DA.statement_information:
-        text = generic_response.statement_information(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.statement_experience:
-        text = generic_response.statement_experience(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.statement_preference:
-        text = generic_response.statement_preference(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.statement_opinion:
-        text = generic_response.statement_opinion(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.statement_desire:
-        text = generic_response.statement_desire(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.statement_plan:
-        text = generic_response.statement_plan(persona, conversation)
-
-    return text[0].upper() + text[1:] + "."
-    #utterance_metadata.set_text(text)
-    #return utterance_metadata
-
-def question(utterance_metadata, persona, conversation):
-    #if utterance_metadata.dialogue_act == DA.question:
-    #    text = generic_response.question(persona, conversation)
-    if utterance_metadata.dialogue_act == DA.question_information:
-        text = generic_response.question_information(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.question_experience:
-        text = generic_response.question_experience(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.question_preference:
-        text = generic_response.question_preference(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.question_opinion:
-        text = generic_response.question_opinion(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.question_desire:
-        text = generic_response.question_desire(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.question_plan:
-        text = generic_response.question_plan(persona, conversation)
-
-    return text[0].upper() + text[1:] + "?"
-    #utterance_metadata.set_text(text)
-    #return utterance_metadata
-
-def response_action(utterance_metadata, persona, conversation):
-    if utterance_metadata.dialogue_act == DA.greeting:
-        text = generic_response.greeting(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.farewell:
-        text = generic_response.farewell(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.thanks:
-        text = generic_response.thanks(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.apology:
-        text = generic_response.apology(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.confirm:
-        text = generic_response.confirm(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.disconfirm:
-        text = generic_response.disconfirm(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.agreement:
-        text = generic_response.agreement(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.disagreement:
-        text = generic_response.disagreement(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.silence:
-        text = generic_response.silence(persona, conversation)
-
-    if text != "":
-        text = text[0].upper() + text[1:] + "."
-    return text
-    #utterance_metadata.set_text(text)
-    #return utterance_metadata
-
-def backchannel(utterance_metadata, persona, conversation):
-    if utterance_metadata.dialogue_act == DA.backchannel:
-        text = generic_response.backchannel(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.request_confirmation:
-        text = generic_response.request_confirmation(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.request_clarification:
-        text = generic_response.request_clarification(persona, conversation)
-    elif utterance_metadata.dialogue_act == DA.repeat:
-        #utterance_metadata.set_text(persona.utterances[-1])
-        # TODO add conversation/convo history/last utterance to these
-        #utterance_metadata.set_text("Please repeat that.")
-        return "Please repeat that."
-    elif utterance_metadata.dialogue_act == DA.paraphrase:
-        text = generic_response.paraphrase(persona, conversation)
-
-    return text[0].upper() + text[1:] + "."
-    #utterance_metadata.set_text(text)
-    #return utterance_metadata
+def generate_response_texts(utterances, persona, conversation):
+    """
+    Generate the texts of many utterance metadata at once. The utterances
+    are grouped by dialogue act and persona, and the canned texts of each
+    group are drawn in bulk from the phrase bank.
+
+    :param utterances: sequence of Utterance metadata
+    :param persona: Persona of all the utterances, or sequence of the Persona
+        of each utterance
+    :param conversation: Conversation of all the utterances, or sequence of the
+        Conversation of each utterance
+    :return: list of str texts in the order of the utterances
+    """
+    count = len(utterances)
+    personas = persona if isinstance(persona, (list, tuple)) \
+        else [persona] * count
+    conversations = conversation if isinstance(conversation, (list, tuple)) \
+        else [conversation] * count
+
+    # (phrase bank key, id of persona) to the indices of the utterances
+    groups = {}
+    texts = [None] * count
+    for i, utterance in enumerate(utterances):
+        response = PHRASES.get(utterance.dialogue_act)
+        if response is None:
+            texts[i] = GENERATORS[utterance.dialogue_act](
+                utterance, personas[i], conversations[i])
+        else:
+            groups.setdefault((response, id(personas[i])), []).append(i)
+
+    for ((key, end), _), indices in groups.items():
+        persona = personas[indices[0]]
+        phrases = persona_phrase_bank(persona).phrases(key,
+            persona.personality.mood, len(indices),
+            bags=[conversations[i].phrase_bags for i in indices])
+        for i, text in zip(indices, phrases):
+            texts[i] = finish(text, end)
+
+    insulted = [i for i, utterance in enumerate(utterances)
+        if texts[i] != '' and utterance.sentiment <= 1]
+    if insulted:
+        for i, insult in zip(insulted,
+                generic_response.insult_gen_many(len(insulted))):
+            texts[i] = insult_text(texts[i], insult,
+                utterances[i].assertiveness)
+    return texts
+
+def finish(text, end):
+    """ Capitalizes the text and ends it with the punctuation, unless empty """
+    if text == "":
+        return text
+    return text[0].upper() + text[1:] + end
+
+def insult_text(text, insult, assertiveness):
+    """ Appends the insult to the text """
+    text = text + ' ' + insult[0].upper() + insult[1:]
+    return text + '!' if assertiveness >= 9 else text + '.'
+
+def repeat(utterance_metadata, persona, conversation):
+    #utterance_metadata.set_text(persona.utterances[-1])
+    # TODO add conversation/convo history/last utterance to these
+    #utterance_metadata.set_text("Please repeat that.")
+    return "Please repeat that."
+
+def silence(utterance_metadata, persona, conversation):
+    return generic_response.silence(persona, conversation)
 
 def other(utterance_metadata, persona, conversation):
     # TODO somehow implement other...
@@ -129,9 +101,38 @@ def other(utterance_metadata, persona, conversation):
     #utterance_metadata.set_text(text)
     last_utterance = conversation.last_utterance
     if last_utterance is None:
-        return eliza_chatbot.respond("")
-    return eliza_chatbot.respond(last_utterance.text)
-
+        return responder_pool.respond("", id(conversation))
+    return responder_pool.respond(last_utterance.text, id(conversation))
+
+def _canned(key, end):
+    """ Helper function of the generator of a phrase bank response """
+    def generate(utterance_metadata, persona, conversation):
+        return finish(generic_response.phrase(persona, conversation, key),
+            end)
+    return generate
+
+# DialogueAct to the phrase bank key and end punctuation of its canned text
+PHRASES = {}
+for _da in DA:
+    if is_statement(_da) and _da is not DA.statement:
+        PHRASES[_da] = (_da.name, ".")
+    elif is_question(_da) and _da is not DA.question:
+        PHRASES[_da] = (_da.name, "?")
+    elif (is_response_action(_da) and _da is not DA.response_action) \
+            or is_backchannel(_da):
+        PHRASES[_da] = (_da.name, ".")
+PHRASES[DA.statement_preference] = ("statement_opinion", ".")
+PHRASES[DA.paraphrase] = ("request_confirmation", ".")
+del PHRASES[DA.silence], PHRASES[DA.repeat]
+
+# DialogueAct to the function generating its text. The dummy dialogue acts
+# statement, question and response_action are treated as other.
+GENERATORS = {da: other for da in DA}
+for _da, (_key, _end) in PHRASES.items():
+    GENERATORS[_da] = _canned(_key, _end)
+GENERATORS[DA.silence] = silence
+GENERATORS[DA.repeat] = repeat
+del _da, _key, _end
 
 def finish_text(text, is_question, sentiment=None, formal=None):
     text = text[0].upper() + text[1:]
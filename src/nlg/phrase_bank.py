@@ -0,0 +1,273 @@
+"""
+The text of the generic responses, compiled from template files into phrase
+banks.
+
+The templates live in data/nlg_templates/. The phrases of each response are
+declared by sentiment band, where every entry is either a str template or a
+Dictionary of the "text" templates and the conditions under which they apply:
+"formal" True or False and the "time" of day buckets. A PhraseBank compiles
+these into a tuple of templates for every (response, sentiment band,
+formality, time of day) key, and each template into its literal text and
+slots, so generating a phrase is a lookup, a random choice and one join.
+Templates may contain the slots {topic}, {insult}, {neg_adj} and {pos_adj},
+which are only filled for the chosen template.
+
+Phrase banks are cached per file and recompiled when the file is modified. The
+new bank replaces the old one only once compiled, so sessions holding the old
+bank keep using it until their next lookup.
+"""
+
+import json
+import os
+from datetime import datetime
+from random import choice
+from string import Formatter
+import numpy as np
+from nlg import shuffle_bag
+
+TEMPLATES_PATH = "../data/nlg_templates/default.json"
+
+SENTIMENT_BANDS = ("neg", "neutral", "pos")
+FORMALITIES = (True, False, None)
+TIMES_OF_DAY = ("morning", "afternoon", "evening")
+SLOTS = ("topic", "insult", "neg_adj", "pos_adj")
+
+def sentiment_band(sentiment):
+    """ The sentiment band of the sentiment, from 1 to 10 """
+    if sentiment < 4:
+        return "neg"
+    if sentiment > 6:
+        return "pos"
+    return "neutral"
+
+def time_of_day(now=None):
+    """ The time of day bucket of the datetime, defaults to now """
+    hour = (datetime.now() if now is None else now).hour
+    if hour < 12:
+        return "morning"
+    if hour <= 19:
+        return "afternoon"
+    return "evening"
+
+class PhraseBank(object):
+    """
+    Compiled phrases of the generic responses.
+
+    :param phrases: Dictionary of str response key to Dictionary of sentiment
+        band to list of phrase entries
+    :param adjectives: Dictionary of "pos" and "neg" to list of adjective
+        entries, in the format of the phrase entries
+    :param name: str name of the templates
+    :param path: str path of the file the templates were loaded from
+    :param mtime: int modification time of the file in nanoseconds
+    """
+    def __init__(self, phrases, adjectives, name=None, path=None, mtime=None):
+        for key, bands in phrases.items():
+            if not bands.get("neutral"):
+                raise ValueError("Response " + key + " has no neutral phrases")
+        for polarity in ("pos", "neg"):
+            if not self.__select(adjectives.get(polarity, [])):
+                raise ValueError("No " + polarity + " adjectives")
+
+        self.__templates = {}
+        for key, bands in phrases.items():
+            for band in SENTIMENT_BANDS:
+                # Bands without phrases of their own fall back to neutral
+                entries = bands.get(band) or bands["neutral"]
+                for formal in FORMALITIES:
+                    for time in TIMES_OF_DAY:
+                        self.__templates[(key, band, formal, time)] = tuple(
+                            self.__compile(text) for text
+                            in self.__select(entries, formal, time))
+
+        self.__adjectives = {
+            (polarity, formal): tuple(self.__select(entries, formal))
+            for polarity, entries in adjectives.items()
+            for formal in FORMALITIES
+        }
+
+        self.__name = name
+        self.__path = path
+        self.__mtime = mtime
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def mtime(self):
+        return self.__mtime
+
+    @staticmethod
+    def __select(entries, formal=None, time=None):
+        """
+        Helper function of the text of the entries that apply to the
+        formality and time of day. None matches either formality, and if no
+        entry is of the requested formality those of the other are used.
+        """
+        def texts(formal):
+            selected = []
+            for entry in entries:
+                if isinstance(entry, str):
+                    selected.append(entry)
+                elif (formal is None
+                        or entry.get("formal", formal) == formal) \
+                        and (time is None
+                        or time in entry.get("time", [time])):
+                    selected += entry["text"]
+            return selected
+
+        selected = texts(formal)
+        return selected if selected or formal is None else texts(None)
+
+    @staticmethod
+    def __compile(text):
+        """
+        Helper function splitting a template into its parts, the literal text
+        at even indices and the slots at odd indices, paired with its slots.
+        """
+        parts = []
+        for literal, slot, _, _ in Formatter().parse(text):
+            if parts and len(parts) % 2 == 1:
+                parts[-1] += literal
+            else:
+                parts.append(literal)
+            if slot is not None:
+                if slot not in SLOTS:
+                    raise ValueError("Unknown slot {" + slot + "} in "
+                        + repr(text))
+                parts.append(slot)
+        if len(parts) % 2 == 0:
+            parts.append("")
+        return tuple(parts), frozenset(parts[1::2])
+
+    def templates(self, key, band="neutral", formal=None, time=None):
+        """
+        The templates of the response.
+
+        :param key: str response key, e.g. "greeting" or "question_opinion"
+        :param band: str sentiment band
+        :param formal: Bool formality, None for either
+        :param time: str time of day bucket, defaults to now
+        :return: tuple of (tuple of str parts, frozenset of str slots)
+        """
+        time = time_of_day() if time is None else time
+        try:
+            return self.__templates[(key, band, formal, time)]
+        except KeyError:
+            raise ValueError("No phrases for "
+                + str((key, band, formal, time)))
+
+    def adjective(self, polarity, formal=None):
+        """ Random "pos" or "neg" adjective of the formality """
+        return choice(self.__adjectives[(polarity, formal)])
+
+    def phrase(self, key, sentiment, formal=None, topic="that", time=None,
+            bags=None):
+        """
+        Random phrase of the response, with its slots filled.
+
+        :param key: str response key
+        :param sentiment: int sentiment from 1 to 10
+        :param formal: Bool formality, None for either
+        :param topic: str topic filling the {topic} slot
+        :param time: str time of day bucket, defaults to now
+        :param bags: Dictionary of the ShuffleBags of a conversation, which
+            then draws its phrases without repeats, see shuffle_bag
+        :return: str phrase
+        """
+        time = time_of_day() if time is None else time
+        band = sentiment_band(sentiment)
+        templates = self.templates(key, band, formal, time)
+        if bags is None:
+            parts, slots = choice(templates)
+        else:
+            parts, slots = templates[shuffle_bag.draw(bags,
+                (self.__path, key, band, formal, time), len(templates))]
+        if not slots:
+            return parts[0]
+        return _join(parts, {slot: self.__fill(slot, topic, formal)
+            for slot in slots})
+
+    def phrases(self, key, sentiment, count, formal=None, topic="that",
+            time=None, bags=None):
+        """
+        Random phrases of the response, drawing the templates of all of them
+        at once and the insults of those that need one in a single batch.
+
+        :param count: int number of phrases
+        :param bags: sequence of the count Dictionaries of ShuffleBags of the
+            conversations of the phrases, or None for those without
+        :return: list of str phrases
+        """
+        time = time_of_day() if time is None else time
+        band = sentiment_band(sentiment)
+        templates = self.templates(key, band, formal, time)
+        indices = np.random.randint(len(templates), size=count).tolist()
+        if bags is not None:
+            bag_key = (self.__path, key, band, formal, time)
+            indices = [i if b is None
+                else shuffle_bag.draw(b, bag_key, len(templates))
+                for i, b in zip(indices, bags)]
+        chosen = [templates[i] for i in indices]
+
+        # Imported here, as generic_response imports this module.
+        from nlg.generic_response import insult_gen_many
+        insulting = sum("insult" in slots for _, slots in chosen)
+        insults = iter(insult_gen_many(insulting) if insulting else [])
+
+        phrases = []
+        for parts, slots in chosen:
+            phrases.append(_join(parts, {slot: next(insults)
+                if slot == "insult" else self.__fill(slot, topic, formal)
+                for slot in slots}) if slots else parts[0])
+        return phrases
+
+    def __fill(self, slot, topic, formal):
+        """ Helper function of the value of a slot """
+        if slot == "topic":
+            return topic
+        if slot == "insult":
+            from nlg.generic_response import insult_gen
+            return insult_gen()
+        if slot == "neg_adj":
+            return self.adjective("neg", formal)
+        return self.adjective("pos", formal)
+
+def _join(parts, values):
+    """ Helper function filling the slots of the parts of a template """
+    return "".join(part if i % 2 == 0 else values[part]
+        for i, part in enumerate(parts))
+
+def load_phrase_bank(path=TEMPLATES_PATH):
+    """ Loads and compiles the PhraseBank of the JSON templates at the path """
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, encoding="utf-8") as json_templates:
+        templates = json.load(json_templates)["nlg templates"]
+    return PhraseBank(templates["responses"], templates["adjectives"],
+        templates.get("name"), path, mtime)
+
+_phrase_banks = {}
+
+def get_phrase_bank(path=TEMPLATES_PATH):
+    """
+    Returns the process-wide PhraseBank for the given path, only recompiling
+    it when the file has been modified since it was last loaded.
+    """
+    phrase_bank = _phrase_banks.get(path)
+    if phrase_bank is None or phrase_bank.mtime != os.stat(path).st_mtime_ns:
+        phrase_bank = load_phrase_bank(path)
+        _phrase_banks[path] = phrase_bank
+    return phrase_bank
+
+def persona_phrase_bank(persona):
+    """
+    Returns the PhraseBank of the persona, given by the "templates" behavior
+    of its personality profile, defaulting to TEMPLATES_PATH.
+    """
+    behavior = getattr(persona, "behavior", None) or {}
+    return get_phrase_bank(behavior.get("templates", TEMPLATES_PATH))
@@ -0,0 +1,80 @@
+"""
+No-repeat sampling of phrases within a conversation.
+
+A ShuffleBag draws the indices of a phrase list without replacement, by one
+step of an incremental Fisher-Yates shuffle per draw, and starts over once all
+were drawn. Every phrase is used once before any is repeated, the same phrase
+is never drawn twice in a row, and each draw is O(1) with a byte of state per
+phrase. Conversations keep their bags in Conversation.phrase_bags, keyed by
+the phrase list they draw from.
+"""
+
+from array import array
+import random
+
+class ShuffleBag(object):
+    """
+    Sampler of the indices 0 to size - 1 without replacement.
+
+    :param size: int number of items in the bag
+    """
+    __slots__ = ("__order", "__position")
+
+    def __init__(self, size):
+        assert size > 0
+        self.__order = bytearray(range(size)) if size <= 256 \
+            else array("I", range(size))
+        # size until the first draw, which has no previous index to avoid
+        self.__position = size
+
+    @property
+    def size(self):
+        return len(self.__order)
+
+    def draw(self, rng=random):
+        """
+        Draws the next index.
+
+        :param rng: random.Random or the random module, drawing the index
+        """
+        order = self.__order
+        size = len(order)
+        position = self.__position
+        if position == size:
+            position, end = 0, size
+        elif position == 0 and size > 1:
+            # The last index of the previous round stays at the end, so it is
+            # excluded from the first draw of the next one.
+            end = size - 1
+        else:
+            end = size
+        j = rng.randrange(position, end)
+        order[position], order[j] = order[j], order[position]
+        self.__position = (position + 1) % size
+        return order[position]
+
+    def __copy__(self):
+        bag = ShuffleBag(1)
+        bag.__order = self.__order[:]
+        bag.__position = self.__position
+        return bag
+
+    def copy(self):
+        return self.__copy__()
+
+def draw(bags, key, size, rng=random):
+    """
+    Draws an index from the bag of the key, creating it if the key is new or
+    its phrase list changed size.
+
+    :param bags: Dictionary of keys to ShuffleBags, e.g. the phrase_bags of a
+        Conversation
+    :param key: hashable key of the phrase list
+    :param size: int length of the phrase list
+    :return: int index into the phrase list
+    """
+    bag = bags.get(key)
+    if bag is None or bag.size != size:
+        bag = ShuffleBag(size)
+        bags[key] = bag
+    return bag.draw(rng)
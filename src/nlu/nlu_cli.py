@@ -123,6 +123,13 @@ def parse_args():
         metavar="user mood"
     )
     #"""
+    parser.add_argument(
+        "-a", "--agent",
+        default=None,
+        help="The name of the intelligent agent deciding the chatbot's "
+            + "responses. Defaults to the agent of the personality profile, "
+            + "else static_matrix."
+    )
     return parser.parse_args()
 
 def main():
@@ -83,21 +83,23 @@ class Persona(object):
     # along with the existing Personality, Philosophy, and Preferences?
 
     def __init__(self, *args):
+        behavior = None
         if len(args) == 1:
             if isinstance(args[0], dict):
-                name, personality, topic_sentiment = self.extract_dict(
-                    args[0]
-                )
+                name, personality, topic_sentiment, behavior = \
+                    self.extract_dict(args[0])
             elif isinstance(args[0], str):
-                name, personality, topic_sentiment = \
+                name, personality, topic_sentiment, behavior = \
                     self.load_json(args[0])
-        elif len(args) >= 2 and len(args) <= 4:
+        elif len(args) >= 2 and len(args) <= 5:
             name = args[0]
             personality = Personality(args[1], args[2])
-            if len(args) == 4:
+            if len(args) >= 4:
                 topic_sentiment = args[3]
             else:
                 topic_sentiment = None
+            if len(args) == 5:
+                behavior = args[4]
 
         assert isinstance(name, str)
         assert isinstance(personality, Personality)
@@ -108,11 +110,15 @@ class Persona(object):
             assert isinstance(list(topic_sentiment.values())[0], int)
         else:
             topic_sentiment = OrderedDict()
+        assert isinstance(behavior, dict) or behavior is None
+        if behavior is None:
+            behavior = {}
 
         #self.__id = name # maybe necessary later, not in prototype. Use names.
         self.__name = name
         self.__personality = personality
         self.__topic_sentiment = topic_sentiment
+        self.__behavior = behavior
 
     @property
     def name(self):
@@ -126,6 +132,15 @@ class Persona(object):
     def topic_sentiment(self):
         return self.__topic_sentiment
 
+    @property
+    def behavior(self):
+        """
+        Dict of optional behavior settings of the personality profile, such
+        as "decision_rules", the path of the persona's rule set, or
+        "templates", the path of its NLG templates.
+        """
+        return self.__behavior
+
     # set functions for tracing errors
     def set_name(self, name):
         self.__name = name
@@ -150,8 +165,9 @@ class Persona(object):
             profile_dict["personality profile"]["personality"]["assertiveness"]
         )
         topic_sentiment = profile_dict["personality profile"]["preferences"]
+        behavior = profile_dict["personality profile"].get("behavior")
 
-        return name, personality, topic_sentiment
+        return name, personality, topic_sentiment, behavior
 
     def save_json(self, json_output_path):
         """ store personality profile (prototype's persona) into JSON """
@@ -186,6 +202,7 @@ class Persona(object):
             and self.__name == other.__name
             and self.__personality == other.__personality
             and self.__topic_sentiment == other.__topic_sentiment
+            and self.__behavior == other.__behavior
         )
 
     # Persona is mutable: not hashable by python standards
@@ -194,7 +211,8 @@ class Persona(object):
         return {
             "name": self.__name,
             "personality": vars(self.__personality),
-            "preferences": self.__topic_sentiment
+            "preferences": self.__topic_sentiment,
+            "behavior": self.__behavior
         }
         # TODO add philosophy part
         # TODO add explicit preferences
@@ -202,6 +220,8 @@ class Persona(object):
     def __copy__(self):
         return Persona(
             self.name,
-            self.personality,
-            self.topic_sentiment
+            self.personality.mood,
+            self.personality.assertiveness,
+            self.topic_sentiment,
+            self.behavior
         )
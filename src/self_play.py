@@ -0,0 +1,391 @@
+"""
+Bot versus bot self-play of personas for evaluating personality profiles.
+
+Two personas hold thousands of conversations with each other through the
+intelligent agent and the NLG, in a pool of processes with independently
+seeded random streams. Each conversation opens with a question about a general
+topic the personas have a sentiment towards, if any, else about the weather,
+news, politics or sports. Only aggregate statistics are kept, never the
+transcripts: the number of turns until the first farewell, the distribution
+of each persona's dialogue acts and the drift of their sentiment over a
+conversation.
+
+A failing agent stops the self-play, unless failed responses are answered by
+ELIZA instead, in which case the failures are counted by exception type and
+the first traceback of each type is kept.
+
+Run from the src directory, e.g.:
+    python self_play.py ../data/personality_profiles/*.json -n 1000
+
+:author: Derek S. Prijatelj
+"""
+
+import argparse
+from collections import OrderedDict
+from itertools import combinations
+import multiprocessing
+import random
+import traceback
+import numpy as np
+from persona import Persona
+from conversation import Conversation, Utterance, DialogueAct as DA, \
+    topic_is_self, topic_is_user
+from intelligent_agent import intelligent_agent, tactic
+from nlg import nlg, eliza
+
+_DIALOGUE_ACTS = list(DA)
+_DA_INDEX = {da: i for i, da in enumerate(_DIALOGUE_ACTS)}
+
+# Topics opened on when neither persona has a sentiment towards one
+GENERAL_TOPICS = ("weather", "news", "politics", "sports")
+# Dialogue acts a conversation may be opened with
+OPENING_DIALOGUE_ACTS = (
+    DA.question_information,
+    DA.question_experience,
+    DA.question_preference,
+    DA.question_opinion,
+)
+
+class SelfPlayStats(object):
+    """
+    Aggregate statistics of self-play conversations between two personas,
+    where role 0 opens every conversation and role 1 responds first.
+
+    :param names: tuple of the str names of the two personas
+    :param max_turns: int maximum number of responses in a conversation
+    """
+    def __init__(self, names, max_turns):
+        self.__names = tuple(names)
+        self.__max_turns = max_turns
+        self.__conversations = 0
+        # exception type name to [failed responses, first traceback]
+        self.__errors = OrderedDict()
+        # turns_to_farewell[t] conversations reached a farewell at turn t
+        self.__turns_to_farewell = np.zeros(max_turns + 1, dtype=np.int64)
+        self.__da_counts = np.zeros((2, len(_DIALOGUE_ACTS)), dtype=np.int64)
+        # sum, sum of squares and count of the last minus first sentiment
+        self.__drift = np.zeros((2, 3), dtype=np.float64)
+
+    @property
+    def names(self):
+        return self.__names
+
+    @property
+    def conversations(self):
+        return self.__conversations
+
+    @property
+    def errors(self):
+        """Number of responses where the agent failed and ELIZA answered"""
+        return sum(count for count, _ in self.__errors.values())
+
+    @property
+    def error_types(self):
+        """
+        Dictionary of exception type name to the number of failed responses
+        and the traceback of the first failure
+        """
+        return OrderedDict((name, tuple(error))
+            for name, error in self.__errors.items())
+
+    @property
+    def turns_to_farewell(self):
+        """Histogram of the number of turns until the first farewell"""
+        return self.__turns_to_farewell.copy()
+
+    def da_distribution(self, role):
+        """ Dictionary of DialogueAct to the fraction of the role's turns """
+        counts = self.__da_counts[role]
+        total = max(counts.sum(), 1)
+        return OrderedDict((da, counts[i] / total)
+            for i, da in enumerate(_DIALOGUE_ACTS) if counts[i])
+
+    def sentiment_drift(self, role):
+        """ Mean and standard deviation of the role's sentiment drift """
+        total, squares, count = self.__drift[role]
+        if count == 0:
+            return None, None
+        mean = total / count
+        return mean, np.sqrt(max(squares / count - mean * mean, 0))
+
+    def add_conversation(self, utterances, farewell_turn, errors=()):
+        """
+        Records one conversation.
+
+        :param utterances: list of the Utterances of the conversation
+        :param farewell_turn: int turn of the first farewell, None if never
+        :param errors: list of the exceptions of the failed responses
+        """
+        self.__conversations += 1
+        for error in errors:
+            self.__add_error(type(error).__name__, 1, "".join(
+                traceback.format_exception(type(error), error,
+                    error.__traceback__)))
+        if farewell_turn is not None:
+            self.__turns_to_farewell[farewell_turn] += 1
+
+        first = [None, None]
+        last = [None, None]
+        for turn, utterance in enumerate(utterances):
+            role = turn % 2
+            self.__da_counts[role, _DA_INDEX[utterance.dialogue_act]] += 1
+            if first[role] is None:
+                first[role] = utterance.sentiment
+            last[role] = utterance.sentiment
+
+        for role in (0, 1):
+            if first[role] is not None:
+                drift = last[role] - first[role]
+                self.__drift[role] += (drift, drift * drift, 1)
+
+    def __add_error(self, name, count, first_traceback):
+        """ Helper function counting failed responses of an exception type """
+        error = self.__errors.setdefault(name, [0, first_traceback])
+        error[0] += count
+
+    def merge(self, other):
+        """ Adds the statistics of other SelfPlayStats of the same personas """
+        assert self.__names == other.__names
+        assert self.__max_turns == other.__max_turns
+        self.__conversations += other.__conversations
+        for name, (count, first_traceback) in other.__errors.items():
+            self.__add_error(name, count, first_traceback)
+        self.__turns_to_farewell += other.__turns_to_farewell
+        self.__da_counts += other.__da_counts
+        self.__drift += other.__drift
+
+    def __str__(self):
+        farewells = self.__turns_to_farewell.sum()
+        s = (self.__names[0] + " vs " + self.__names[1] + ":\n"
+            + "Conversations: " + str(self.__conversations) + "\n"
+            + "Failed responses: " + str(self.errors) + "\n"
+        )
+        for name, (count, first_traceback) in self.__errors.items():
+            s += "    " + name + ": " + str(count) + ", first:\n" \
+                + "".join("        " + line + "\n"
+                    for line in first_traceback.rstrip().split("\n"))
+        s += "Reached farewell: " + str(farewells) + "\n"
+        if farewells:
+            turns = np.arange(len(self.__turns_to_farewell))
+            cumulative = np.cumsum(self.__turns_to_farewell)
+            s += ("Turns to farewell: mean "
+                + "{:.2f}".format((turns * self.__turns_to_farewell).sum()
+                    / farewells)
+                + ", median "
+                + str(int(np.searchsorted(cumulative, farewells / 2)))
+                + ", max " + str(int(turns[self.__turns_to_farewell > 0][-1]))
+                + "\n"
+            )
+        for role in (0, 1):
+            mean, std = self.sentiment_drift(role)
+            s += self.__names[role] + ":\n"
+            if mean is not None:
+                s += "    Sentiment drift: mean {:.2f}, std {:.2f}\n".format(
+                    mean, std)
+            top = sorted(self.da_distribution(role).items(),
+                key=lambda item: -item[1])[:5]
+            s += "    Dialogue acts: " + ", ".join(da.name
+                + " {:.3f}".format(p) for da, p in top) + "\n"
+        return s
+
+    def __repr__(self):
+        return self.__str__()
+
+def opening_topics(opener, responder):
+    """
+    The general topics either persona has a sentiment towards, which a
+    conversation between them may be opened on, else GENERAL_TOPICS.
+    """
+    topics = [topic for persona in (opener, responder)
+        for topic in persona.topic_sentiment
+        if not topic_is_self(topic) and not topic_is_user(topic)]
+    return list(OrderedDict.fromkeys(topics)) or list(GENERAL_TOPICS)
+
+def self_play_conversation(opener, responder, max_turns, agent=None,
+        fallback=False, topics=None):
+    """
+    Plays one conversation between the two personas, opened by a question of
+    the opener about a random general topic.
+
+    :param fallback: bool whether ELIZA answers when the agent fails, rather
+        than the exception being raised
+    :param topics: list of the topics to open on, defaults to opening_topics
+    :return: list of Utterances, int turn of the first farewell or None, and
+        list of the exceptions of the failed responses
+    """
+    persona_dict = {opener.name: opener, responder.name: responder}
+    conversation = Conversation({opener.name, responder.name})
+    conversation.new_convo = True
+
+    topic = random.choice(topics or opening_topics(opener, responder))
+    utterance = Utterance(
+        opener.name,
+        random.choice(OPENING_DIALOGUE_ACTS),
+        topic,
+        opener.topic_sentiment.get(topic, opener.personality.mood),
+        opener.personality.assertiveness
+    )
+    utterance = utterance.with_text(
+        nlg.generate_response_text(utterance, opener, conversation))
+    conversation.add_utterance(utterance)
+    utterances = [utterance]
+
+    speakers = (responder, opener)
+    errors = []
+    for turn in range(1, max_turns + 1):
+        speaker = speakers[(turn - 1) % 2]
+        try:
+            utterance = intelligent_agent.decide_response(conversation,
+                speaker.name, persona_dict, agent)
+        except Exception as error:
+            if not fallback:
+                raise
+            errors.append(error)
+            utterance = tactic.psychiatrist(utterance, speaker.name,
+                id(conversation))
+
+        conversation.add_utterance(utterance)
+        utterances.append(utterance)
+
+        if utterance.dialogue_act == DA.farewell:
+            return utterances, turn, errors
+    return utterances, None, errors
+
+def _self_play_worker(args):
+    """ Helper function running a share of the conversations in a process """
+    opener, responder, conversations, max_turns, agent, fallback, seed = args
+    opener = Persona(*opener)
+    responder = Persona(*responder)
+    np.random.seed(seed.generate_state(4))
+    random.seed(int(seed.generate_state(1, np.uint64)[0]))
+    eliza.responder_pool.seed(int(seed.generate_state(2, np.uint64)[1]))
+
+    topics = opening_topics(opener, responder)
+    stats = SelfPlayStats((opener.name, responder.name), max_turns)
+    for _ in range(conversations):
+        stats.add_conversation(*self_play_conversation(opener, responder,
+            max_turns, agent, fallback, topics))
+    return stats
+
+def self_play(opener, responder, conversations=1000, max_turns=50,
+        workers=None, agent=None, seed=None, fallback=False):
+    """
+    Plays the conversations between the two personas in a process pool.
+
+    :param opener: Persona that opens each conversation
+    :param responder: Persona that responds to the opener
+    :param conversations: int number of conversations to play
+    :param max_turns: int maximum number of responses per conversation
+    :param workers: int number of processes, defaults to the cpu count
+    :param agent: str name of the intelligent agent of both personas,
+        defaults to each persona's own agent
+    :param seed: int seed of the random streams for reproducible runs
+    :param fallback: bool whether ELIZA answers when the agent fails, with
+        the failures reported in the statistics, rather than the exception
+        being raised
+    :return: SelfPlayStats of all the conversations
+    """
+    if opener.name == responder.name:
+        # Participants are identified by name, so tell them apart.
+        opener = _renamed(opener, opener.name + " (A)")
+        responder = _renamed(responder, responder.name + " (B)")
+
+    workers = workers or multiprocessing.cpu_count()
+    workers = max(min(workers, conversations), 1)
+    shares = [conversations // workers + (i < conversations % workers)
+        for i in range(workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    # Personas do not pickle, so the workers rebuild them from their values.
+    tasks = [(_persona_args(opener), _persona_args(responder), share,
+        max_turns, agent, fallback, s) for share, s in zip(shares, seeds)]
+
+    stats = SelfPlayStats((opener.name, responder.name), max_turns)
+    if workers == 1:
+        stats.merge(_self_play_worker(tasks[0]))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for worker_stats in pool.imap_unordered(_self_play_worker, tasks):
+                stats.merge(worker_stats)
+    return stats
+
+def _persona_args(persona, name=None):
+    """ Helper function of the arguments constructing a copy of the persona """
+    return (
+        persona.name if name is None else name,
+        persona.personality.mood,
+        persona.personality.assertiveness,
+        persona.topic_sentiment,
+        persona.behavior
+    )
+
+def _renamed(persona, name):
+    """ Helper function copying the persona under a new name """
+    return Persona(*_persona_args(persona, name))
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Evaluate personality profiles by self-play. Every pair "
+            + "of the given profiles holds the given number of conversations."
+    )
+    parser.add_argument("personality_profiles",
+        nargs="+",
+        help="The file paths to the personality profiles, if only one is "
+            + "given it plays against itself"
+    )
+    parser.add_argument(
+        "-n", "--conversations",
+        default=1000,
+        type=int,
+        help="The number of conversations per pair of profiles."
+    )
+    parser.add_argument(
+        "-t", "--max-turns",
+        default=50,
+        type=int,
+        help="The maximum number of responses in a conversation."
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        default=None,
+        type=int,
+        help="The number of processes, defaults to the cpu count."
+    )
+    parser.add_argument(
+        "-a", "--agent",
+        default=None,
+        help="The name of the intelligent agent of both personas."
+    )
+    parser.add_argument(
+        "-s", "--seed",
+        default=None,
+        type=int,
+        help="The seed of the random streams for reproducible runs."
+    )
+    parser.add_argument(
+        "-f", "--fallback",
+        action="store_true",
+        help="Answer with ELIZA when the agent fails and report the "
+            + "failures, rather than stopping."
+    )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    personas = [Persona(path) for path in args.personality_profiles]
+    pairs = [(personas[0], personas[0])] if len(personas) == 1 \
+        else combinations(personas, 2)
+
+    for opener, responder in pairs:
+        print(self_play(
+            opener,
+            responder,
+            args.conversations,
+            args.max_turns,
+            args.workers,
+            args.agent,
+            args.seed,
+            args.fallback
+        ))
+
+if __name__ == "__main__":
+    main()
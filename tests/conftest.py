@@ -0,0 +1,20 @@
+"""
+Test setup shared by the tests of the modules in src, which import each other
+by their flat module names and read the data directory relative to src.
+"""
+import os
+import random
+import sys
+import numpy as np
+import pytest
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+    "src")
+sys.path.insert(0, SRC_PATH)
+
+@pytest.fixture(autouse=True)
+def src_directory(monkeypatch):
+    """ Runs every test from within src, seeded to be reproducible """
+    monkeypatch.chdir(SRC_PATH)
+    np.random.seed(0)
+    random.seed(0)
@@ -0,0 +1,56 @@
+"""
+Tests of sampling bounded traits from truncated normal distributions.
+"""
+import math
+from statistics import NormalDist
+import numpy as np
+from intelligent_agent.bounded_trait import erfc, normal_cdf, normal_ppf, \
+    sample_trait, sample_traits
+
+def truncated_mean(mean, std, low, high):
+    """ The mean of the normal distribution truncated to [low, high] """
+    normal = NormalDist()
+    alpha = (low - mean) / std
+    beta = (high - mean) / std
+    # The mass between the bounds, from whichever tail keeps its precision
+    sign = 1 if alpha > 0 else -1
+    mass = (math.erfc(sign * alpha / math.sqrt(2))
+        - math.erfc(sign * beta / math.sqrt(2))) * sign / 2
+    return mean + std * (normal.pdf(alpha) - normal.pdf(beta)) / mass
+
+class TestApproximations(object):
+    def test_erfc(self):
+        x = np.linspace(-6, 26, 10001)
+        expected = np.array([math.erfc(v) for v in x])
+        assert np.all(np.abs(erfc(x) - expected) <= 1.2e-7 * expected)
+        assert np.ndim(erfc(0.5)) == 0
+        assert np.isclose(normal_cdf(1.959963984540054), 0.975)
+
+    def test_normal_ppf(self):
+        p = np.concatenate([np.geomspace(1e-300, 0.5, 5000),
+            np.linspace(0.5, 1 - 1e-12, 5000)])
+        expected = np.array([NormalDist().inv_cdf(v) for v in p])
+        assert np.allclose(normal_ppf(p), expected, rtol=1.2e-9, atol=1e-12)
+        assert normal_ppf(0.5) == 0
+
+class TestSampleTraits(object):
+    def test_bounds_and_mean(self):
+        for mean in [-20.0, 1.0, 3.5, 5.5, 9.0, 30.0]:
+            expected = truncated_mean(mean, 2.0, 1, 10)
+            vectorized = sample_traits(np.full(100000, mean))
+            single = np.array([sample_trait(mean) for _ in range(20000)])
+            for samples, tolerance in [(vectorized, 0.02), (single, 0.05)]:
+                assert samples.min() >= 1 and samples.max() <= 10
+                assert abs(samples.mean() - expected) < tolerance, mean
+
+    def test_shapes(self):
+        assert isinstance(sample_trait(5), float)
+        assert sample_traits(5.0).shape == ()
+        assert sample_traits([1, 5, 9]).shape == (3,)
+        assert sample_traits([1, 5, 9], size=(2, 3)).shape == (2, 3)
+        assert sample_traits(np.zeros(0)).shape == (0,)
+
+    def test_per_mean_std(self):
+        samples = sample_traits(np.tile([5.5, 5.5], 50000),
+            std=np.tile([0.5, 4.0], 50000))
+        assert samples[0::2].std() < 0.6 < samples[1::2].std()
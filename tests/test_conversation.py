@@ -4,9 +4,15 @@ Tests all related to the conversation files.
 # TODO fix the testing relative paths.
 # src is not a package, this is broken... should probably make project a package
 # then load it in virtual env to test it.
+from collections import OrderedDict
 from copy import copy
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+import json
 from src.conversation import DialogueAct as DA, QuestionType, \
-    Utterance, Conversation, ConversationHistory, \
+    Utterance, Conversation, ColumnarConversation, ConversationHistory, \
+    dump_conversation, dump_conversation_history, load_conversation, \
+    load_conversation_history, microseconds, \
     is_statement, is_question, is_response_action, is_backchannel, \
     statement_to_question, question_to_statement, topic_is_self, topic_is_user
 
@@ -189,7 +195,352 @@ class TestUtterance(object):
         utterance_copy = utterance.copy()
         assert utterance == utterance_copy and utterance is not utterance_copy
 
+    def test_with_text(self):
+        utterance = Utterance(
+            "test_speaker",
+            DA.statement_information,
+            "test",
+            5,
+            5
+        )
+        utterance_text = utterance.with_text(" This is a test. ")
+        assert utterance.text is None
+        assert utterance_text.text == "This is a test."
+        assert utterance_text.date_time == utterance.date_time
+        assert utterance_text.topic == utterance.topic
+
+    def test_immutable(self):
+        utterance = Utterance(
+            "test_speaker",
+            DA.statement_information,
+            "test",
+            5,
+            5,
+            "This is a test."
+        )
+        for name in ["text", "topic", "new_attribute"]:
+            try:
+                setattr(utterance, name, "changed")
+                assert False, name + " was set"
+            except AttributeError:
+                pass
+
+    def test_trusted_many(self):
+        utterances = [
+            Utterance(
+                "test_speaker",
+                DA.question_information,
+                "Test",
+                5,
+                7,
+                "This is a test?",
+                QuestionType.polar
+            ),
+            Utterance(
+                "other_speaker",
+                DA.statement_information,
+                "test",
+                3,
+                2,
+                "This is a test."
+            ),
+        ]
+        trusted = Utterance.trusted_many([(
+                u.speaker,
+                u.dialogue_act,
+                u.topic,
+                u.sentiment,
+                u.assertiveness,
+                u.text,
+                u.question_type,
+                u.date_time
+            ) for u in utterances])
+        assert trusted == utterances
+
+    def test_order(self):
+        utterances = make_utterances(3)
+        same_time = [Utterance("test_speaker", da, "test", 5, 5, None,
+            QuestionType.polar, utterances[0].date_time)
+            for da in [DA.question_information, DA.statement_information]]
+        assert sorted(utterances[::-1]) == utterances
+        assert sorted(same_time) == same_time[::-1]
+
     # TODO test the properties to see if they are copies or the actual objects.
     #def test_properties
 
-# TODO test Conversation and ConversationHistory on json save/load
+def make_utterances(count):
+    start = datetime(2018, 1, 1)
+    topics = ["cats", "dogs", "self_user"]
+    return [Utterance(
+            ["user", "chatbot"][i % 2],
+            DA.question_information if i % 3 else DA.statement_information,
+            topics[i % len(topics)],
+            i % 10 + 1,
+            (i * 7) % 10 + 1,
+            "Utterance " + str(i),
+            QuestionType.polar,
+            start + timedelta(seconds=i)
+        ) for i in range(count)]
+
+class TestConversation(object):
+    def test_views(self):
+        conversation = Conversation({"user", "chatbot"}, OrderedDict())
+        utterances = make_utterances(4)
+        for utterance in utterances[:3]:
+            conversation.add_utterance(utterance, utterance.date_time)
+
+        view = conversation.utterances
+        participants = conversation.participants
+        topics = conversation.topic_to_utterances
+        snapshot = view.snapshot()
+        topics_snapshot = topics.snapshot()
+        conversation.add_utterance(utterances[3], utterances[3].date_time)
+        conversation.add_participant("observer")
+
+        assert len(view) == 4 and len(snapshot) == 3
+        assert next(reversed(view)) == 3
+        assert "observer" in participants
+        assert len(topics["cats"]) == 2 and len(topics_snapshot["cats"]) == 1
+        assert participants == {"user", "chatbot", "observer"}
+        for setter in [
+                lambda: view.__setitem__(4, utterances[0]),
+                lambda: participants.add("other"),
+                lambda: topics["cats"].append(datetime.now())]:
+            try:
+                setter()
+                assert False, "view is writeable"
+            except (AttributeError, TypeError):
+                pass
+
+    def test_incremental_index(self):
+        utterances = make_utterances(20)
+        conversation = Conversation({"user", "chatbot"})
+        columnar = ColumnarConversation({"user", "chatbot"})
+        history = ConversationHistory([conversation])
+        history.add_conversation(columnar)
+        for utterance in utterances[:10]:
+            conversation.add_utterance(utterance)
+        for utterance in utterances[10:]:
+            columnar.add_utterance(utterance)
+
+        assert history.find_utterances() == utterances
+        assert history.utterances_about("cats") == utterances[::3]
+        assert history.topic_to_conversations["dogs"] == [0, 1]
+        assert history.check_indices()
+
+        del history
+        conversation.add_utterance(utterances[0])
+        assert len(conversation) == 11
+
+    def test_json(self):
+        utterances = make_utterances(10) + [Utterance("user", DA.greeting,
+            "self_bot", 5, 5, None, None, datetime(2018, 1, 2))]
+        conversation = Conversation({"user", "chatbot"}, utterances[:7])
+        columnar = ColumnarConversation({"user"}, utterances[7:])
+        history = ConversationHistory([conversation, Conversation(),
+            columnar])
+
+        output = StringIO()
+        dump_conversation_history(history, output, chunk_size=3)
+        saved = json.loads(output.getvalue())["conversation_history"]
+        assert saved["conversations"][0]["utterances"][0] \
+            == ["user", 101, "cats", 1, 1, "Utterance 0", None,
+            1514764800000000]
+
+        output.seek(0)
+        loaded = load_conversation_history(output)
+        assert [type(c) for c in loaded.conversations.values()] \
+            == [Conversation, Conversation, ColumnarConversation]
+        assert loaded.conversations.snapshot() \
+            == history.conversations.snapshot()
+        assert loaded.find_utterances() == utterances
+
+        output = StringIO()
+        dump_conversation(conversation, output)
+        output.seek(0)
+        assert load_conversation(output) == conversation
+
+    def test_same_time(self):
+        conversation = Conversation()
+        utterance = make_utterances(1)[0]
+        for _ in range(3):
+            conversation.add_utterance(utterance)
+        sequence_id = conversation.add_utterance(utterance.with_text("Last"),
+            utterance.date_time)
+
+        assert sequence_id == 3 and len(conversation.utterances) == 4
+        assert conversation.topic_to_utterances["cats"] == [0, 1, 2, 3]
+        assert conversation.last_utterance.text == "Last"
+        assert len(conversation.utterances_between(utterance.date_time)) == 4
+
+    def test_timezone_aware(self):
+        """ Timezone aware times are compared as UTC with naive ones """
+        aware = datetime(2018, 1, 1, 12, tzinfo=timezone(timedelta(hours=2)))
+        naive = datetime(2018, 1, 1, 10)
+        assert microseconds(aware) == microseconds(naive)
+        assert microseconds([aware, naive]).tolist() \
+            == [microseconds(naive)] * 2
+
+        utterance = Utterance("user", DA.greeting, "cats", 5, 5, "Hi", None,
+            aware)
+        for conversation in (Conversation(), ColumnarConversation()):
+            conversation.add_utterance(utterance)
+            assert len(conversation.utterances_between(naive)) == 1
+            assert conversation.utterances_between(
+                naive + timedelta(microseconds=1)) == []
+        assert conversation.date_times[0].item() == naive
+
+        history = ConversationHistory([Conversation(set(), [utterance])])
+        assert len(history.find_utterances(start=naive)) == 1
+        output = StringIO()
+        dump_conversation_history(history, output)
+        output.seek(0)
+        assert load_conversation_history(output).find_utterances()[0] \
+            .date_time == naive
+
+    def test_defaults(self):
+        Conversation().add_participant("user")
+        assert len(Conversation().participants) == 0
+        assert len(ConversationHistory().conversations) == 0
+
+class TestColumnarConversation(object):
+    def test_matches_conversation(self):
+        conversation = Conversation({"user", "chatbot"}, OrderedDict())
+        columnar = ColumnarConversation({"user", "chatbot"}, capacity=2)
+        for utterance in make_utterances(37):
+            conversation.add_utterance(utterance, utterance.date_time)
+            columnar.add_utterance(utterance, utterance.date_time)
+
+        assert len(columnar) == 37 and columnar.capacity == 64
+        assert columnar == conversation and conversation == columnar
+        assert columnar.utterances == conversation.utterances
+        assert columnar.topic_to_utterances \
+            == conversation.topic_to_utterances
+        assert columnar.last_utterance == conversation.last_utterance
+        assert ColumnarConversation.from_conversation(conversation) \
+            == conversation
+
+    def test_columns(self):
+        columnar = ColumnarConversation()
+        for utterance in make_utterances(10):
+            columnar.add_utterance(utterance)
+
+        assert columnar.topics == ("cats", "dogs", "self_user")
+        assert columnar.topic_ids.tolist() == [i % 3 for i in range(10)]
+        assert columnar.sentiments.tolist() == [i % 10 + 1 for i in range(10)]
+        try:
+            columnar.sentiments[0] = 1
+            assert False, "column is writeable"
+        except ValueError:
+            pass
+
+    def test_copy(self):
+        columnar = ColumnarConversation()
+        for utterance in make_utterances(3):
+            columnar.add_utterance(utterance)
+        columnar_copy = copy(columnar)
+        columnar_copy.add_utterance(make_utterances(4)[3])
+
+        assert len(columnar) == 3 and len(columnar_copy) == 4
+        assert columnar != columnar_copy
+        assert columnar.topic_to_utterances["cats"] == [0]
+        assert columnar_copy.topic_to_utterances["cats"] == [0, 3]
+
+    def test_utterances_view(self):
+        """ Utterances are materialized only when accessed """
+        utterances = make_utterances(6)
+        columnar = ColumnarConversation({"user"}, utterances[:4])
+        view = columnar.utterances
+        assert len(view) == 4 and list(view) == [0, 1, 2, 3]
+        assert view[2] == utterances[2]
+        assert 3 in view and 4 not in view and -1 not in view
+        for key in (4, -1, "0"):
+            try:
+                view[key]
+                assert False, "missing sequence ids should raise KeyError"
+            except KeyError:
+                pass
+
+        columnar.add_utterance(utterances[4])
+        assert len(view) == 5 and view[4] == utterances[4]
+        assert list(view.values()) == utterances[:5]
+        assert view.snapshot() == dict(enumerate(utterances[:5]))
+        assert columnar.materialize(1, 3) == utterances[1:3]
+        assert columnar.materialize(4, 10) == utterances[4:5]
+
+    def test_topic_to_utterances(self):
+        """ The grouping is a view kept up to date as utterances are added """
+        columnar = ColumnarConversation()
+        topics = columnar.topic_to_utterances
+        assert len(topics) == 0
+        for utterance in make_utterances(5):
+            columnar.add_utterance(utterance)
+
+        assert len(topics) == 3
+        assert list(topics) == ["cats", "dogs", "self_user"]
+        assert topics["cats"] == [0, 3] and topics["dogs"] == [1, 4]
+
+class TestConversationHistory(object):
+    def test_utterances_about(self):
+        utterances = make_utterances(12)
+        conversation = Conversation({"user", "chatbot"}, OrderedDict())
+        columnar = ColumnarConversation({"user", "chatbot"})
+        for utterance in utterances[:6]:
+            conversation.add_utterance(utterance, utterance.date_time)
+        for utterance in utterances[6:]:
+            columnar.add_utterance(utterance, utterance.date_time)
+
+        history = ConversationHistory(OrderedDict())
+        history.add_conversation(conversation, datetime(2018, 1, 1))
+        history.add_conversation(columnar, datetime(2018, 1, 2))
+
+        assert history.utterances_about("cats") == utterances[::3]
+        assert history.utterances_about("dogs", "self_user") \
+            == [u for i, u in enumerate(utterances) if i % 3]
+        assert history.utterances_about("birds") == []
+        assert list(history.get_utterances_from_topic("dogs").values()) \
+            == utterances[1::3]
+        assert history.topic_to_conversations["cats"] == [0, 1]
+
+    def test_find_utterances(self):
+        utterances = make_utterances(30)
+        history = ConversationHistory(OrderedDict())
+        # Added out of order of time
+        for part in [utterances[20:], utterances[:10], utterances[10:20]]:
+            conversation = Conversation({"user", "chatbot"}, OrderedDict())
+            for utterance in part:
+                conversation.add_utterance(utterance, utterance.date_time)
+            history.add_conversation(conversation, part[0].date_time)
+
+        start, end = utterances[5].date_time, utterances[25].date_time
+        assert history.find_utterances() == utterances
+        assert history.find_utterances(start=start, end=end) \
+            == utterances[5:25]
+        assert history.find_utterances(speakers=["chatbot"], end=end) \
+            == utterances[1:25:2]
+        assert history.find_utterances(["cats", "dogs"], ["user"],
+            start) == [u for i, u in enumerate(utterances)
+            if i >= 5 and i % 2 == 0 and i % 3 != 2]
+        assert list(history.get_utterances_from_topic("cats", start, end)) \
+            == [(1, 6), (1, 9), (2, 2), (2, 5), (2, 8), (0, 1), (0, 4)]
+        assert [len(c) for c in history.conversations_between(end=start)] \
+            == [10]
+
+    def test_find_utterances_both(self):
+        """ Either index is probed, by whichever of topics and speakers """
+        utterances = make_utterances(30)
+        # Utterances at the same time are compared with all of that time.
+        same_time = [Utterance(u.speaker, u.dialogue_act, u.topic,
+            u.sentiment, u.assertiveness, u.text, u.question_type,
+            datetime(2018, 1, 2)) for u in utterances[:6]]
+        history = ConversationHistory([Conversation({"user", "chatbot"},
+            part) for part in (utterances[:15], utterances[15:], same_time)])
+
+        assert history.find_utterances(["cats"], ["user", "chatbot"]) \
+            == utterances[::3] + same_time[::3]
+        assert history.find_utterances(["cats", "dogs", "self_user"],
+            ["user"]) == utterances[::2] + same_time[::2]
+        assert history.find_utterances(["dogs"], ["chatbot"],
+            utterances[1].date_time) == utterances[1::6] + same_time[1:2]
+        assert history.find_utterances(["cats"], ["nobody"]) == []
+        assert history.find_utterances(["birds"], ["user"]) == []
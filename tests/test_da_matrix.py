@@ -0,0 +1,152 @@
+"""
+Tests of the dialogue act response matrices and their sampling.
+"""
+from collections import OrderedDict
+import os
+import numpy as np
+from conversation import DialogueAct as DA
+from intelligent_agent.alias_table import AliasTable
+from intelligent_agent.da_matrix import DAMatrix, get_da_matrix, \
+    load_da_matrix, blend_da_matrices, persona_da_matrix
+from persona import Persona
+
+DIALOGUE_ACTS = (DA.greeting, DA.farewell, DA.thanks)
+# weights[i, j] is the weight of responding with i to the incoming j
+WEIGHTS = [
+    [1, 0, 3],
+    [2, 1, 0],
+    [1, 0, 1]
+]
+
+def frequencies(samples):
+    """ The fraction of the samples that are each of DIALOGUE_ACTS """
+    return np.array([samples.count(da) for da in DIALOGUE_ACTS]) \
+        / len(samples)
+
+def write_matrix(path, weights):
+    with open(path, "w") as f_matrix:
+        f_matrix.write("," + ",".join(da.name for da in DIALOGUE_ACTS)
+            + "\n")
+        for da, row in zip(DIALOGUE_ACTS, weights):
+            f_matrix.write(da.name + "," + ",".join(map(str, row)) + "\n")
+
+class TestDAMatrix(object):
+    def test_normalized(self):
+        matrix = DAMatrix(WEIGHTS, DIALOGUE_ACTS)
+        assert np.allclose(matrix.probabilities.sum(axis=0), 1)
+        assert np.allclose(matrix.column(DA.greeting), [0.25, 0.5, 0.25])
+        assert np.allclose(matrix.cdf[matrix.index(DA.thanks)],
+            [0.75, 0.75, 1])
+        assert not matrix.probabilities.flags.writeable
+
+    def test_invalid(self):
+        for weights, dialogue_acts in [
+                (WEIGHTS[:2], DIALOGUE_ACTS),
+                (WEIGHTS, DIALOGUE_ACTS[:2] + (DA.greeting,)),
+                ([[1, 0, 1], [1, 0, 1], [1, -1, 1]], DIALOGUE_ACTS),
+                ([[1, 0, 1], [1, 0, 1], [1, 0, 1]], DIALOGUE_ACTS)]:
+            try:
+                DAMatrix(weights, dialogue_acts)
+                assert False, str(weights) + " was accepted"
+            except ValueError:
+                pass
+
+    def test_sample_frequencies(self):
+        matrix = DAMatrix(WEIGHTS, DIALOGUE_ACTS)
+        for da in DIALOGUE_ACTS:
+            single = [matrix.sample(da) for _ in range(20000)]
+            many = matrix.sample_many([da] * 20000)
+            assert np.allclose(frequencies(single), matrix.column(da),
+                atol=0.015)
+            assert np.allclose(frequencies(many), matrix.column(da),
+                atol=0.015)
+
+    def test_never_samples_zero_probability(self):
+        matrix = DAMatrix(WEIGHTS, DIALOGUE_ACTS)
+        almost_one = np.nextafter(1, 0)
+        assert matrix.sample(DA.farewell, almost_one) == DA.farewell
+        assert matrix.sample_many([DA.thanks, DA.farewell],
+            np.array([almost_one, almost_one])) == [DA.thanks, DA.farewell]
+
+class TestDAMatrixProvider(object):
+    def test_default_cached(self):
+        matrix = get_da_matrix()
+        assert get_da_matrix() is matrix
+        assert np.allclose(matrix.probabilities.sum(axis=0), 1)
+
+    def test_reloaded_when_modified(self, tmp_path):
+        path = str(tmp_path / "da_matrix.csv")
+        write_matrix(path, WEIGHTS)
+        matrix = get_da_matrix(path)
+        assert get_da_matrix(path) is matrix
+        assert load_da_matrix(path) is not matrix
+
+        write_matrix(path, np.eye(3, dtype=int))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, matrix.mtime + 1))
+        reloaded = get_da_matrix(path)
+        assert reloaded is not matrix
+        assert np.allclose(reloaded.probabilities, np.eye(3))
+
+class TestAliasTable(object):
+    def test_sample_frequencies(self):
+        matrix = DAMatrix(WEIGHTS, DIALOGUE_ACTS)
+        for da in DIALOGUE_ACTS:
+            table = matrix.alias_table(da)
+            assert matrix.alias_table(da) is table
+            samples = [table.sample() for _ in range(20000)]
+            assert np.allclose(frequencies(samples), matrix.column(da),
+                atol=0.015)
+
+    def test_zero_probability_left_out(self):
+        table = AliasTable([0, 1, 0, 3], "abcd")
+        assert table.outcomes == ("b", "d")
+        assert len(table) == 2
+        assert {table.sample(u) for u in np.linspace(0, 1, 1000,
+            endpoint=False)} == {"b", "d"}
+
+    def test_invalid(self):
+        for probabilities, outcomes in [([1, 2], "abc"), ([1, -1], "ab"),
+                ([0, 0], "ab")]:
+            try:
+                AliasTable(probabilities, outcomes)
+                assert False, str(probabilities) + " was accepted"
+            except ValueError:
+                pass
+
+class TestPersonaMatrix(object):
+    def test_blend(self):
+        matrix = DAMatrix(WEIGHTS, DIALOGUE_ACTS)
+        identity = DAMatrix(np.eye(3), DIALOGUE_ACTS)
+        blend = blend_da_matrices([matrix, identity], [1, 3])
+        assert np.allclose(blend.probabilities,
+            (matrix.probabilities + 3 * np.eye(3)) / 4)
+        for weights in [[0, 0], [-1, 0]]:
+            try:
+                blend_da_matrices([matrix, identity], weights)
+                assert False, str(weights) + " was accepted"
+            except ValueError:
+                pass
+
+    def test_persona_matrices(self, tmp_path):
+        path = str(tmp_path / "da_matrix.csv")
+        identity_path = str(tmp_path / "identity.csv")
+        write_matrix(path, WEIGHTS)
+        write_matrix(identity_path, np.eye(3, dtype=int))
+
+        def persona(mood, response_matrix):
+            return Persona("test", mood, 5, OrderedDict(),
+                {"response_matrix": response_matrix})
+        blend = {"blend": [
+            {"matrix": path},
+            {"matrix": identity_path, "weight": {"mood": 0.5}}
+        ]}
+
+        assert persona_da_matrix(Persona("test", 5, 5)) is get_da_matrix()
+        assert persona_da_matrix(persona(5, path)) is get_da_matrix(path)
+        # Weights 1 and 2 of the personality's mood of 4
+        blended = persona_da_matrix(persona(4, blend))
+        assert np.allclose(blended.probabilities,
+            (get_da_matrix(path).probabilities + 2 * np.eye(3)) / 3)
+        assert persona_da_matrix(persona(4, blend)) is blended
+        assert persona_da_matrix(persona(6, blend)) is not blended
@@ -0,0 +1,114 @@
+"""
+Tests of the compiled ELIZA responder against nltk's own ELIZA.
+"""
+import random
+from nltk.chat.util import Chat
+from nltk.chat.eliza import pairs as ELIZA_PAIRS
+from nltk.chat.util import reflections as ELIZA_REFLECTIONS
+from nlg.eliza import CompiledChat, ResponderPool
+
+TEXTS = [
+    "I need a holiday.",
+    "Why don't you listen to me?",
+    "Why can't I sleep at night?",
+    "I can't stop thinking about my mother.",
+    "I am tired of my job",
+    "Are you a computer?",
+    "What is the meaning of this?",
+    "Because I said so.",
+    "Hello there",
+    "I think you are wrong",
+    "Yes, I am sure.",
+    "My father was a sailor.",
+    "You are repeating yourself, aren't you?",
+    "I feel like nobody hears me",
+    "Is it raining?",
+    "It is what it is.",
+    "Can you help me?",
+    "quit",
+    "The weather in sports is politics.",
+    "",
+]
+
+class TestCompiledChat(object):
+    def test_same_as_nltk(self):
+        """ Every response matches nltk's under the same random state """
+        nltk_chat = Chat(ELIZA_PAIRS, ELIZA_REFLECTIONS)
+        compiled = CompiledChat()
+        for seed in range(5):
+            random.seed(seed)
+            expected = [nltk_chat.respond(text) for text in TEXTS]
+            random.seed(seed)
+            assert [compiled.respond(text) for text in TEXTS] == expected
+
+    def test_reflect(self):
+        text = "I am sure you are my friend"
+        reflected = CompiledChat().reflect(text)
+        assert reflected == "you are sure I am your friend"
+        assert reflected \
+            == Chat(ELIZA_PAIRS, ELIZA_REFLECTIONS)._substitute(text)
+
+    def test_no_match(self):
+        compiled = CompiledChat([(r"hello (.*)", ["Hi %1!"])])
+        assert compiled.respond("goodbye") is None
+        assert compiled.respond("Hello my friend") == "Hi your friend!"
+
+    def test_with_random(self):
+        """ Copies with equally seeded random streams respond the same """
+        compiled = CompiledChat()
+        first = compiled.with_random(random.Random(3))
+        second = compiled.with_random(random.Random(3))
+        assert first.random is not second.random
+        assert [first.respond(text) for text in TEXTS] \
+            == [second.respond(text) for text in TEXTS]
+
+class TestResponderPool(object):
+    def test_session_responder(self):
+        """ A session is served by its last responder whenever it is free """
+        pool = ResponderPool(size=3, seed=0)
+        first = pool.checkout("a")
+        second = pool.checkout("b")
+        assert first is not second
+        pool.checkin(first)
+        pool.checkin(second)
+
+        assert pool.checkout("b") is second
+        # Taken by "b", so "a" is served by another free responder.
+        other = pool.checkout("a")
+        assert other is not second
+        pool.checkin(other)
+        pool.checkin(second)
+        with pool.responder("b") as responder:
+            assert responder is second
+
+    def test_concurrent_sessions(self):
+        """ Concurrent sessions never share a responder """
+        pool = ResponderPool(size=3, seed=0)
+        responders = [pool.checkout(session) for session in range(3)]
+        assert len({id(r) for r in responders}) == 3
+        for responder in responders:
+            pool.checkin(responder)
+
+    def test_seed(self):
+        """ Equally seeded pools respond the same, whatever the global state """
+        responses = []
+        for _ in range(2):
+            pool = ResponderPool(size=2, seed=7)
+            random.seed()
+            responses.append([pool.respond(text, session=i % 2)
+                for i, text in enumerate(TEXTS)])
+        assert responses[0] == responses[1]
+
+        pool = ResponderPool(size=2, seed=7)
+        pool.seed(8)
+        assert [pool.respond(text, session=i % 2)
+            for i, text in enumerate(TEXTS)] != responses[0]
+
+    def test_forgets_old_sessions(self):
+        pool = ResponderPool(size=2, seed=0, max_sessions=1)
+        first = pool.checkout("a")
+        second = pool.checkout("b")
+        pool.checkin(first)
+        pool.checkin(second)
+        # Only "b" is remembered, so "a" is served by the last freed one.
+        assert pool.checkout("a") is second
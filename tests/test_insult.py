@@ -0,0 +1,67 @@
+"""
+Tests of the Shakespeare insult vocabulary.
+"""
+import os
+from nlg.insult import InsultVocabulary, get_insult_vocabulary, \
+    shakespeare, shakespeare_many
+
+WORDS = {
+    "adverb": ["very"],
+    "adjective": ["rank", "vain"],
+    "noun": ["knave", "lout", "toad"],
+}
+
+def write_words(path, nouns):
+    with open(path, "w") as f_words:
+        f_words.write("adverb: [very]\nadjective: [rank]\nnoun: ["
+            + ", ".join(nouns) + "]\n")
+
+class TestInsultVocabulary(object):
+    def test_insult(self):
+        vocabulary = InsultVocabulary(WORDS)
+        for _ in range(20):
+            you, adverb, adjective, noun = vocabulary.insult().split(" ")
+            assert you == "you"
+            assert adverb == "very"
+            assert adjective in WORDS["adjective"]
+            assert noun in WORDS["noun"]
+        assert vocabulary.insult(False, False, complete=False) in WORDS["noun"]
+
+    def test_insults(self):
+        vocabulary = InsultVocabulary(WORDS)
+        insults = vocabulary.insults(300)
+        assert len(insults) == 300
+        assert {insult.split(" ")[-1] for insult in insults} \
+            == set(WORDS["noun"])
+
+        # Each insult has the parts selected for it.
+        insults = vocabulary.insults(3, [True, False, False],
+            [False, True, False])
+        assert insults[0].split(" ")[:2] == ["you", "very"]
+        assert insults[1].split(" ")[1] in WORDS["adjective"]
+        assert len(insults[2].split(" ")) == 2
+
+    def test_missing_part(self):
+        try:
+            InsultVocabulary({"adverb": ["very"], "adjective": ["rank"]})
+            assert False, "a vocabulary without nouns should raise"
+        except ValueError:
+            pass
+
+    def test_default(self):
+        words = get_insult_vocabulary().words
+        assert get_insult_vocabulary() is get_insult_vocabulary()
+        assert shakespeare(False, False).split(" ")[1] in words[2]
+        assert all(insult.startswith("you ")
+            for insult in shakespeare_many(5))
+
+    def test_reloaded_when_modified(self, tmp_path):
+        path = str(tmp_path / "insults.yaml")
+        write_words(path, ["knave"])
+        vocabulary = get_insult_vocabulary(path)
+        assert get_insult_vocabulary(path) is vocabulary
+
+        write_words(path, ["lout"])
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, vocabulary.mtime + 1))
+        assert get_insult_vocabulary(path).words[2] == ("lout",)
@@ -0,0 +1,157 @@
+"""
+Tests of deciding responses through the intelligent agents.
+"""
+from collections import Counter
+import math
+import random
+import numpy as np
+from persona import Persona
+from conversation import DialogueAct as DA, Utterance, Conversation, \
+    ColumnarConversation
+from intelligent_agent import intelligent_agent
+from intelligent_agent.da_matrix import get_da_matrix
+from intelligent_agent.static_matrix import static_matrix
+
+def make_conversation(*turns):
+    """ Ongoing conversation of the (speaker, DialogueAct, topic) turns """
+    conversation = Conversation({"user", "chatbot"})
+    conversation.new_convo = False
+    for speaker, dialogue_act, topic in turns:
+        conversation.add_utterance(
+            Utterance(speaker, dialogue_act, topic, 5, 5, "Hi."))
+    return conversation
+
+def make_personas():
+    return {
+        "user": Persona("user", 5, 5),
+        "chatbot": Persona("chatbot", 7, 3),
+    }
+
+class TestDecideResponses(object):
+    def test_batch(self):
+        personas = make_personas()
+        matrix = get_da_matrix()
+        incoming = [da for da in matrix.dialogue_acts if da != DA.farewell]
+        conversations = [make_conversation(("user", da, "sports"))
+            for da in incoming]
+        farewell = make_conversation(("user", DA.farewell, "sports"))
+
+        responses = intelligent_agent.decide_responses(
+            [(c, "chatbot") for c in conversations + [farewell]], personas,
+            "static_matrix")
+
+        assert len(responses) == len(incoming) + 1
+        for da, response in zip(incoming, responses):
+            assert response.speaker == "chatbot"
+            assert response.topic == "sports"
+            assert 1 <= response.sentiment <= 10
+            assert 1 <= response.assertiveness <= 10
+            assert matrix.column(da)[matrix.index(response.dialogue_act)] > 0
+            assert response.text
+        assert responses[-1].dialogue_act == DA.farewell
+
+    def test_batch_matches_single(self):
+        """ A batch decides the same kind of responses as one at a time """
+        personas = make_personas()
+        pairs = [(make_conversation(("user", DA.farewell, "sports")),
+            "chatbot"), (make_conversation(("user", DA.greeting, "sports"),
+            ("chatbot", DA.greeting, "sports")), "user")]
+        for agent in ["static_matrix", "decision_tree_static"]:
+            batch = intelligent_agent.decide_responses(pairs, personas, agent)
+            single = [intelligent_agent.decide_response(conversation,
+                chatbot_id, personas, agent)
+                for conversation, chatbot_id in pairs]
+            assert [r.speaker for r in batch] == ["chatbot", "user"]
+            assert [r.speaker for r in single] == ["chatbot", "user"]
+            assert batch[0].dialogue_act == single[0].dialogue_act \
+                == DA.farewell
+
+    def test_batch_distribution(self):
+        """
+        A batch samples the dialogue acts, sentiments and assertiveness of
+        the responses from the same distributions as one at a time.
+        """
+        personas = make_personas()
+        samples = 3000
+        for incoming in (DA.question_opinion, DA.statement_information):
+            conversation = make_conversation(("user", incoming, "sports"))
+            pairs = [(conversation, "chatbot")] * samples
+            np.random.seed(1)
+            random.seed(1)
+            batch = intelligent_agent.decide_responses(pairs, personas,
+                "static_matrix")
+            np.random.seed(2)
+            random.seed(2)
+            single = [intelligent_agent.decide_response(conversation,
+                "chatbot", personas, "static_matrix")
+                for _ in range(samples)]
+
+            for attribute in ("dialogue_act", "sentiment", "assertiveness"):
+                batch_counts = Counter(getattr(r, attribute) for r in batch)
+                single_counts = Counter(getattr(r, attribute)
+                    for r in single)
+                for value in set(batch_counts) | set(single_counts):
+                    p = (batch_counts[value] + single_counts[value]) \
+                        / (2 * samples)
+                    # Two sample test of each frequency, at 4.5 sigma
+                    tolerance = 4.5 * math.sqrt(2 * p * (1 - p) / samples)
+                    assert abs(batch_counts[value] - single_counts[value]) \
+                        / samples <= tolerance, (attribute, value)
+
+    def test_columnar_conversation(self):
+        """ Agents decide responses in ColumnarConversations alike """
+        personas = make_personas()
+        for agent in ["static_matrix", "decision_tree_static"]:
+            conversations = [ColumnarConversation.from_conversation(
+                make_conversation(("user", da, "sports"))) for da in
+                (DA.question_opinion, DA.statement_information, DA.farewell)]
+            new = ColumnarConversation({"user", "chatbot"},
+                [Utterance("user", DA.greeting, "self_user", 5, 5, "Hi.")])
+            assert new.new_convo
+            assert not any(c.new_convo for c in conversations)
+
+            single = [intelligent_agent.decide_response(conversation,
+                "chatbot", personas, agent)
+                for conversation in conversations + [new]]
+            new.new_convo = True
+            batch = intelligent_agent.decide_responses(
+                [(c, "chatbot") for c in conversations + [new]], personas,
+                agent)
+            for responses in (single, batch):
+                assert [r.speaker for r in responses] == ["chatbot"] * 4
+                assert all(r.text for r in responses)
+                assert responses[2].dialogue_act == DA.farewell
+                assert responses[3].dialogue_act == DA.greeting
+
+class TestAgentRegistry(object):
+    def test_lazy_registry(self, monkeypatch):
+        monkeypatch.setattr(intelligent_agent, "_agents",
+            dict(intelligent_agent._agents))
+        monkeypatch.setattr(intelligent_agent, "_loaded_agents", {})
+
+        # Registering never imports, so only using the agent fails.
+        intelligent_agent.register_agent("missing", "no_such_module", "agent")
+        intelligent_agent.register_agent("alias", "intelligent_agent."
+            + "static_matrix", "static_matrix")
+        assert {"static_matrix", "decision_tree_static", "missing", "alias"} \
+            <= set(intelligent_agent.agent_names())
+        assert intelligent_agent.get_agent("alias") is static_matrix
+        try:
+            intelligent_agent.get_agent("missing")
+            assert False, "the missing module was imported"
+        except ImportError:
+            pass
+        try:
+            intelligent_agent.get_agent("unknown")
+            assert False, "an unknown agent was found"
+        except ValueError:
+            pass
+
+    def test_agent_name(self):
+        assert intelligent_agent.agent_name(Persona("test", 5, 5)) \
+            == intelligent_agent.DEFAULT_AGENT
+        chatbot = Persona("test", 5, 5, None,
+            {"agent": "decision_tree_static"})
+        assert intelligent_agent.agent_name(chatbot) == "decision_tree_static"
+        assert intelligent_agent.agent_name(chatbot, "static_matrix") \
+            == "static_matrix"
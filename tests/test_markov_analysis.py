@@ -0,0 +1,87 @@
+"""
+Tests of the closed form Markov analysis of response matrices, on hand-built
+chains of three dialogue acts whose results are solved by hand.
+"""
+import math
+import numpy as np
+from conversation import DialogueAct as DA
+from intelligent_agent.da_matrix import DAMatrix
+from intelligent_agent import markov_analysis
+
+DIALOGUE_ACTS = (DA.greeting, DA.farewell, DA.thanks)
+# weights[i, j] is the weight of responding with i to the incoming j, so
+# greeting -> farewell or thanks, farewell -> greeting, thanks -> greeting or
+# farewell, each equally likely.
+ERGODIC = [
+    [0, 2, 1],
+    [1, 0, 1],
+    [1, 0, 0]
+]
+# The same, except that farewell is only followed by farewell and thanks only
+# by thanks.
+ABSORBING = [
+    [0, 0, 0],
+    [1, 1, 0],
+    [1, 0, 1]
+]
+
+def values(ordered_dict):
+    return np.array(list(ordered_dict.values()))
+
+class TestMarkovAnalysis(object):
+    def test_transition_matrix(self):
+        transitions = markov_analysis.transition_matrix(
+            DAMatrix(ERGODIC, DIALOGUE_ACTS))
+        assert np.allclose(transitions, [
+            [0, 0.5, 0.5],
+            [1, 0, 0],
+            [0.5, 0.5, 0]
+        ])
+
+    def test_stationary_distribution(self):
+        matrix = DAMatrix(ERGODIC, DIALOGUE_ACTS)
+        # pi = pi P: pi_g = pi_f + pi_t / 2, pi_t = pi_g / 2
+        expected = np.array([4, 3, 2]) / 9
+        distribution = markov_analysis.stationary_distribution(matrix)
+        assert list(distribution) == list(DIALOGUE_ACTS)
+        assert np.allclose(values(distribution), expected)
+        # An ergodic chain forgets where it started.
+        assert np.allclose(values(markov_analysis.stationary_distribution(
+            matrix, DA.thanks)), expected)
+
+    def test_stationary_distribution_absorbing(self):
+        """ The long run depends on which closed class is reached """
+        matrix = DAMatrix(ABSORBING, DIALOGUE_ACTS)
+        assert np.allclose(values(markov_analysis.stationary_distribution(
+            matrix, DA.greeting)), [0, 0.5, 0.5])
+        assert np.allclose(values(markov_analysis.stationary_distribution(
+            matrix, DA.thanks)), [0, 0, 1])
+        assert np.allclose(values(markov_analysis.stationary_distribution(
+            matrix, {DA.greeting: 1, DA.farewell: 1})), [0, 0.75, 0.25])
+
+    def test_expected_turns_to(self):
+        matrix = DAMatrix(ERGODIC, DIALOGUE_ACTS)
+        # h_g = 1 + h_t / 2 and h_t = 1 + h_g / 2
+        turns = markov_analysis.expected_turns_to(matrix)
+        assert np.allclose(values(turns), [2, 0, 2])
+        # h_t = 1 + h_g / 2 + h_f / 2 and h_f = 1 + h_g, with h_g = 0
+        turns = markov_analysis.expected_turns_to(matrix, DA.greeting)
+        assert np.allclose(values(turns), [0, 1, 1.5])
+
+    def test_expected_turns_to_unreachable(self):
+        """ Turns are infinite from wherever the target may be missed """
+        turns = markov_analysis.expected_turns_to(
+            DAMatrix(ABSORBING, DIALOGUE_ACTS))
+        assert turns[DA.farewell] == 0
+        assert turns[DA.greeting] == math.inf
+        assert turns[DA.thanks] == math.inf
+
+    def test_mixing(self):
+        matrix = DAMatrix(ERGODIC, DIALOGUE_ACTS)
+        # The eigenvalues besides 1 solve x^2 + x + 1/4 = 0, both -1/2.
+        assert abs(markov_analysis.mixing_rate(matrix) - 0.5) < 1e-6
+        assert markov_analysis.mixing_time(matrix, 0.01) == 7
+
+        absorbing = DAMatrix(ABSORBING, DIALOGUE_ACTS)
+        assert markov_analysis.mixing_rate(absorbing) == 0
+        assert markov_analysis.mixing_time(absorbing) == 1
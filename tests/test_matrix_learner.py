@@ -0,0 +1,70 @@
+"""
+Tests of learning the dialogue act response matrix from conversations.
+"""
+import numpy as np
+from conversation import DialogueAct as DA, Utterance, Conversation
+from intelligent_agent.da_matrix import get_da_matrix
+from intelligent_agent.matrix_learner import DATransitionCounter
+
+DIALOGUE_ACTS = (DA.greeting, DA.farewell, DA.thanks)
+
+def add_turns(conversation, *turns):
+    for speaker, dialogue_act in turns:
+        conversation.add_utterance(
+            Utterance(speaker, dialogue_act, "sports", 5, 5))
+
+class TestDATransitionCounter(object):
+    def test_update(self):
+        counter = DATransitionCounter(DIALOGUE_ACTS, smoothing=0)
+        conversation = Conversation({"user", "chatbot"})
+        add_turns(conversation, ("user", DA.greeting),
+            ("chatbot", DA.greeting))
+        counter.update(conversation)
+        counter.update(conversation)
+        assert counter.total == 1
+
+        # Only a change of speaker is a response, and other acts are ignored
+        add_turns(conversation, ("chatbot", DA.thanks), ("user", DA.thanks),
+            ("chatbot", DA.statement), ("user", DA.farewell))
+        counter.update(conversation)
+        expected = np.zeros((3, 3), dtype=np.int64)
+        expected[0, 0] = 1
+        expected[2, 2] = 1
+        assert np.array_equal(counter.counts, expected)
+        assert counter.total == 2
+
+    def test_same_time(self):
+        """ Utterances sharing a time are all counted """
+        counter = DATransitionCounter(DIALOGUE_ACTS)
+        conversation = Conversation({"user", "chatbot"})
+        utterances = [Utterance(speaker, DA.greeting, "sports", 5, 5)
+            for speaker in ["user", "chatbot", "user"]]
+        for utterance in utterances:
+            conversation.add_utterance(utterance, utterances[0].date_time)
+            counter.update(conversation)
+        assert counter.total == 2
+
+    def test_observe_many(self):
+        counter = DATransitionCounter(DIALOGUE_ACTS, smoothing=0)
+        counter.observe_many([DA.greeting, DA.greeting, DA.statement],
+            [DA.thanks, DA.thanks, DA.farewell])
+        counter.observe(DA.farewell, DA.farewell)
+        assert counter.counts[2, 0] == 2 and counter.counts[1, 1] == 1
+        assert counter.total == 3
+
+    def test_publish(self, tmp_path):
+        path = str(tmp_path / "learned.csv")
+        counter = DATransitionCounter(DIALOGUE_ACTS, smoothing=1.0,
+            publish_path=path, publish_every=3)
+        counter.observe_many([DA.greeting, DA.greeting],
+            [DA.thanks, DA.farewell])
+        assert not (tmp_path / "learned.csv").exists()
+
+        counter.observe(DA.thanks, DA.farewell)
+        published = get_da_matrix(path)
+        assert published.dialogue_acts == DIALOGUE_ACTS
+        assert np.allclose(published.probabilities,
+            counter.da_matrix().probabilities)
+        assert np.allclose(published.column(DA.greeting),
+            [1 / 5, 2 / 5, 2 / 5])
+        assert [p.name for p in tmp_path.iterdir()] == ["learned.csv"]
@@ -0,0 +1,190 @@
+"""
+Tests of the natural language generation from phrase banks.
+"""
+import json
+import os
+import re
+from conversation import DialogueAct as DA, Utterance, Conversation, \
+    ColumnarConversation
+from persona import Persona
+from nlg import generic_response, nlg
+from nlg.phrase_bank import PhraseBank, get_phrase_bank, \
+    persona_phrase_bank
+
+PHRASES = {
+    "reply": {
+        "neutral": ["about {topic}", "plain"],
+        "neg": ["{insult} and {neg_adj}"],
+        "pos": [
+            {"formal": True, "text": ["{pos_adj} {topic}"]},
+            {"formal": False, "time": ["evening"], "text": ["cool"]}
+        ]
+    }
+}
+ADJECTIVES = {"pos": ["fine"], "neg": ["bad"]}
+
+class TestPhraseBank(object):
+    def test_compiled_templates(self):
+        bank = PhraseBank(PHRASES, ADJECTIVES)
+        assert bank.templates("reply", "neutral", None, "morning") == (
+            (("about ", "topic", ""), frozenset({"topic"})),
+            (("plain",), frozenset()),
+        )
+
+    def test_slots(self):
+        bank = PhraseBank(PHRASES, ADJECTIVES)
+        for _ in range(10):
+            assert bank.phrase("reply", 5, topic="sports") \
+                in {"about sports", "plain"}
+            assert re.fullmatch(r"you( \S+)+ and bad",
+                bank.phrase("reply", 2))
+        assert bank.phrase("reply", 9, True, "news", "morning") == "fine news"
+
+    def test_conditions(self):
+        """ Formality and time of day select among the entries """
+        bank = PhraseBank(PHRASES, ADJECTIVES)
+        assert bank.phrase("reply", 9, False, time="evening") == "cool"
+        # Without informal entries at this time, the formal ones are used.
+        assert bank.phrase("reply", 9, False, "news", "morning") \
+            == "fine news"
+        assert {bank.phrase("reply", 9, None, "news", "evening")
+            for _ in range(30)} == {"fine news", "cool"}
+
+    def test_neutral_fallback(self):
+        phrases = {"reply": {"neutral": ["plain"]}}
+        bank = PhraseBank(phrases, ADJECTIVES)
+        assert bank.phrase("reply", 1) == "plain"
+        assert bank.phrase("reply", 10) == "plain"
+
+    def test_phrases(self):
+        bank = PhraseBank(PHRASES, ADJECTIVES)
+        phrases = bank.phrases("reply", 2, 20)
+        assert len(phrases) == 20
+        assert all(re.fullmatch(r"you( \S+)+ and bad", phrase)
+            for phrase in phrases)
+        assert set(bank.phrases("reply", 5, 20, topic="news")) \
+            == {"about news", "plain"}
+
+    def test_invalid(self):
+        for phrases, adjectives in [
+            ({"reply": {"pos": ["hi"]}}, ADJECTIVES),
+            ({"reply": {"neutral": ["{unknown}"]}}, ADJECTIVES),
+            (PHRASES, {"pos": ["fine"]}),
+        ]:
+            try:
+                PhraseBank(phrases, adjectives)
+                assert False, "invalid templates should raise ValueError"
+            except ValueError:
+                pass
+
+        try:
+            PhraseBank(PHRASES, ADJECTIVES).templates("missing")
+            assert False, "unknown responses should raise ValueError"
+        except ValueError:
+            pass
+
+def write_templates(path, text):
+    with open(path, "w") as f_templates:
+        json.dump({"nlg templates": {
+            "name": "test",
+            "responses": {"reply": {"neutral": [text]}},
+            "adjectives": ADJECTIVES
+        }}, f_templates)
+
+def make_conversation(conversation_class):
+    conversation = conversation_class({"user", "chatbot"})
+    conversation.add_utterance(Utterance("user", DA.statement_opinion,
+        "sports", 5, 5, "I think sports are great."))
+    return conversation
+
+class TestGenerateResponseText(object):
+    def test_every_dialogue_act(self):
+        """ Every dialogue act is dispatched to a generator of its text """
+        persona = Persona("chatbot", 5, 5)
+        for conversation_class in (Conversation, ColumnarConversation):
+            conversation = make_conversation(conversation_class)
+            for da in DA:
+                text = nlg.generate_response_text(
+                    Utterance("chatbot", da, "sports", 5, 5), persona,
+                    conversation)
+                assert isinstance(text, str)
+                if da == DA.silence:
+                    assert text == ""
+                    continue
+                assert text, da
+                if da in nlg.PHRASES:
+                    assert text[0].isupper()
+                    assert text.endswith(nlg.PHRASES[da][1])
+
+    def test_batch(self):
+        """ The batch texts are those generate_response_text would give """
+        persona = Persona("chatbot", 5, 5)
+        for conversation_class in (Conversation, ColumnarConversation):
+            conversation = make_conversation(conversation_class)
+            dialogue_acts = list(DA) * 2
+            texts = nlg.generate_response_texts([Utterance("chatbot", da,
+                "sports", 5, 5) for da in dialogue_acts], persona,
+                conversation)
+            assert len(texts) == len(dialogue_acts)
+            for da, text in zip(dialogue_acts, texts):
+                if da == DA.silence:
+                    assert text == ""
+                elif da == DA.repeat:
+                    assert text == "Please repeat that."
+                elif da in nlg.PHRASES:
+                    assert text[0].isupper()
+                    assert text.endswith(nlg.PHRASES[da][1])
+                    assert text in set(nlg.generate_response_text(
+                        Utterance("chatbot", da, "sports", 5, 5), persona,
+                        conversation_class({"user", "chatbot"}))
+                        for _ in range(100))
+                else:
+                    assert text, da
+
+    def test_insulted(self):
+        """ Texts of the lowest sentiment end with an insult """
+        persona = Persona("chatbot", 5, 5)
+        conversation = make_conversation(Conversation)
+        utterances = [Utterance("chatbot", DA.greeting, "sports", 1, a)
+            for a in (5, 9)]
+        for texts in (nlg.generate_response_texts(utterances, persona,
+                conversation), [nlg.generate_response_text(utterance,
+                persona, conversation) for utterance in utterances]):
+            assert re.search(r"\. You( \S+)+\.$", texts[0])
+            assert re.search(r"\. You( \S+)+!$", texts[1])
+
+class TestGenericResponse(object):
+    def test_query(self):
+        persona = Persona("chatbot", 5, 5)
+        conversation = Conversation({"user", "chatbot"})
+        for sentiment in (1, 5, 10):
+            for conversation_or_none in (conversation, None):
+                text = generic_response.query(persona, conversation_or_none,
+                    sentiment, topic="sports")
+                assert text.endswith("sports")
+
+class TestPhraseBankFiles(object):
+    def test_reloaded_when_modified(self, tmp_path):
+        path = str(tmp_path / "templates.json")
+        write_templates(path, "first")
+        bank = get_phrase_bank(path)
+        assert bank.path == path
+        assert get_phrase_bank(path) is bank
+        assert bank.phrase("reply", 5) == "first"
+
+        write_templates(path, "second")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, bank.mtime + 1))
+        reloaded = get_phrase_bank(path)
+        assert reloaded is not bank
+        assert reloaded.phrase("reply", 5) == "second"
+        # Sessions holding the old bank keep using it.
+        assert bank.phrase("reply", 5) == "first"
+
+    def test_persona_templates(self, tmp_path):
+        path = str(tmp_path / "templates.json")
+        write_templates(path, "custom")
+        persona = Persona("chatbot", 5, 5, None, {"templates": path})
+        assert persona_phrase_bank(persona) is get_phrase_bank(path)
+        assert persona_phrase_bank(Persona("user", 5, 5)) \
+            is get_phrase_bank()
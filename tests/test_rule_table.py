@@ -0,0 +1,86 @@
+"""
+Tests of compiling the decision rule sets of the rule based agent.
+"""
+import json
+import os
+from conversation import DialogueAct as DA
+from intelligent_agent.rule_table import RuleTable, DEFAULT_RULES_PATH, \
+    get_rule_table, topic_class, assertiveness_band
+from intelligent_agent.decision_tree_static import ACTIONS
+
+def action(name):
+    """ A stand in action that returns its name """
+    return lambda *args: name
+
+STAND_IN_ACTIONS = {name: action(name) for name in ["farewell", "greet",
+    "fallback"]}
+
+class TestRuleTable(object):
+    def test_first_rule_wins(self):
+        table = RuleTable([
+            {"dialogue_act": "farewell", "action": "farewell"},
+            {"dialogue_act": ["farewell", "greeting"], "phase": "new",
+                "action": "greet"},
+            {"action": "fallback"},
+        ], STAND_IN_ACTIONS)
+
+        assert table.lookup(DA.farewell, "self", "new", "passive")() \
+            == "farewell"
+        assert table.lookup(DA.greeting, "general", "new", "assertive")() \
+            == "greet"
+        assert table.lookup(DA.greeting, "general", "ongoing", "assertive")() \
+            == "fallback"
+
+    def test_groups(self):
+        table = RuleTable([
+            {"dialogue_act": "question", "action": "greet"},
+            {"action": "fallback"},
+        ], STAND_IN_ACTIONS)
+        assert table.lookup(DA.question_opinion, "user", "new", "passive")() \
+            == "greet"
+        assert table.lookup(DA.statement_opinion, "user", "new", "passive")() \
+            == "fallback"
+
+    def test_rejects_incomplete_coverage(self):
+        try:
+            RuleTable([
+                {"dialogue_act": "farewell", "action": "farewell"},
+                {"phase": "new", "action": "fallback"},
+            ], STAND_IN_ACTIONS, "partial")
+            assert False, "a rule set without an ongoing rule was accepted"
+        except ValueError as err:
+            assert "partial" in str(err)
+
+    def test_rejects_unknown_names(self):
+        for rule in [
+                {"action": "unknown"},
+                {"dialogue_act": "unknown", "action": "greet"},
+                {"topic": "unknown", "action": "greet"},
+                {"dialogue_act": "greeting"}]:
+            try:
+                RuleTable([rule, {"action": "fallback"}], STAND_IN_ACTIONS)
+                assert False, str(rule) + " was accepted"
+            except ValueError:
+                pass
+
+    def test_default_rules(self):
+        table = get_rule_table(DEFAULT_RULES_PATH, ACTIONS)
+        assert get_rule_table(DEFAULT_RULES_PATH, ACTIONS) is table
+        assert table.lookup(DA.farewell, topic_class("sports"), "ongoing",
+            assertiveness_band(7)) is ACTIONS["farewell"]
+
+    def test_recompiled_when_modified(self, tmp_path):
+        path = str(tmp_path / "rules.json")
+        with open(path, "w") as json_rules:
+            json.dump({"decision rules": {"name": "test", "rules": [
+                {"action": "fallback"}]}}, json_rules)
+        table = get_rule_table(path, STAND_IN_ACTIONS)
+        assert table.lookup(DA.farewell, "self", "new", "passive")() \
+            == "fallback"
+
+        with open(path, "w") as json_rules:
+            json.dump({"decision rules": {"name": "test", "rules": [
+                {"action": "farewell"}]}}, json_rules)
+        os.utime(path, ns=(table.mtime + 1, table.mtime + 1))
+        assert get_rule_table(path, STAND_IN_ACTIONS).lookup(DA.farewell,
+            "self", "new", "passive")() == "farewell"
@@ -0,0 +1,97 @@
+"""
+Tests of the bot-vs-bot self-play simulator.
+"""
+from collections import OrderedDict
+from persona import Persona
+from conversation import DialogueAct as DA, is_question
+from intelligent_agent import intelligent_agent
+import self_play
+
+def make_personas(topic_sentiment=None):
+    return (
+        Persona("opener", 7, 6, topic_sentiment),
+        Persona("responder", 4, 5),
+    )
+
+class TestOpeningTopics(object):
+    def test_general_topics(self):
+        assert self_play.opening_topics(*make_personas()) \
+            == list(self_play.GENERAL_TOPICS)
+
+    def test_topic_sentiment(self):
+        """ Only general topics of the personas are opened on """
+        opener, responder = make_personas(OrderedDict(
+            [("self_user", 3), ("cooking", 8), ("sports", 2)]))
+        assert self_play.opening_topics(opener, responder) \
+            == ["cooking", "sports"]
+
+class TestSelfPlayConversation(object):
+    def test_opening(self):
+        opener, responder = make_personas(OrderedDict([("cooking", 8)]))
+        utterances, _, errors = self_play.self_play_conversation(opener,
+            responder, 10, "static_matrix")
+
+        assert errors == []
+        assert len(utterances) == 11
+        opening = utterances[0]
+        assert opening.speaker == "opener"
+        assert opening.topic == "cooking"
+        assert opening.sentiment == 8
+        assert is_question(opening.dialogue_act)
+        assert opening.text
+        # The responder answers on the topic rather than deflecting to ELIZA.
+        assert utterances[1].speaker == "responder"
+        assert utterances[1].topic == "cooking"
+        assert utterances[1].dialogue_act != DA.other
+
+    def test_failing_agent(self, monkeypatch):
+        monkeypatch.setattr(intelligent_agent, "_agents",
+            dict(intelligent_agent._agents))
+        monkeypatch.setattr(intelligent_agent, "_loaded_agents", {})
+        intelligent_agent.register_agent("missing", "no_such_module", "agent")
+        opener, responder = make_personas()
+
+        # Failures are raised unless ELIZA is asked to answer instead.
+        try:
+            self_play.self_play_conversation(opener, responder, 4, "missing")
+            assert False, "a failing agent should raise"
+        except ImportError:
+            pass
+
+        utterances, farewell_turn, errors = \
+            self_play.self_play_conversation(opener, responder, 4, "missing",
+                fallback=True)
+        assert len(utterances) == 5
+        assert farewell_turn is None
+        assert len(errors) == 4
+        assert all(isinstance(error, ImportError) for error in errors)
+        assert all(u.dialogue_act == DA.other for u in utterances[1:])
+
+class TestSelfPlay(object):
+    def test_stats(self):
+        opener, responder = make_personas()
+        stats = self_play.self_play(opener, responder, conversations=5,
+            max_turns=6, workers=1, agent="static_matrix", seed=0)
+
+        assert stats.conversations == 5
+        assert stats.errors == 0
+        for role in (0, 1):
+            distribution = stats.da_distribution(role)
+            assert abs(sum(distribution.values()) - 1) < 1e-9
+        assert "Failed responses: 0" in str(stats)
+
+    def test_reported_errors(self, monkeypatch):
+        monkeypatch.setattr(intelligent_agent, "_agents",
+            dict(intelligent_agent._agents))
+        monkeypatch.setattr(intelligent_agent, "_loaded_agents", {})
+        intelligent_agent.register_agent("missing", "no_such_module", "agent")
+        opener, responder = make_personas()
+
+        stats = self_play.self_play(opener, responder, conversations=3,
+            max_turns=4, workers=1, agent="missing", seed=0, fallback=True)
+
+        assert stats.errors == 12
+        count, first_traceback = stats.error_types["ModuleNotFoundError"]
+        assert count == 12
+        assert "no_such_module" in first_traceback
+        assert "ModuleNotFoundError: 12" in str(stats)
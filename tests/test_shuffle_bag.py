@@ -0,0 +1,88 @@
+"""
+Tests of the no-repeat sampling of phrases within a conversation.
+"""
+import random
+from conversation import Conversation
+from persona import Persona
+from nlg import shuffle_bag
+from nlg.generic_response import sentiment_select
+from nlg.shuffle_bag import ShuffleBag
+
+def rounds(bag, count):
+    """ The indices of count rounds of draws, one list per round """
+    return [[bag.draw() for _ in range(bag.size)] for _ in range(count)]
+
+class TestShuffleBag(object):
+    def test_rounds(self):
+        """ Every index is drawn once per round, never twice in a row """
+        for size in (1, 2, 3, 10, 300):
+            draws = rounds(ShuffleBag(size), 50)
+            for indices in draws:
+                assert sorted(indices) == list(range(size))
+            if size > 1:
+                flat = [i for indices in draws for i in indices]
+                assert all(a != b for a, b in zip(flat, flat[1:]))
+
+    def test_shuffled(self):
+        """ Rounds are drawn in varying orders """
+        draws = rounds(ShuffleBag(5), 50)
+        assert len({tuple(indices) for indices in draws}) > 10
+        firsts = [indices[0] for indices in draws]
+        assert set(firsts) == set(range(5))
+
+    def test_rng(self):
+        first = [ShuffleBag(8).draw(random.Random(3)) for _ in range(5)]
+        second = [ShuffleBag(8).draw(random.Random(3)) for _ in range(5)]
+        assert first == second
+
+    def test_copy(self):
+        bag = ShuffleBag(10)
+        for _ in range(4):
+            bag.draw()
+        copy = bag.copy()
+        state = random.getstate()
+        remaining = [bag.draw() for _ in range(6)]
+        random.setstate(state)
+        assert [copy.draw() for _ in range(6)] == remaining
+
+    def test_draw(self):
+        bags = {}
+        indices = [shuffle_bag.draw(bags, "key", 4) for _ in range(4)]
+        assert sorted(indices) == [0, 1, 2, 3]
+        bag = bags["key"]
+        shuffle_bag.draw(bags, "key", 4)
+        assert bags["key"] is bag
+        # A phrase list of another size starts a new bag.
+        assert shuffle_bag.draw(bags, "key", 2) in (0, 1)
+        assert bags["key"] is not bag
+        assert bags["key"].size == 2
+
+class TestSentimentSelect(object):
+    def test_conversation(self):
+        persona = Persona("chatbot", 5, 5)
+        conversation = Conversation({"user", "chatbot"})
+        neutral = ["a", "b", "c"]
+        pos = ["d", "e"]
+        for _ in range(10):
+            assert sorted(sentiment_select(persona, 5, neutral, pos,
+                conversation=conversation, key="reply")
+                for _ in range(3)) == neutral
+            assert sorted(sentiment_select(persona, 9, neutral, pos,
+                conversation=conversation, key="reply")
+                for _ in range(2)) == pos
+        assert set(conversation.phrase_bags) == {
+            ("sentiment_select", "reply", "neutral"),
+            ("sentiment_select", "reply", "pos"),
+        }
+
+        # Without a negative list, negative sentiments select neutral.
+        assert sentiment_select(persona, 1, neutral, pos) in neutral
+
+    def test_key_required(self):
+        persona = Persona("chatbot", 5, 5)
+        try:
+            sentiment_select(persona, 5, ["a"],
+                conversation=Conversation({"user", "chatbot"}))
+            assert False, "a conversation without a key should raise"
+        except ValueError:
+            pass